@@ -0,0 +1,4 @@
+"""Azure Pipelines Deploy module.
+
+This module contains utilities for deploying the synthesized CDK app.
+"""
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+r"""Module for finding the stacks of a cloud assembly that need a deployment.
+
+``cdk deploy --all`` creates a changeset for every stack, even if nothing
+changed. This module hashes the template, the stack tags and the termination
+protection of every stack in the cloud assembly and compares them with the
+deployed stack in the same account and region, as returned by the
+CloudFormation ``DescribeStacks`` and ``GetTemplate`` APIs. Only stacks whose
+hash differs are passed on to ``cdk deploy --exclusively``.
+
+Usage::
+
+    cdk synth --context environment=developer
+    python -m azure_pipelines.deploy.changed_stacks --assembly cdk.out \
+        --output changed-stacks.json
+    cdk deploy --app cdk.out --exclusively $(jq -r '.changedStacks | join(" ")' \
+        changed-stacks.json)
+"""
+
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from azure_pipelines.logging_config import get_logger
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Stack states in which the deployed template is the last successful deployment
+STABLE_STATUSES = ("CREATE_COMPLETE", "UPDATE_COMPLETE", "IMPORT_COMPLETE")
+
+
+@dataclass(frozen=True)
+class AssemblyStack:
+    """A stack of the synthesized cloud assembly.
+
+    Args:
+        artifact_id: ID of the stack artifact, used to select the stack for deploy
+        stack_name: Name of the CloudFormation stack
+        account: AWS account ID of the stack
+        region: AWS region of the stack
+        template: The synthesized template
+        tags: Stack level tags
+        termination_protection: Whether termination protection is enabled
+    """
+
+    artifact_id: str
+    stack_name: str
+    account: str
+    region: str
+    template: Dict[str, Any] = field(repr=False)
+    tags: Dict[str, str] = field(default_factory=dict)
+    termination_protection: bool = False
+
+    @property
+    def key(self) -> str:
+        """Identify the stack across accounts and regions."""
+        return f"{self.account}/{self.region}/{self.stack_name}"
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of everything cdk deploy sends to CloudFormation."""
+        return stack_fingerprint(self.template, self.tags, self.termination_protection)
+
+
+def stack_fingerprint(
+    template: Union[Dict[str, Any], str],
+    tags: Dict[str, str],
+    termination_protection: bool,
+) -> str:
+    """Compute the hash of a stack independent of key order and whitespace.
+
+    Args:
+        template: Template as parsed JSON or as raw template body
+        tags: Stack level tags
+        termination_protection: Whether termination protection is enabled
+
+    Returns:
+        The hex encoded SHA-256 hash.
+    """
+    document = {
+        "template": template,
+        "tags": tags,
+        "terminationProtection": termination_protection,
+    }
+    encoded = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def read_assembly(assembly_dir: Union[str, Path] = "cdk.out") -> List[AssemblyStack]:
+    """Read all stacks of a cloud assembly.
+
+    Args:
+        assembly_dir: Directory of the cloud assembly
+
+    Returns:
+        The stacks in manifest order.
+
+    Raises:
+        FileNotFoundError: If the directory contains no cloud assembly.
+    """
+    assembly_path = Path(assembly_dir)
+    with (assembly_path / "manifest.json").open() as json_file:
+        artifacts = json.load(json_file).get("artifacts", {})
+
+    stacks = []
+    for artifact_id, artifact in artifacts.items():
+        if artifact.get("type") != "aws:cloudformation:stack":
+            continue
+
+        properties = artifact.get("properties", {})
+        with (assembly_path / properties["templateFile"]).open() as json_file:
+            template = json.load(json_file)
+
+        # The environment has the form aws://<account>/<region>
+        account, _, region = (
+            artifact.get("environment", "").split("//")[-1].partition("/")
+        )
+        stacks.append(
+            AssemblyStack(
+                artifact_id=artifact.get("displayName", artifact_id),
+                stack_name=properties.get("stackName", artifact_id),
+                account=account,
+                region=region,
+                template=template,
+                tags=properties.get("tags", {}),
+                termination_protection=properties.get("terminationProtection", False),
+            )
+        )
+    return stacks
+
+
+def _is_missing_stack(error: Exception) -> bool:
+    """Check whether a CloudFormation error means the stack does not exist."""
+    details = getattr(error, "response", {}).get("Error", {})
+    message = details.get("Message", "")
+    return details.get("Code") == "ValidationError" and "does not exist" in message
+
+
+class CloudFormationTemplateSource:
+    """Fingerprints of the deployed stacks read from CloudFormation.
+
+    Args:
+        client_factory: Callable returning a CloudFormation client for a region,
+            defaults to boto3 clients
+    """
+
+    def __init__(self, client_factory: Optional[Callable[[str], Any]] = None) -> None:
+        """Initialize the source."""
+        self.client_factory = client_factory or self._boto3_client
+        self._clients: Dict[str, Any] = {}
+
+    @staticmethod
+    def _boto3_client(region: str) -> Any:
+        """Create a CloudFormation client, boto3 is only needed for deployments."""
+        import boto3
+
+        return boto3.client("cloudformation", region_name=region or None)
+
+    def client(self, region: str) -> Any:
+        """Get the cached client of a region.
+
+        Args:
+            region: AWS region
+
+        Returns:
+            The CloudFormation client.
+        """
+        if region not in self._clients:
+            self._clients[region] = self.client_factory(region)
+        return self._clients[region]
+
+    def deployed_fingerprint(self, stack: AssemblyStack) -> Optional[str]:
+        """Get the fingerprint of the deployed stack.
+
+        Args:
+            stack: Stack of the cloud assembly
+
+        Returns:
+            The fingerprint or None if the stack does not exist or is not in a
+            state of a successful deployment.
+        """
+        client = self.client(stack.region)
+        try:
+            described = client.describe_stacks(StackName=stack.stack_name)["Stacks"][0]
+        except Exception as exc:
+            if _is_missing_stack(exc):
+                logger.info(f"Stack {stack.key} is not deployed yet")
+                return None
+            raise
+
+        status = described["StackStatus"]
+        if status not in STABLE_STATUSES:
+            logger.info(f"Stack {stack.key} is in state {status}")
+            return None
+
+        body = client.get_template(
+            StackName=stack.stack_name, TemplateStage="Original"
+        )["TemplateBody"]
+        if isinstance(body, str):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                # YAML templates never match the JSON templates of the CDK
+                pass
+
+        tags = {tag["Key"]: tag["Value"] for tag in described.get("Tags", [])}
+        return stack_fingerprint(
+            body, tags, described.get("EnableTerminationProtection", False)
+        )
+
+
+def find_changed_stacks(
+    stacks: List[AssemblyStack],
+    source: CloudFormationTemplateSource,
+    max_workers: int = 8,
+) -> List[Dict[str, Any]]:
+    """Compare every stack of the cloud assembly with the deployed stack.
+
+    Args:
+        stacks: Stacks of the cloud assembly
+        source: Source of the deployed fingerprints
+        max_workers: Number of concurrent CloudFormation requests
+
+    Returns:
+        One result per stack in the order of the stacks.
+    """
+
+    def compare(stack: AssemblyStack) -> Dict[str, Any]:
+        deployed = source.deployed_fingerprint(stack)
+        return {
+            "artifactId": stack.artifact_id,
+            "stackName": stack.stack_name,
+            "account": stack.account,
+            "region": stack.region,
+            "localHash": stack.fingerprint,
+            "deployedHash": deployed,
+            "changed": deployed != stack.fingerprint,
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(stacks)))) as pool:
+        results = list(pool.map(compare, stacks))
+
+    for result in results:
+        state = "changed" if result["changed"] else "unchanged"
+        logger.info(f"Stack {result['stackName']} is {state}")
+    return results
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Find stacks whose synthesized template differs from the deployed one"
+    )
+    parser.add_argument(
+        "-a", "--assembly", default="cdk.out", help="Directory of the cloud assembly"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="changed-stacks.json",
+        help="JSON report listing the changed stacks",
+    )
+    parser.add_argument(
+        "-w", "--max-workers", type=int, default=8, help="Concurrent API requests"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Write the report of changed stacks."""
+    args = parse_arguments()
+
+    stacks = read_assembly(args.assembly)
+    results = find_changed_stacks(
+        stacks, CloudFormationTemplateSource(), max_workers=args.max_workers
+    )
+    changed = [result["artifactId"] for result in results if result["changed"]]
+
+    with open(args.output, "w") as json_file:
+        json.dump({"changedStacks": changed, "stacks": results}, json_file, indent=2)
+
+    logger.info(
+        f"{len(changed)} of {len(results)} stacks changed: {', '.join(changed) or '-'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
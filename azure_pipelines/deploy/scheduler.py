@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Module for deploying the stacks of a cloud assembly in parallel.
+
+The dependencies between stacks are read from the cloud assembly manifest. A
+stack is deployed as soon as all stacks it depends on are deployed, at most
+``max_concurrency`` stacks at the same time. After the first failure no new
+deployment is started, deployments already running are awaited.
+
+Usage::
+
+    cdk synth --context environment=developer
+    python -m azure_pipelines.deploy.scheduler --assembly cdk.out --max-concurrency 4
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Set, Union
+
+from azure_pipelines.logging_config import get_logger
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Dependency graph: stack -> stacks that must be deployed before it
+DependencyGraph = Dict[str, Set[str]]
+
+
+class DeployBackend(Protocol):
+    """Deploys a single stack, raising an exception if the deployment fails."""
+
+    def deploy(self, stack: str) -> None:
+        """Deploy a stack."""
+
+
+class CdkCliBackend:
+    """Deploy stacks with the CDK CLI from an already synthesized cloud assembly.
+
+    Args:
+        assembly_dir: Directory of the cloud assembly
+        cdk_command: Command running the CDK CLI
+        extra_args: Additional arguments for cdk deploy
+    """
+
+    def __init__(
+        self,
+        assembly_dir: Union[str, Path] = "cdk.out",
+        cdk_command: Sequence[str] = ("cdk",),
+        extra_args: Sequence[str] = (),
+    ) -> None:
+        """Initialize the backend."""
+        self.assembly_dir = str(assembly_dir)
+        self.cdk_command = list(cdk_command)
+        self.extra_args = list(extra_args)
+
+    def deploy(self, stack: str) -> None:
+        """Deploy a single stack without its dependencies.
+
+        Args:
+            stack: Display name of the stack artifact
+
+        Raises:
+            RuntimeError: If cdk deploy fails.
+        """
+        command = [
+            *self.cdk_command,
+            "deploy",
+            "--app",
+            self.assembly_dir,
+            "--exclusively",
+            stack,
+            "--ci",
+            "--require-approval",
+            "never",
+            *self.extra_args,
+        ]
+        # Capture the output, so the logs of parallel deployments do not interleave
+        process = subprocess.run(command, capture_output=True, text=True, check=False)
+        output = (process.stdout + process.stderr).strip()
+        if process.returncode != 0:
+            raise RuntimeError(f"cdk deploy {stack} failed:\n{output}")
+        logger.info(f"cdk deploy {stack}:\n{output}")
+
+
+def read_dependency_graph(
+    assembly_dir: Union[str, Path] = "cdk.out",
+    stacks: Optional[Iterable[str]] = None,
+) -> DependencyGraph:
+    """Read the dependencies between the stacks of a cloud assembly.
+
+    Only dependencies on other stacks are kept, asset artifacts are published
+    by cdk deploy itself. If stacks is given, the graph is restricted to these
+    stacks; dependencies on other stacks are considered deployed.
+
+    Args:
+        assembly_dir: Directory of the cloud assembly
+        stacks: Display names of the stacks to deploy (defaults to all stacks)
+
+    Returns:
+        The dependencies of every stack by display name.
+
+    Raises:
+        ValueError: If a selected stack is not part of the cloud assembly.
+    """
+    with (Path(assembly_dir) / "manifest.json").open() as json_file:
+        artifacts = json.load(json_file).get("artifacts", {})
+
+    names = {
+        artifact_id: artifact.get("displayName", artifact_id)
+        for artifact_id, artifact in artifacts.items()
+        if artifact.get("type") == "aws:cloudformation:stack"
+    }
+    graph = {
+        names[artifact_id]: {
+            names[dependency]
+            for dependency in artifacts[artifact_id].get("dependencies", [])
+            if dependency in names
+        }
+        for artifact_id in names
+    }
+
+    if stacks is None:
+        return graph
+
+    selected = set(stacks)
+    unknown = selected - graph.keys()
+    if unknown:
+        raise ValueError(
+            f"Stacks not in the cloud assembly: {', '.join(sorted(unknown))}"
+        )
+    return {stack: graph[stack] & selected for stack in graph if stack in selected}
+
+
+def plan_waves(graph: DependencyGraph) -> List[List[str]]:
+    """Sort the stacks into waves of stacks without dependencies on each other.
+
+    Args:
+        graph: Dependencies of every stack
+
+    Returns:
+        The waves, every stack only depends on stacks of earlier waves.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle or an unknown stack.
+    """
+    for stack, dependencies in graph.items():
+        unknown = dependencies - graph.keys()
+        if unknown:
+            raise ValueError(
+                f"Stack '{stack}' depends on unknown stacks: {', '.join(sorted(unknown))}"
+            )
+
+    remaining = {stack: set(dependencies) for stack, dependencies in graph.items()}
+    waves = []
+    while remaining:
+        wave = sorted(stack for stack, deps in remaining.items() if not deps)
+        if not wave:
+            raise ValueError(
+                f"Stack dependency cycle between: {', '.join(sorted(remaining))}"
+            )
+        waves.append(wave)
+        for stack in wave:
+            del remaining[stack]
+        for dependencies in remaining.values():
+            dependencies.difference_update(wave)
+    return waves
+
+
+class DeployScheduler:
+    """Deploy stacks concurrently in dependency order.
+
+    Args:
+        graph: Dependencies of every stack
+        backend: Backend deploying a single stack
+        max_concurrency: Maximum number of concurrent deployments
+    """
+
+    def __init__(
+        self, graph: DependencyGraph, backend: DeployBackend, max_concurrency: int = 4
+    ) -> None:
+        """Initialize the scheduler and validate the dependency graph."""
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.graph = graph
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.waves = plan_waves(graph)
+        self.results: Dict[str, Dict[str, Union[str, float, None]]] = {}
+        self._lock = threading.Lock()
+
+    def _deploy(self, stack: str) -> None:
+        """Deploy a single stack and record the result."""
+        logger.info(f"Deploying stack {stack}")
+        start = time.perf_counter()
+        try:
+            self.backend.deploy(stack)
+        except Exception as exc:
+            status, error = "failed", str(exc)
+            logger.error(f"Deploying stack {stack} failed: {exc}")
+        else:
+            status, error = "succeeded", None
+            logger.info(f"Deployed stack {stack}")
+
+        with self._lock:
+            self.results[stack] = {
+                "status": status,
+                "seconds": round(time.perf_counter() - start, 3),
+                "error": error,
+            }
+
+    def run(self) -> bool:
+        """Deploy all stacks.
+
+        A stack starts as soon as all of its dependencies are deployed, it does
+        not wait for the other stacks of its wave.
+
+        Returns:
+            True if all stacks were deployed.
+        """
+        logger.info(
+            f"Deploying {len(self.graph)} stacks in {len(self.waves)} waves, "
+            f"at most {self.max_concurrency} at a time"
+        )
+        pending = {
+            stack: set(dependencies) for stack, dependencies in self.graph.items()
+        }
+        # Deploy stacks of earlier waves first when more stacks are ready than slots
+        order = [stack for wave in self.waves for stack in wave]
+        running: Dict[Future, str] = {}
+        failed = False
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            while pending or running:
+                if not failed:
+                    for stack in order:
+                        if len(running) >= self.max_concurrency:
+                            break
+                        if stack in pending and not pending[stack]:
+                            del pending[stack]
+                            running[pool.submit(self._deploy, stack)] = stack
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stack = running.pop(future)
+                    if self.results[stack]["status"] != "succeeded":
+                        failed = True
+                        continue
+                    for dependencies in pending.values():
+                        dependencies.discard(stack)
+
+        for stack in pending:
+            self.results[stack] = {"status": "skipped", "seconds": 0.0, "error": None}
+        if failed:
+            logger.error(
+                f"Stopped after a failed deployment, skipped {len(pending)} stacks"
+            )
+        return not failed
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Deploy the stacks of a cloud assembly in dependency order"
+    )
+    parser.add_argument(
+        "-a", "--assembly", default="cdk.out", help="Directory of the cloud assembly"
+    )
+    parser.add_argument(
+        "-s",
+        "--stacks",
+        nargs="+",
+        help="Stacks to deploy (defaults to all stacks of the cloud assembly)",
+    )
+    parser.add_argument(
+        "--changed-stacks",
+        help="Deploy the stacks listed in a report of azure_pipelines.deploy.changed_stacks",
+    )
+    parser.add_argument(
+        "-c",
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent deployments",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only print the deployment waves"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Deploy the stacks and exit with 1 if a deployment failed."""
+    args = parse_arguments()
+
+    stacks = args.stacks
+    if args.changed_stacks:
+        with open(args.changed_stacks) as json_file:
+            stacks = json.load(json_file)["changedStacks"]
+
+    graph = read_dependency_graph(args.assembly, stacks)
+    if not graph:
+        logger.info("No stacks to deploy")
+        return
+
+    scheduler = DeployScheduler(
+        graph, CdkCliBackend(args.assembly), max_concurrency=args.max_concurrency
+    )
+    for index, wave in enumerate(scheduler.waves, start=1):
+        logger.info(f"Wave {index}: {', '.join(wave)}")
+    if args.dry_run:
+        return
+
+    if not scheduler.run():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Command line interface of the environment configuration.
+
+Usage:
+    python -m azure_pipelines.load_env compile [--config-dir config]
+        [--schema cdk_sample_repo.config_schema:CdkSampleRepoConfig]
+"""
+
+import argparse
+import importlib
+import sys
+from typing import Any, Optional
+
+from azure_pipelines.load_env.config import ConfigRegistry
+from azure_pipelines.load_env.schema import ConfigValidationError
+from azure_pipelines.logging_config import get_logger
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+
+def import_schema(path: Optional[str]) -> Optional[Any]:
+    """Import a schema dataclass from a 'module:Class' path.
+
+    Args:
+        path: Import path of the schema, None if there is no schema
+
+    Returns:
+        The schema dataclass or None.
+    """
+    if not path:
+        return None
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Manage the environment configuration")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser(
+        "compile", help="Compile the config directory into a validated snapshot"
+    )
+    compile_parser.add_argument(
+        "-c", "--config-dir", default="config", help="Directory of the config files"
+    )
+    compile_parser.add_argument(
+        "-s",
+        "--schema",
+        default="cdk_sample_repo.config_schema:CdkSampleRepoConfig",
+        help="Schema as 'module:Class', an empty value skips the validation",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the configuration command."""
+    args = parse_arguments()
+
+    if args.command == "compile":
+        try:
+            ConfigRegistry(args.config_dir).compile_snapshot(
+                schema=import_schema(args.schema)
+            )
+        except ConfigValidationError as e:
+            logger.error(str(e))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
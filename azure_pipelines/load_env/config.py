@@ -1,38 +1,436 @@
+import hashlib
 import json
-from typing import Any, Dict, Optional
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Generic, List, Mapping, Optional, Tuple, Type, Union
 
+from azure_pipelines.load_env.layers import FrozenConfig, merge_layers
+from azure_pipelines.load_env.resolver import ParameterResolver
+from azure_pipelines.load_env.schema import ConfigValidationError, SchemaT, validate
+from azure_pipelines.load_env.snapshot import (
+    SNAPSHOT_FILE,
+    Snapshot,
+    Stamp,
+    config_files,
+    file_stamp,
+    load_snapshot,
+    write_snapshot,
+)
 from azure_pipelines.logging_config import get_logger
 
 # Get configured logger for this module
 logger = get_logger(__name__)
 
+# Layer with defaults of all environments, relative to the config directory
+BASE_FILE = "_base.json"
 
-class CDKConfig:
-    """Generate CDK config object for multi environment deployments."""
+# Directory with the layers of account groups, relative to the config directory
+GROUPS_DIR = "_groups"
 
-    def __init__(self, environment: str) -> None:
-        """Initialize config object.
+# Key of an environment file selecting its account group
+GROUP_KEY = "$group"
+
+
+@dataclass
+class _FileEntry:
+    """A parsed config file together with the state of the file it came from."""
+
+    stamp: Stamp
+    digest: str
+    data: Dict[str, Any]
+
+
+@dataclass
+class _CompiledEntry:
+    """A compiled configuration together with the state of all its layers."""
+
+    stamps: Tuple[Tuple[Path, Stamp], ...]
+    digests: Tuple[str, ...]
+    config: FrozenConfig
+    expires: float = float("inf")
+    validated: Dict[type, Any] = field(default_factory=dict)
+
+
+class ConfigRegistry:
+    """Compile every configuration once per process and share read-only views.
+
+    The layers of an environment (see azure_pipelines.load_env.layers) are
+    merged once into a FrozenConfig. As long as the modification time and size
+    of all layer files stay the same, lookups return the compiled object. A
+    changed file is only parsed again if its content hash differs.
+    Configurations with resolved parameter references are compiled again
+    after the TTL of the resolver. If the config directory contains an up to
+    date snapshot (see azure_pipelines.load_env.snapshot), the merged layers
+    are taken from it instead of the JSON files.
+
+    Args:
+        config_dir: Directory containing the environment JSON files
+    """
+
+    def __init__(self, config_dir: Union[str, Path] = "config") -> None:
+        """Initialize an empty registry."""
+        self.config_dir = Path(config_dir)
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._files: Dict[Path, _FileEntry] = {}
+        self._snapshots: Dict[Path, Tuple[Stamp, Optional[Snapshot]]] = {}
+        self._compiled: Dict[
+            Tuple[Path, str, str, Optional[ParameterResolver]], _CompiledEntry
+        ] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, path: Path) -> Optional[_FileEntry]:
+        """Read and parse a config file unless its content is unchanged.
+
+        Returns:
+            The parsed file or None if it does not exist.
+        """
+        stamp = file_stamp(path)
+        entry = self._files.get(path)
+        if stamp is None:
+            self._files.pop(path, None)
+            return None
+        if entry is not None and entry.stamp == stamp:
+            return entry
+
+        with open(path, "rb") as json_file:
+            content = json_file.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        # The file was touched or rewritten with the same content
+        if entry is not None and entry.digest == digest:
+            entry.stamp = stamp
+            return entry
+
+        entry = _FileEntry(stamp=stamp, digest=digest, data=json.loads(content))
+        self._files[path] = entry
+        return entry
+
+    def _layers(
+        self, config_dir: Path, environment: str
+    ) -> List[Tuple[Path, Optional[_FileEntry]]]:
+        """Read the base, group and environment layers of an environment.
+
+        Raises:
+            FileNotFoundError: If the environment or its group file doesn't exist.
+        """
+        environment_path = config_dir / f"{environment}.json"
+        environment_entry = self._read(environment_path)
+        if environment_entry is None:
+            raise FileNotFoundError(f"No config file {environment_path}")
+
+        base_path = config_dir / BASE_FILE
+        layers = [(base_path, self._read(base_path))]
+
+        group = environment_entry.data.get(GROUP_KEY)
+        if group:
+            group_path = config_dir / GROUPS_DIR / f"{group}.json"
+            group_entry = self._read(group_path)
+            if group_entry is None:
+                raise FileNotFoundError(
+                    f"No config file {group_path} for group '{group}' of '{environment}'"
+                )
+            layers.append((group_path, group_entry))
+
+        layers.append((environment_path, environment_entry))
+        return layers
+
+    def _snapshot(self, config_dir: Path) -> Optional[Snapshot]:
+        """Get the snapshot of a config directory if it is up to date."""
+        stamp = file_stamp(config_dir / SNAPSHOT_FILE)
+        cached = self._snapshots.get(config_dir)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, load_snapshot(config_dir) if stamp else None)
+            self._snapshots[config_dir] = cached
+
+        snapshot = cached[1]
+        if snapshot is None or not snapshot.is_fresh():
+            return None
+        return snapshot
+
+    def _compile(
+        self,
+        environment: str,
+        config_dir: Optional[Union[str, Path]],
+        overrides: Optional[Mapping[str, Any]],
+        resolver: Optional[ParameterResolver] = None,
+    ) -> _CompiledEntry:
+        """Get the up to date compiled entry of an environment, the lock must be held."""
+        config_dir = Path(config_dir or self.config_dir)
+        overrides = overrides or {}
+        key = (config_dir, environment, json.dumps(overrides, sort_keys=True), resolver)
+
+        entry = self._compiled.get(key)
+        if (
+            entry is not None
+            and time.time() < entry.expires
+            and all(file_stamp(path) == stamp for path, stamp in entry.stamps)
+        ):
+            self.hits += 1
+            return entry
+
+        snapshot = self._snapshot(config_dir)
+        if snapshot is not None and environment in snapshot.environments:
+            stamps = snapshot.stamps
+            digests: Tuple[str, ...] = (snapshot.digest,)
+            data = [snapshot.environments[environment]]
+            merged_already = True
+        else:
+            layers = self._layers(config_dir, environment)
+            stamps = tuple(
+                (path, layer.stamp if layer else None) for path, layer in layers
+            )
+            digests = tuple(layer.digest if layer else "" for _, layer in layers)
+            data = [layer.data for _, layer in layers if layer]
+            merged_already = False
+
+        if (
+            entry is not None
+            and time.time() < entry.expires
+            and entry.digests == digests
+        ):
+            entry.stamps = stamps
+            self.hits += 1
+            return entry
+
+        # Snapshots hold merged layers, only overrides need another merge
+        if merged_already and not overrides:
+            merged = data[0]
+        else:
+            merged = merge_layers(*data, overrides)
+        expires = float("inf")
+        if resolver is not None:
+            # Resolved parameters are only as fresh as the cache of the resolver
+            expires = time.time() + resolver.ttl
+            merged = resolver.resolve(merged)
+        config = FrozenConfig(merged)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.reloads += 1
+            logger.info(f"Recompiled changed configuration of '{environment}'")
+
+        entry = _CompiledEntry(
+            stamps=stamps, digests=digests, config=config, expires=expires
+        )
+        self._compiled[key] = entry
+        return entry
+
+    def get(
+        self,
+        environment: str,
+        config_dir: Optional[Union[str, Path]] = None,
+        overrides: Optional[Mapping[str, Any]] = None,
+        resolver: Optional[ParameterResolver] = None,
+    ) -> FrozenConfig:
+        """Get the compiled configuration of an environment.
 
         Args:
             environment: Name of the environment. Must match the name of a JSON config file.
+            config_dir: Directory containing the config file (defaults to the
+                directory of the registry)
+            overrides: Values overriding all layers, e.g. from the CLI context
+            resolver: Resolver of parameter references, references are kept
+                as they are without one
+
+        Returns:
+            The configuration as a read-only mapping.
+
+        Raises:
+            FileNotFoundError: If the config file doesn't exist.
+            json.JSONDecodeError: If the config file contains invalid JSON.
+            ConfigResolutionError: If referenced parameters don't exist.
         """
+        with self._lock:
+            return self._compile(environment, config_dir, overrides, resolver).config
+
+    def get_typed(
+        self,
+        environment: str,
+        schema: Type[SchemaT],
+        config_dir: Optional[Union[str, Path]] = None,
+        overrides: Optional[Mapping[str, Any]] = None,
+        resolver: Optional[ParameterResolver] = None,
+    ) -> SchemaT:
+        """Get the configuration of an environment validated against a schema.
+
+        The configuration is validated once per compiled version and schema.
+
+        Args:
+            environment: Name of the environment. Must match the name of a JSON config file.
+            schema: Dataclass describing the configuration
+            config_dir: Directory containing the config file (defaults to the
+                directory of the registry)
+            overrides: Values overriding all layers, e.g. from the CLI context
+            resolver: Resolver of parameter references, references are kept
+                as they are without one
+
+        Returns:
+            An instance of the schema.
+
+        Raises:
+            FileNotFoundError: If the config file doesn't exist.
+            json.JSONDecodeError: If the config file contains invalid JSON.
+            ConfigResolutionError: If referenced parameters don't exist.
+            ConfigValidationError: If the configuration does not match the schema.
+        """
+        with self._lock:
+            entry = self._compile(environment, config_dir, overrides, resolver)
+            if schema not in entry.validated:
+                entry.validated[schema] = validate(schema, entry.config, environment)
+            return entry.validated[schema]
+
+    def compile_snapshot(
+        self,
+        config_dir: Optional[Union[str, Path]] = None,
+        schema: Optional[Type[Any]] = None,
+    ) -> Path:
+        """Merge all environments of a config directory into a snapshot.
+
+        Args:
+            config_dir: Directory containing the config files (defaults to the
+                directory of the registry)
+            schema: Dataclass every environment is validated against
+
+        Returns:
+            Path of the snapshot file.
+
+        Raises:
+            FileNotFoundError: If a group file doesn't exist.
+            json.JSONDecodeError: If a config file contains invalid JSON.
+            ConfigValidationError: If environments don't match the schema.
+        """
+        config_dir = Path(config_dir or self.config_dir)
+        environments: Dict[str, Dict[str, Any]] = {}
+        errors: List[str] = []
+
+        with self._lock:
+            for name in config_files(config_dir):
+                if "/" in name or name.startswith("_"):
+                    continue
+                environment = name[: -len(".json")]
+                layers = self._layers(config_dir, environment)
+                merged = merge_layers(*(layer.data for _, layer in layers if layer))
+                if schema is not None:
+                    try:
+                        validate(schema, merged, environment)
+                    except ConfigValidationError as e:
+                        errors.extend(f"{environment}: {error}" for error in e.errors)
+                environments[environment] = merged
+
+        if errors:
+            raise ConfigValidationError(str(config_dir), errors)
+
+        schema_name = f"{schema.__module__}:{schema.__qualname__}" if schema else None
+        path = write_snapshot(config_dir, environments, schema_name)
+        logger.info(f"Compiled {len(environments)} environments into {path}")
+        return path
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Get the cache hit, miss and reload counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "entries": len(self._compiled),
+        }
+
+    def clear(self) -> None:
+        """Drop all parsed files and reset the counters."""
+        with self._lock:
+            self._files.clear()
+            self._snapshots.clear()
+            self._compiled.clear()
+            self.hits = self.misses = self.reloads = 0
+
+
+# Registry shared by all CDKConfig instances of the process
+config_registry = ConfigRegistry()
+
+# Marker for missing keys, None is a valid config value
+_MISSING = object()
+
+
+class CDKConfig(Generic[SchemaT]):
+    """Generate CDK config object for multi environment deployments.
+
+    Args:
+        environment: Name of the environment. Must match the name of a JSON config file.
+        config_dir: Directory containing the environment JSON files
+        registry: Registry caching the compiled configurations
+        overrides: Values overriding all config layers, see context_overrides
+        schema: Dataclass the configuration is validated against on load,
+            its instance is available as ``typed``
+        resolver: Resolver of ``ssm:`` parameter references, see
+            azure_pipelines.load_env.resolver
+    """
+
+    def __init__(
+        self,
+        environment: str,
+        config_dir: Union[str, Path] = "config",
+        registry: Optional[ConfigRegistry] = None,
+        overrides: Optional[Mapping[str, Any]] = None,
+        schema: Optional[Type[SchemaT]] = None,
+        resolver: Optional[ParameterResolver] = None,
+    ) -> None:
+        """Initialize config object."""
         self._environment = environment
-        self.data: Dict[str, Any] = {}
+        self._config_dir = config_dir
+        self._registry = registry or config_registry
+        self._overrides = overrides
+        self._schema = schema
+        self._resolver = resolver
+        self._typed: Optional[SchemaT] = None
+        self.data: Mapping[str, Any] = FrozenConfig({})
         self.load_config()
 
-    def load_config(self) -> Dict[str, Any]:
+    @property
+    def typed(self) -> SchemaT:
+        """Get the configuration as instance of the schema.
+
+        Raises:
+            AttributeError: If the config object was created without a schema.
+        """
+        if self._typed is None:
+            raise AttributeError(
+                f"Configuration '{self._environment}' was loaded without a schema"
+            )
+        return self._typed
+
+    def load_config(self) -> Mapping[str, Any]:
         """Load the config from the environment-specific JSON file.
 
+        The base, group and environment layers and the overrides are merged
+        and their parameter references resolved once per process, the
+        returned mapping is shared and read-only.
+
         Returns:
-            The loaded configuration as a dictionary.
+            The loaded configuration as a read-only mapping.
 
         Raises:
             FileNotFoundError: If the config file doesn't exist.
             json.JSONDecodeError: If the config file contains invalid JSON.
+            ConfigResolutionError: If referenced parameters don't exist.
+            ConfigValidationError: If the configuration does not match the schema.
         """
         try:
-            with open(f"config/{self._environment}.json") as json_file:
-                self.data = json.load(json_file)
+            self.data = self._registry.get(
+                self._environment, self._config_dir, self._overrides, self._resolver
+            )
+            if self._schema is not None:
+                self._typed = self._registry.get_typed(
+                    self._environment,
+                    self._schema,
+                    self._config_dir,
+                    self._overrides,
+                    self._resolver,
+                )
             return self.data
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logger.error(f"Failed to load config file: {e}")
@@ -42,17 +440,20 @@ class CDKConfig:
         """Get value from config object.
 
         Args:
-            key: Name of the key to retrieve.
+            key: Name of the key to retrieve, nested values are addressed by
+                dotted paths like "Network.VpcCidr".
             default: Value to return if key is not found (defaults to None).
 
         Returns:
             The value associated with the key or the default value if not found.
         """
-        try:
-            return self.data[key]
-        except KeyError:
-            logger.error(
-                f"Key '{key}' not found in configuration for environment '{self._environment}'"
-            )
+        value = self.data.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        logger.error(
+            f"Key '{key}' not found in configuration for environment '{self._environment}'"
+        )
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"Available keys: {list(self.data.keys())}")
-            return default
+        return default
@@ -0,0 +1,196 @@
+"""Module for merging configuration layers into a frozen lookup table.
+
+The configuration of an environment is merged from up to four layers, later
+layers override earlier ones:
+
+1. ``config/_base.json``: defaults shared by all environments
+2. ``config/_groups/<group>.json``: defaults of an account group, selected by
+   the ``"$group"`` key of the environment file
+3. ``config/<environment>.json``: the environment itself
+4. CLI context overrides, e.g. ``--context config.QueueName=my-queue``
+
+Nested objects are merged key by key, all other values are replaced.
+"""
+
+import json
+from collections import abc
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, NoReturn
+
+# Keys starting with this prefix control the merge and are removed afterwards
+META_PREFIX = "$"
+
+# Context key holding configuration overrides
+CONTEXT_KEY = "config"
+
+# JSON leaf types, checked first as they are cheaper to test than abc.Mapping
+_SCALARS = (str, int, float, bool, type(None))
+
+# Marks a missing path, None is a valid configuration value
+_MISSING = object()
+
+
+def _freeze(value: Any) -> Any:
+    """Turn parsed JSON into read-only mappings and tuples."""
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, abc.Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Copy a frozen value into plain dictionaries and lists.
+
+    jsii only accepts plain dictionaries and lists as construct props, and
+    changes to the copy do not leak into the shared configuration.
+    """
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, abc.Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def merge_layers(*layers: Mapping[str, Any]) -> Dict[str, Any]:
+    """Merge configuration layers.
+
+    Args:
+        *layers: Layers in ascending order of precedence
+
+    Returns:
+        The merged configuration without meta keys.
+    """
+    merged: Dict[str, Any] = {}
+    for layer in layers:
+        _merge_into(merged, layer)
+    return {
+        key: value for key, value in merged.items() if not key.startswith(META_PREFIX)
+    }
+
+
+def _merge_into(target: Dict[str, Any], layer: Mapping[str, Any]) -> None:
+    """Merge a layer into the target in place."""
+    for key, value in layer.items():
+        if isinstance(value, _SCALARS) or not isinstance(value, abc.Mapping):
+            target[key] = value
+        elif isinstance(target.get(key), dict):
+            _merge_into(target[key], value)
+        else:
+            target[key] = {}
+            _merge_into(target[key], value)
+
+
+def context_overrides(context: Mapping[str, Any]) -> Dict[str, Any]:
+    """Extract configuration overrides from the CDK context.
+
+    Overrides are passed as JSON object in the ``config`` context key or as
+    single dotted paths, e.g. ``--context config.Network.VpcCidr=10.0.0.0/16``.
+
+    Args:
+        context: The CDK context
+
+    Returns:
+        The overrides as nested dictionary.
+    """
+    overrides: Dict[str, Any] = {}
+    value = context.get(CONTEXT_KEY)
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, abc.Mapping):
+        _merge_into(overrides, value)
+
+    prefix = f"{CONTEXT_KEY}."
+    for key, value in context.items():
+        if not key.startswith(prefix):
+            continue
+        *parents, name = key[len(prefix) :].split(".")  # noqa: E203
+        target = overrides
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = value
+    return overrides
+
+
+class FrozenConfig(Mapping):
+    """Immutable configuration with constant time lookups of dotted paths.
+
+    All paths are computed once, ``config["Network.VpcCidr"]`` is a single
+    dictionary lookup. Iterating yields the top level keys. Keys must not
+    contain dots. Nested values are stored read-only and returned as plain
+    dictionary and list copies.
+
+    Args:
+        data: The merged configuration
+    """
+
+    __slots__ = ("_data", "_paths")
+
+    def __init__(self, data: Mapping[str, Any]) -> None:
+        """Freeze the configuration and index all paths."""
+        paths: Dict[str, Any] = {}
+        frozen = self._freeze_index(data, "", paths)
+        object.__setattr__(self, "_data", frozen)
+        object.__setattr__(self, "_paths", MappingProxyType(paths))
+
+    @staticmethod
+    def _freeze_index(
+        value: Mapping[str, Any], prefix: str, paths: Dict[str, Any]
+    ) -> Mapping[str, Any]:
+        """Freeze a mapping and add the paths of all nested values in one pass."""
+        items: Dict[str, Any] = {}
+        for key, item in value.items():
+            path = f"{prefix}{key}"
+            if isinstance(item, _SCALARS):
+                pass
+            elif isinstance(item, abc.Mapping):
+                item = FrozenConfig._freeze_index(item, f"{path}.", paths)
+            else:
+                item = _freeze(item)
+            items[key] = item
+            paths[path] = item
+        return MappingProxyType(items)
+
+    def __setattr__(self, name: str, value: Any) -> NoReturn:
+        """Reject attribute changes."""
+        raise AttributeError("FrozenConfig is read-only")
+
+    def __delattr__(self, name: str) -> NoReturn:
+        """Reject attribute deletion."""
+        raise AttributeError("FrozenConfig is read-only")
+
+    def __getitem__(self, path: str) -> Any:
+        """Get the value of a top level key or a dotted path."""
+        return _thaw(self._paths[path])
+
+    def __contains__(self, path: object) -> bool:
+        """Check whether a top level key or a dotted path exists."""
+        return path in self._paths
+
+    def get(self, path: str, default: Any = None) -> Any:
+        """Get the value of a top level key or a dotted path without raising."""
+        value = self._paths.get(path, _MISSING)
+        if value is _MISSING:
+            return default
+        return _thaw(value)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the top level keys."""
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        """Get the number of top level keys."""
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        """Show the top level configuration."""
+        return f"FrozenConfig({dict(self._data)!r})"
+
+    @property
+    def paths(self) -> Mapping[str, Any]:
+        """Get all dotted paths and their values."""
+        return self._paths
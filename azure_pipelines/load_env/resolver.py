@@ -0,0 +1,253 @@
+"""Module for resolving parameter references in configurations.
+
+String values of the form ``ssm:<parameter name>`` are replaced by the value of
+the SSM parameter in the region of the environment (``AWSRegion``)::
+
+    {"QueueName": "ssm:/platform/queue-name"}
+
+All references of a configuration are collected first and fetched with
+``GetParameters`` in batches of 10 names. Resolved values are cached on disk
+for ``ttl`` seconds, repeated synths in the same pipeline job don't call the
+API again.
+
+Secrets are never written to the template or the cache. SecureString
+parameters and ``secretsmanager:<secret id>[:<json key>]`` references become
+CloudFormation dynamic references that are resolved during the deployment.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import abc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Union
+
+from azure_pipelines.logging_config import get_logger
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Prefix of values resolved from the SSM parameter store
+SSM_PREFIX = "ssm:"
+
+# Prefix of values resolved from Secrets Manager during the deployment
+SECRETS_MANAGER_PREFIX = "secretsmanager:"
+
+# Maximum number of names of a single GetParameters call
+BATCH_SIZE = 10
+
+# Default file caching resolved parameters, relative to the working directory
+CACHE_FILE = Path(".config-cache") / "parameters.json"
+
+# Default seconds resolved parameters are reused
+DEFAULT_TTL = 900
+
+# Version of the cache file format, other versions are ignored
+CACHE_VERSION = 1
+
+
+class ConfigResolutionError(ValueError):
+    """Raised if referenced parameters don't exist.
+
+    Args:
+        region: Region the parameters were looked up in
+        names: Names of the missing parameters
+    """
+
+    def __init__(self, region: Optional[str], names: List[str]) -> None:
+        """Initialize the error with all missing parameters."""
+        self.region = region
+        self.names = names
+        super().__init__(
+            f"SSM parameters not found in {region or 'default region'}: "
+            f"{', '.join(names)}"
+        )
+
+
+def parameter_references(value: Any) -> Iterator[str]:
+    """Yield the names of all SSM parameters referenced in a value."""
+    if isinstance(value, str):
+        if value.startswith(SSM_PREFIX):
+            yield value[len(SSM_PREFIX) :]  # noqa: E203
+    elif isinstance(value, abc.Mapping):
+        for item in value.values():
+            yield from parameter_references(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from parameter_references(item)
+
+
+def _secret_reference(reference: str) -> str:
+    """Turn a secretsmanager reference into a CloudFormation dynamic reference."""
+    secret_id, _, json_key = reference.partition(":")
+    return f"{{{{resolve:secretsmanager:{secret_id}:SecretString:{json_key}}}}}"
+
+
+def _parameter_value(parameter: Mapping[str, Any]) -> Any:
+    """Get the config value of a parameter returned by GetParameters."""
+    if parameter["Type"] == "SecureString":
+        return f"{{{{resolve:ssm-secure:{parameter['Name']}}}}}"
+    if parameter["Type"] == "StringList":
+        return parameter["Value"].split(",")
+    return parameter["Value"]
+
+
+class ParameterResolver:
+    """Resolve ``ssm:`` references of configurations in batches.
+
+    Args:
+        cache_file: File caching resolved parameters, None disables the cache
+        ttl: Seconds resolved parameters are reused
+        client_factory: Callable returning an SSM client for a region,
+            defaults to boto3 clients
+        region_key: Config key holding the region of the parameters
+    """
+
+    def __init__(
+        self,
+        cache_file: Optional[Union[str, Path]] = CACHE_FILE,
+        ttl: float = DEFAULT_TTL,
+        client_factory: Optional[Callable[[Optional[str]], Any]] = None,
+        region_key: str = "AWSRegion",
+    ) -> None:
+        """Initialize the resolver."""
+        self.cache_file = Path(cache_file) if cache_file is not None else None
+        self.ttl = ttl
+        self.client_factory = client_factory or self._boto3_client
+        self.region_key = region_key
+        self.api_calls = 0
+        self._clients: Dict[Optional[str], Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _boto3_client(region: Optional[str]) -> Any:
+        """Create an SSM client, boto3 is only needed if parameters are referenced."""
+        import boto3
+
+        return boto3.client("ssm", region_name=region)
+
+    def _client(self, region: Optional[str]) -> Any:
+        """Get the cached client of a region."""
+        if region not in self._clients:
+            self._clients[region] = self.client_factory(region)
+        return self._clients[region]
+
+    def _load_cache(self) -> Dict[str, Any]:
+        """Load the cached parameters, an unreadable cache is empty."""
+        if self.cache_file is None:
+            return {}
+        try:
+            with open(self.cache_file) as cache_file:
+                cache = json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if cache.get("version") != CACHE_VERSION:
+            return {}
+        return cache.get("parameters", {})
+
+    def _save_cache(self, parameters: Dict[str, Any]) -> None:
+        """Write the cached parameters, readable only by the owner."""
+        if self.cache_file is None:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as cache_file:
+            json.dump({"version": CACHE_VERSION, "parameters": parameters}, cache_file)
+        os.replace(temporary, self.cache_file)
+
+    def fetch(self, names: List[str], region: Optional[str] = None) -> Dict[str, Any]:
+        """Get the values of SSM parameters, using the cache where possible.
+
+        Args:
+            names: Names of the parameters
+            region: Region of the parameters (defaults to the region of boto3)
+
+        Returns:
+            The config values by parameter name.
+
+        Raises:
+            ConfigResolutionError: If parameters don't exist.
+        """
+        with self._lock:
+            cache = self._load_cache()
+            regional = cache.setdefault(region or "", {})
+            now = time.time()
+
+            values: Dict[str, Any] = {}
+            missing: List[str] = []
+            for name in dict.fromkeys(names):
+                entry = regional.get(name)
+                if entry is not None and now - entry["fetchedAt"] < self.ttl:
+                    values[name] = entry["value"]
+                else:
+                    missing.append(name)
+
+            if not missing:
+                return values
+
+            not_found: List[str] = []
+            batches = 0
+            client = self._client(region)
+            for start in range(0, len(missing), BATCH_SIZE):
+                batch = missing[start : start + BATCH_SIZE]  # noqa: E203
+                response = client.get_parameters(Names=batch, WithDecryption=False)
+                self.api_calls += 1
+                batches += 1
+                for parameter in response["Parameters"]:
+                    value = _parameter_value(parameter)
+                    values[parameter["Name"]] = value
+                    regional[parameter["Name"]] = {"value": value, "fetchedAt": now}
+                not_found.extend(response.get("InvalidParameters", []))
+
+            logger.info(
+                f"Resolved {len(missing) - len(not_found)} SSM parameters "
+                f"in {batches} API calls"
+            )
+            self._save_cache(cache)
+            if not_found:
+                raise ConfigResolutionError(region, sorted(not_found))
+            return values
+
+    def _substitute(self, value: Any, values: Mapping[str, Any]) -> Any:
+        """Replace the references of a value by resolved values."""
+        if isinstance(value, str):
+            if value.startswith(SSM_PREFIX):
+                return values[value[len(SSM_PREFIX) :]]  # noqa: E203
+            if value.startswith(SECRETS_MANAGER_PREFIX):
+                return _secret_reference(
+                    value[len(SECRETS_MANAGER_PREFIX) :]  # noqa: E203
+                )
+            return value
+        if isinstance(value, abc.Mapping):
+            return {key: self._substitute(item, values) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._substitute(item, values) for item in value]
+        return value
+
+    def resolve(self, config: Mapping[str, Any]) -> Dict[str, Any]:
+        """Replace all parameter references of a configuration.
+
+        Args:
+            config: The merged configuration
+
+        Returns:
+            A copy of the configuration with resolved references.
+
+        Raises:
+            ConfigResolutionError: If referenced parameters don't exist.
+        """
+        names = list(parameter_references(config))
+        region = config.get(self.region_key)
+        values = self.fetch(names, region) if names else {}
+        return self._substitute(config, values)
+
+    def clear(self) -> None:
+        """Delete the cache file."""
+        if self.cache_file is not None and self.cache_file.exists():
+            self.cache_file.unlink()
+
+
+# Resolver shared by all configurations of the process
+parameter_resolver = ParameterResolver()
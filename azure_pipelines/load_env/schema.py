@@ -0,0 +1,185 @@
+r"""Module for validating configurations against a dataclass schema.
+
+A schema is a frozen dataclass whose fields are declared with ``setting``,
+mapping the config key to a typed attribute::
+
+    @dataclass(frozen=True)
+    class AppConfig:
+        account_id: str = setting("AccountId", pattern=r"\d{12}")
+        queue_name: Optional[str] = setting("QueueName", default=None)
+
+``validate`` checks all keys at once and returns an instance of the schema, so
+missing or mistyped keys fail before the app is synthesized and lookups are
+plain attribute accesses afterwards.
+"""
+
+import dataclasses
+import re
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+# Instance of a schema dataclass
+SchemaT = TypeVar("SchemaT")
+
+# Metadata keys of a setting
+KEY = "config_key"
+PATTERN = "config_pattern"
+
+
+class ConfigValidationError(ValueError):
+    """Raised if a configuration does not match its schema.
+
+    Args:
+        source: Name of the validated configuration
+        errors: Description of every invalid key
+    """
+
+    def __init__(self, source: str, errors: List[str]) -> None:
+        """Initialize the error with all validation errors."""
+        self.source = source
+        self.errors = errors
+        details = "\n".join(f"  - {error}" for error in errors)
+        super().__init__(f"Invalid configuration '{source}':\n{details}")
+
+
+def setting(
+    key: str,
+    default: Any = dataclasses.MISSING,
+    pattern: Optional[str] = None,
+) -> Any:
+    """Declare a schema field read from a config key.
+
+    Args:
+        key: Key of the value in the configuration
+        default: Value if the key is missing, the key is required without it
+        pattern: Regular expression string values must match completely
+
+    Returns:
+        The dataclass field.
+    """
+    return dataclasses.field(default=default, metadata={KEY: key, PATTERN: pattern})
+
+
+def _type_name(expected: Any) -> str:
+    """Get a readable name of a type annotation."""
+    return getattr(expected, "__name__", None) or str(expected).replace("typing.", "")
+
+
+def _check(value: Any, expected: Any, path: str, errors: List[str]) -> Any:
+    """Check a value against a type annotation and convert nested schemas."""
+    origin = get_origin(expected)
+
+    if expected is Any:
+        return value
+
+    if origin is Union:
+        options = get_args(expected)
+        if value is None and type(None) in options:
+            return None
+        candidates = [option for option in options if option is not type(None)]
+        for option in candidates:
+            option_errors: List[str] = []
+            converted = _check(value, option, path, option_errors)
+            if not option_errors:
+                return converted
+        errors.append(f"{path}: expected {_type_name(expected)}, got {value!r}")
+        return value
+
+    if dataclasses.is_dataclass(expected):
+        if not isinstance(value, Mapping):
+            errors.append(f"{path}: expected an object, got {value!r}")
+            return value
+        return _build(expected, value, f"{path}.", errors)
+
+    if origin in (tuple, list) or expected in (tuple, list):
+        if not isinstance(value, (tuple, list)):
+            errors.append(f"{path}: expected a list, got {value!r}")
+            return value
+        args = get_args(expected)
+        item_type = args[0] if args else Any
+        return tuple(
+            _check(item, item_type, f"{path}[{index}]", errors)
+            for index, item in enumerate(value)
+        )
+
+    if origin in (dict, Mapping) or expected in (dict, Mapping):
+        if not isinstance(value, Mapping):
+            errors.append(f"{path}: expected an object, got {value!r}")
+        return value
+
+    # bool is a subclass of int, but true is not a valid port number
+    if expected in (int, float) and isinstance(value, bool):
+        errors.append(f"{path}: expected {_type_name(expected)}, got {value!r}")
+    elif expected is float and isinstance(value, int):
+        return float(value)
+    elif isinstance(expected, type) and not isinstance(value, expected):
+        errors.append(f"{path}: expected {_type_name(expected)}, got {value!r}")
+    return value
+
+
+def _build(
+    schema: Type[SchemaT], data: Mapping[str, Any], prefix: str, errors: List[str]
+) -> SchemaT:
+    """Build a schema instance, collecting all errors."""
+    hints = get_type_hints(schema)
+    values: Dict[str, Any] = {}
+
+    for schema_field in dataclasses.fields(schema):
+        key = schema_field.metadata.get(KEY, schema_field.name)
+        path = f"{prefix}{key}"
+        if key not in data:
+            if (
+                schema_field.default is dataclasses.MISSING
+                and schema_field.default_factory is dataclasses.MISSING
+            ):
+                errors.append(f"{path}: missing required key")
+            continue
+
+        value = _check(data[key], hints[schema_field.name], path, errors)
+        pattern = schema_field.metadata.get(PATTERN)
+        if pattern and isinstance(value, str) and not re.fullmatch(pattern, value):
+            errors.append(f"{path}: {value!r} does not match {pattern!r}")
+        values[schema_field.name] = value
+
+    if errors:
+        # The instance is discarded, required fields may be missing
+        return None  # type: ignore[return-value]
+    return schema(**values)
+
+
+def validate(
+    schema: Type[SchemaT], data: Mapping[str, Any], source: str = "config"
+) -> SchemaT:
+    """Validate a configuration against a schema.
+
+    Args:
+        schema: Dataclass describing the configuration
+        data: The configuration
+        source: Name of the configuration used in error messages
+
+    Returns:
+        An instance of the schema holding the typed values.
+
+    Raises:
+        ConfigValidationError: If keys are missing or have the wrong type.
+        TypeError: If the schema is not a dataclass.
+    """
+    if not dataclasses.is_dataclass(schema):
+        raise TypeError(f"Config schema {schema!r} is not a dataclass")
+
+    errors: List[str] = []
+    instance = _build(schema, data, "", errors)
+    if errors:
+        raise ConfigValidationError(source, errors)
+    return instance
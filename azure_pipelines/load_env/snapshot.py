@@ -0,0 +1,184 @@
+"""Module for precompiled snapshots of the config directory.
+
+``python -m azure_pipelines.load_env compile`` merges the layers of every
+environment, validates them and writes the result to ``config/_snapshot.bin``.
+Loading the snapshot is a single ``marshal.loads`` instead of parsing and
+merging several JSON files per environment.
+
+The snapshot records the modification time and size of every JSON file it was
+compiled from. If a file changed, was added or removed, the snapshot is
+ignored and the JSON files are loaded as before.
+"""
+
+import hashlib
+import marshal
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from azure_pipelines.logging_config import get_logger
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Name of the snapshot file in the config directory
+SNAPSHOT_FILE = "_snapshot.bin"
+
+# Leading bytes identifying a snapshot file
+MAGIC = b"CDKCFG"
+
+# Version of the snapshot format, other versions are ignored
+FORMAT_VERSION = 1
+
+# Stat of a config file: modification time in ns and size, None if missing
+Stamp = Optional[Tuple[int, int]]
+
+
+def file_stamp(path: Union[str, Path]) -> Stamp:
+    """Get the modification time and size of a file.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        The modification time in ns and the size, None if the file is missing.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def config_files(config_dir: Union[str, Path]) -> List[str]:
+    """List all JSON layer files of a config directory.
+
+    Args:
+        config_dir: Directory containing the environment JSON files
+
+    Returns:
+        Sorted paths relative to the config directory.
+    """
+    config_dir = Path(config_dir)
+    return sorted(
+        path.relative_to(config_dir).as_posix()
+        for pattern in ("*.json", "_groups/*.json")
+        for path in config_dir.glob(pattern)
+    )
+
+
+@dataclass
+class Snapshot:
+    """Merged configurations of all environments of a config directory.
+
+    Args:
+        config_dir: Directory the snapshot was compiled from
+        sources: Relative paths of all JSON files and their stamps
+        environments: Merged configuration by environment name
+        schema: Import path of the schema the environments were validated
+            against, None if they were not validated
+        digest: Content hash of the snapshot file
+    """
+
+    config_dir: Path
+    sources: Tuple[Tuple[str, Stamp], ...]
+    environments: Dict[str, Dict[str, Any]]
+    schema: Optional[str]
+    digest: str
+    # Stamps of the directories when their listing last matched the sources
+    _listed: Optional[Tuple[Stamp, Stamp]] = field(
+        default=None, repr=False, compare=False
+    )
+
+    @property
+    def stamps(self) -> Tuple[Tuple[Path, Stamp], ...]:
+        """Get the absolute paths of all sources and their stamps."""
+        return tuple((self.config_dir / name, stamp) for name, stamp in self.sources)
+
+    def is_fresh(self) -> bool:
+        """Check whether no config file changed since the snapshot was compiled.
+
+        The directories are only listed again if their modification time
+        changed, i.e. files were added, removed or replaced.
+        """
+        directories = (
+            file_stamp(self.config_dir),
+            file_stamp(self.config_dir / "_groups"),
+        )
+        if directories != self._listed:
+            if [name for name, _ in self.sources] != config_files(self.config_dir):
+                return False
+            self._listed = directories
+        return all(file_stamp(path) == stamp for path, stamp in self.stamps)
+
+
+def write_snapshot(
+    config_dir: Union[str, Path],
+    environments: Dict[str, Dict[str, Any]],
+    schema: Optional[str] = None,
+) -> Path:
+    """Write the snapshot of a config directory.
+
+    Args:
+        config_dir: Directory containing the environment JSON files
+        environments: Merged configuration by environment name
+        schema: Import path of the schema the environments were validated against
+
+    Returns:
+        Path of the snapshot file.
+    """
+    config_dir = Path(config_dir)
+    sources = [
+        [name, file_stamp(config_dir / name)] for name in config_files(config_dir)
+    ]
+    payload = marshal.dumps(
+        {"sources": sources, "environments": environments, "schema": schema}
+    )
+
+    path = config_dir / SNAPSHOT_FILE
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary, "wb") as snapshot_file:
+        snapshot_file.write(MAGIC + bytes([FORMAT_VERSION, marshal.version]) + payload)
+    os.replace(temporary, path)
+    return path
+
+
+def load_snapshot(config_dir: Union[str, Path]) -> Optional[Snapshot]:
+    """Load the snapshot of a config directory.
+
+    Args:
+        config_dir: Directory containing the environment JSON files
+
+    Returns:
+        The snapshot or None if there is none or it was written by another
+        format version.
+    """
+    config_dir = Path(config_dir)
+    try:
+        with open(config_dir / SNAPSHOT_FILE, "rb") as snapshot_file:
+            content = snapshot_file.read()
+    except FileNotFoundError:
+        return None
+
+    header = MAGIC + bytes([FORMAT_VERSION, marshal.version])
+    if not content.startswith(header):
+        logger.warning(f"Ignoring config snapshot of another version in {config_dir}")
+        return None
+
+    try:
+        payload = marshal.loads(content[len(header) :])  # noqa: E203
+    except (EOFError, ValueError, TypeError):
+        logger.warning(f"Ignoring corrupt config snapshot in {config_dir}")
+        return None
+
+    return Snapshot(
+        config_dir=config_dir,
+        sources=tuple(
+            (name, tuple(stamp) if stamp else None)
+            for name, stamp in payload["sources"]
+        ),
+        environments=payload["environments"],
+        schema=payload["schema"],
+        digest=hashlib.sha256(content).hexdigest(),
+    )
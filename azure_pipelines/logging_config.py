@@ -5,22 +5,485 @@ It includes configuration for console and file logging with different log levels
 formatting options, and rotation policies.
 """
 
+import atexit
+import copy
+import gzip
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import shutil
 import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+# Environment variable enabling logging through a background thread
+QUEUE_ENV_VAR = "AZURE_PIPELINES_LOG_QUEUE"
+
+# Environment variable selecting the output format, "json" or "text"
+FORMAT_ENV_VAR = "AZURE_PIPELINES_LOG_FORMAT"
+
+# Environment variable setting the log directory and enabling file output
+LOG_DIR_ENV_VAR = "AZURE_PIPELINES_LOG_DIR"
+
+# Log directory used if file output is requested without AZURE_PIPELINES_LOG_DIR
+DEFAULT_LOG_DIR = "logs"
+
+# Log file shared by all loggers of a process unless they name their own
+DEFAULT_LOG_FILE = "azure_pipelines.log"
+
+
+class StructuredMessage:
+    """Log message with key/value fields, rendered only when it is written.
+
+    ``str()`` renders the message followed by the fields in logfmt style, e.g.
+    ``Sent PR comment url=https://... status=200``. The JsonFormatter writes the
+    fields as separate JSON keys instead.
+
+    Args:
+        message: Constant description of the event
+        fields: Values describing the event
+    """
+
+    __slots__ = ("message", "fields", "_rendered")
+
+    def __init__(self, message: str, fields: Dict[str, Any]) -> None:
+        """Initialize the message without rendering it."""
+        self.message = message
+        self.fields = fields
+        self._rendered: Optional[str] = None
+
+    def __str__(self) -> str:
+        """Render the message and its fields once."""
+        if self._rendered is None:
+            parts = [self.message]
+            for key, value in self.fields.items():
+                text = str(value)
+                if not text or any(char in text for char in ' "='):
+                    text = json.dumps(text)
+                parts.append(f"{key}={text}")
+            self._rendered = " ".join(parts)
+        return self._rendered
+
+    def __repr__(self) -> str:
+        """Show the message and its fields."""
+        return f"StructuredMessage({self.message!r}, {self.fields!r})"
+
+
+def log_event(
+    logger: logging.Logger,
+    level: int,
+    message: str,
+    exc_info: bool = False,
+    **fields: Any,
+) -> None:
+    """Log an event with key/value fields.
+
+    Nothing is rendered or allocated beyond the call if the level is disabled::
+
+        log_event(logger, logging.INFO, "Sent PR comment", url=url, status=200)
+
+    Args:
+        logger: Logger to write the event to
+        level: Logging level of the event
+        message: Constant description of the event
+        exc_info: Whether to add the exception currently being handled
+        **fields: Values describing the event
+    """
+    if logger.isEnabledFor(level):
+        logger.log(
+            level, StructuredMessage(message, fields), exc_info=exc_info, stacklevel=2
+        )
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    """Encode a log entry as JSON, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode()
+    return json.dumps(data, default=str, separators=(",", ":"))
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line for log stores.
+
+    Fields of structured messages become top level keys next to
+    ``timestamp``, ``level``, ``logger`` and ``message``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record as JSON."""
+        entry: Dict[str, Any] = {}
+        if isinstance(record.msg, StructuredMessage):
+            entry.update(record.msg.fields)
+            message = record.msg.message
+        else:
+            message = record.getMessage()
+
+        entry["timestamp"] = datetime.fromtimestamp(
+            record.created, timezone.utc
+        ).isoformat(timespec="milliseconds")
+        entry["level"] = record.levelname
+        entry["logger"] = record.name
+        entry["message"] = message
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return _dumps(entry)
+
+
+class BufferedRotatingFileHandler(logging.Handler):
+    """File handler collecting records in memory and writing them in batches.
+
+    ``emit`` only formats the record and appends it to a buffer. A background
+    thread writes the buffer once it holds ``buffer_bytes`` or every
+    ``flush_interval`` seconds, without fsync. Before a batch would grow the
+    file beyond ``max_bytes`` the file is renamed to a timestamped segment,
+    which another thread compresses to ``<file>.<timestamp>.gz``. Only the
+    newest ``backup_count`` compressed segments are kept.
+
+    Args:
+        filename: Path of the log file
+        max_bytes: Size of the log file before rotation, 0 never rotates
+        backup_count: Number of compressed segments to keep
+        buffer_bytes: Buffered size that triggers a write
+        flush_interval: Maximum seconds a record stays in the buffer
+        encoding: Encoding of the log file
+    """
+
+    def __init__(
+        self,
+        filename: Union[str, "os.PathLike[str]"],
+        max_bytes: int = 10485760,
+        backup_count: int = 5,
+        buffer_bytes: int = 65536,
+        flush_interval: float = 1.0,
+        encoding: str = "utf-8",
+    ) -> None:
+        """Open the log file and start the flush thread."""
+        super().__init__()
+        self.path = Path(filename).absolute()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self.encoding = encoding
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._stream = open(self.path, "ab")
+        self._size = self._stream.tell()
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        # Guards the buffer, logging.shutdown() holds self.lock while closing
+        self._buffer_lock = threading.Lock()
+        # Serializes writes and rotations
+        self._write_lock = threading.Lock()
+        self._compressor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="log-compress"
+        )
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="log-flush", daemon=True
+        )
+        self._flusher.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Format the record into the buffer and wake the flush thread if full."""
+        try:
+            data = (self.format(record) + "\n").encode(self.encoding)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._buffer_lock:
+            self._buffer.append(data)
+            self._buffered += len(data)
+            full = self._buffered >= self.buffer_bytes
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Write the buffered records to the log file, rotating it when full."""
+        with self._write_lock:
+            with self._buffer_lock:
+                if not self._buffer:
+                    return
+                records = self._buffer
+                self._buffer = []
+                self._buffered = 0
+            if self._stream.closed:
+                return
+
+            batch: List[bytes] = []
+            for data in records:
+                if (
+                    self.max_bytes > 0
+                    and self._size
+                    and self._size + len(data) > self.max_bytes
+                ):
+                    self._stream.write(b"".join(batch))
+                    batch = []
+                    self._rotate()
+                batch.append(data)
+                self._size += len(data)
+            self._stream.write(b"".join(batch))
+            self._stream.flush()
+
+    def close(self) -> None:
+        """Write the remaining records, wait for compression and close the file."""
+        with self._buffer_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        if self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+        with self._write_lock:
+            self._stream.close()
+        self._compressor.shutdown(wait=True)
+        super().close()
+
+    def _flush_periodically(self) -> None:
+        """Write the buffer when it is full or the flush interval passed."""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                if logging.raiseExceptions:
+                    traceback.print_exc(file=sys.stderr)
+
+    def _rotate(self) -> None:
+        """Rename the log file to a segment and compress it in the background."""
+        self._stream.close()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        segment = self.path.with_name(f"{self.path.name}.{stamp}")
+        while segment.exists() or segment.with_name(f"{segment.name}.gz").exists():
+            stamp = f"{stamp}0"
+            segment = self.path.with_name(f"{self.path.name}.{stamp}")
+        os.replace(self.path, segment)
+        self._stream = open(self.path, "ab")
+        self._size = 0
+        try:
+            self._compressor.submit(self._compress, segment)
+        except RuntimeError:
+            # No new threads during interpreter shutdown
+            self._compress(segment)
+
+    def _compress(self, segment: Path) -> None:
+        """Compress a rotated segment and remove the oldest segments."""
+        with open(segment, "rb") as source, gzip.open(f"{segment}.gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(segment)
+
+        segments = sorted(self.path.parent.glob(f"{self.path.name}.*.gz"))
+        for old in segments[: max(len(segments) - self.backup_count, 0)]:
+            old.unlink()
+
+
+class LoggerSettings(NamedTuple):
+    """Settings a logger was configured with."""
+
+    log_level: int
+    log_format: str
+    date_format: str
+    console_output: bool
+    propagate: bool
+    use_queue: bool
+    json_output: bool
+    log_file: Optional[str]
+    max_bytes: int
+    backup_count: int
+
+
+class _RegisteredLogger(NamedTuple):
+    """A configured logger together with its settings and installed handlers.
+
+    In queue mode ``handlers`` holds the queue handler of the logger and
+    ``targets`` the handlers writing the output on the listener thread,
+    otherwise both are the same.
+    """
+
+    settings: LoggerSettings
+    handlers: List[logging.Handler]
+    targets: List[logging.Handler]
+
+
+class _TargetQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler passing the target handlers of its logger along with records."""
+
+    def __init__(
+        self, log_queue: "queue.SimpleQueue[Any]", targets: List[logging.Handler]
+    ) -> None:
+        """Initialize the handler with the handlers the listener writes to."""
+        super().__init__(log_queue)
+        self.targets = targets
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge the arguments into the message and render the exception.
+
+        Structured messages are kept as they are, so they are rendered on the
+        listener thread and the JsonFormatter can still read their fields.
+        """
+        record = copy.copy(record)
+        if not isinstance(record.msg, StructuredMessage):
+            record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue the record together with its target handlers."""
+        self.queue.put_nowait((record, self.targets))
+
+
+class _DispatchingListener(logging.handlers.QueueListener):
+    """Queue listener writing every record to the target handlers of its logger."""
+
+    def handle(self, item: Tuple[logging.LogRecord, List[logging.Handler]]) -> None:
+        """Write a queued record to its target handlers."""
+        record, targets = item
+        for handler in targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+# Formats exceptions of queued records before they leave the logging thread
+_exception_formatter = logging.Formatter()
+
+# Loggers configured by configure_logging by name
+_registry: Dict[str, _RegisteredLogger] = {}
+_registry_lock = threading.Lock()
+
+# Open file handlers by path and the number of loggers writing through them,
+# guarded by the registry lock
+_file_handlers: Dict[str, Tuple[BufferedRotatingFileHandler, int]] = {}
+
+# Queue of all loggers in queue mode and the listener thread emptying it
+_log_queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+_listener: Optional[_DispatchingListener] = None
+_listener_lock = threading.Lock()
+
+
+def _queue_enabled() -> bool:
+    """Check whether queue mode is enabled by the environment."""
+    return os.environ.get(QUEUE_ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+
+def _json_enabled() -> bool:
+    """Check whether JSON output is selected by the environment."""
+    return os.environ.get(FORMAT_ENV_VAR, "").lower() == "json"
+
+
+def _start_queue_listener() -> None:
+    """Start the listener thread unless it is running."""
+    global _listener
+
+    with _listener_lock:
+        if _listener is None:
+            _listener = _DispatchingListener(_log_queue)
+            _listener.start()
+            atexit.register(stop_queue_listener)
+
+
+def _stop_listener() -> bool:
+    """Stop the listener thread once it wrote all queued records.
+
+    Does not take the registry lock, so it can be called while holding it.
+
+    Returns:
+        bool: Whether a running listener was stopped
+    """
+    global _listener
+
+    with _listener_lock:
+        if _listener is None:
+            return False
+        _listener.stop()
+        _listener = None
+        atexit.unregister(stop_queue_listener)
+        return True
+
+
+def stop_queue_listener() -> None:
+    """Write all queued records and stop the listener thread.
+
+    Runs automatically at interpreter exit. Records logged afterwards stay in
+    the queue until the next logger in queue mode is configured.
+    """
+    if not _stop_listener():
+        return
+
+    with _registry_lock:
+        for registered in _registry.values():
+            for handler in registered.targets:
+                handler.flush()
+
+
+def _file_output_enabled() -> bool:
+    """Check whether file output is enabled by the environment."""
+    return bool(os.environ.get(LOG_DIR_ENV_VAR))
 
 
 def get_log_directory() -> Path:
     """Get or create the log directory.
 
+    The directory is read from the AZURE_PIPELINES_LOG_DIR environment variable
+    and defaults to ``logs`` in the working directory.
+
     Returns:
         Path: Path to the log directory
     """
-    # Always return os.devnull to disable file logging completely
-    return Path(os.devnull)
+    log_dir = _log_directory_path()
+    log_dir.mkdir(parents=True, exist_ok=True)
+    return log_dir
+
+
+def _log_directory_path() -> Path:
+    """Get the log directory without creating it."""
+    return Path(os.environ.get(LOG_DIR_ENV_VAR) or DEFAULT_LOG_DIR)
+
+
+def caller_module_name(default: str = "azure_pipelines") -> str:
+    """Get the name of the module calling into this module.
+
+    Only walks the frames of this module and reads the module name from the
+    globals of the first frame outside of it. Unlike ``inspect.stack()`` no
+    source lines are read, so the cost does not grow with the stack depth.
+
+    Args:
+        default: Name to return if the caller can't be determined
+
+    Returns:
+        str: Name of the calling module
+    """
+    get_frame = getattr(sys, "_getframe", None)
+    if get_frame is None:
+        return default
+
+    frame = get_frame(1)
+    while frame is not None and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+    if frame is None:
+        return default
+    return frame.f_globals.get("__name__", default)
 
 
 def configure_logging(
@@ -30,17 +493,32 @@ def configure_logging(
     log_format: str = "[%(asctime)s] [%(levelname)s] [%(name)s] - %(message)s",
     date_format: str = "%Y-%m-%d %H:%M:%S",
     console_output: bool = True,
-    file_output: bool = False,  # Default to False to disable file logging
+    file_output: bool = False,
     max_bytes: int = 10485760,  # 10MB
     backup_count: int = 5,
     propagate: bool = False,
+    use_queue: Optional[bool] = None,
+    json_output: Optional[bool] = None,
 ) -> logging.Logger:
     """Configure logging for a module.
 
+    Every logger is set up once. Later calls with the same settings return the
+    configured logger unchanged, a changed level is applied to the existing
+    handlers and only other changes replace them.
+
+    File output writes through a BufferedRotatingFileHandler, which buffers
+    records in memory and rotates and compresses the file in the background.
+
+    In queue mode the logger only puts records into a queue. A background
+    listener thread owns the real handlers and writes the records, so slow
+    consoles don't block the caller. Queued records are written at exit.
+
     Args:
         logger_name: Name of the logger (defaults to the calling module name)
         log_level: Logging level (default: INFO)
-        log_file: Log file name (default: based on logger_name)
+        log_file: Log file name in the log directory (default:
+            azure_pipelines.log). Loggers writing to the same file share
+            one handler.
         log_format: Format string for log messages
         date_format: Format string for timestamps
         console_output: Whether to output logs to console
@@ -48,42 +526,95 @@ def configure_logging(
         max_bytes: Maximum size of log file before rotation
         backup_count: Number of backup log files to keep
         propagate: Whether to propagate logs to parent loggers
+        use_queue: Whether to write logs on a background thread (defaults to
+            the AZURE_PIPELINES_LOG_QUEUE environment variable)
+        json_output: Whether to write one JSON object per record instead of
+            log_format (defaults to AZURE_PIPELINES_LOG_FORMAT=json)
 
     Returns:
         logging.Logger: Configured logger instance
     """
     # If no logger name is provided, use the calling module's name
     if logger_name is None:
-        import inspect
+        logger_name = caller_module_name()
 
-        frame = inspect.stack()[1]
-        module = inspect.getmodule(frame[0])
-        logger_name = module.__name__ if module else "azure_pipelines"
+    settings = LoggerSettings(
+        log_level=log_level,
+        log_format=log_format,
+        date_format=date_format,
+        console_output=console_output,
+        propagate=propagate,
+        use_queue=_queue_enabled() if use_queue is None else use_queue,
+        json_output=_json_enabled() if json_output is None else json_output,
+        log_file=(
+            str(_log_directory_path().absolute() / (log_file or DEFAULT_LOG_FILE))
+            if file_output
+            else None
+        ),
+        max_bytes=max_bytes,
+        backup_count=backup_count,
+    )
 
     # Get or create the logger
     logger = logging.getLogger(logger_name)
 
-    # Clear any existing handlers to avoid duplicate logs
-    if logger.hasHandlers():
+    with _registry_lock:
+        registered = _registry.get(logger_name)
+        # Handlers removed or added by someone else require a full setup
+        if registered is not None and registered.handlers == logger.handlers:
+            if registered.settings == settings:
+                return logger
+            if registered.settings._replace(log_level=log_level) == settings:
+                logger.setLevel(log_level)
+                for handler in registered.targets:
+                    handler.setLevel(log_level)
+                _registry[logger_name] = registered._replace(settings=settings)
+                return logger
+
+        # Clear any existing handlers to avoid duplicate logs
+        for handler in logger.handlers:
+            handler.flush()
         logger.handlers.clear()
+        if registered is not None:
+            _close_files(registered)
+        targets: List[logging.Handler] = []
+
+        # Set the log level
+        logger.setLevel(log_level)
+        logger.propagate = propagate
 
-    # Set the log level
-    logger.setLevel(log_level)
-    logger.propagate = propagate
+        # Create formatter
+        formatter: logging.Formatter = (
+            JsonFormatter()
+            if settings.json_output
+            else logging.Formatter(log_format, date_format)
+        )
 
-    # Create formatter
-    formatter = logging.Formatter(log_format, date_format)
+        # Add console handler if requested
+        if console_output:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(formatter)
+            console_handler.setLevel(log_level)
+            targets.append(console_handler)
 
-    # Add console handler if requested
-    if console_output:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        console_handler.setLevel(log_level)
-        logger.addHandler(console_handler)
+        # Add file handler if requested
+        if settings.log_file:
+            targets.append(
+                _open_file_handler(
+                    settings.log_file, formatter, max_bytes, backup_count
+                )
+            )
 
-    # File logging is disabled
-    # The file_output parameter is kept for backward compatibility
-    # but no file handlers will be created
+        if settings.use_queue and targets:
+            _start_queue_listener()
+            logger.addHandler(_TargetQueueHandler(_log_queue, targets))
+        else:
+            for handler in targets:
+                logger.addHandler(handler)
+
+        _registry[logger_name] = _RegisteredLogger(
+            settings, list(logger.handlers), targets
+        )
 
     return logger
 
@@ -120,9 +651,96 @@ def get_logger(
     # Use provided log_level, or get from environment, or default to INFO
     effective_log_level = log_level or log_level_map.get(env_log_level, logging.INFO)
 
-    return configure_logging(
-        logger_name=name, log_level=effective_log_level, file_output=False, **kwargs
-    )
+    # Write log files if the environment sets a log directory
+    kwargs.setdefault("file_output", _file_output_enabled())
+
+    return configure_logging(logger_name=name, log_level=effective_log_level, **kwargs)
+
+
+def reset_logging(*names: str) -> None:
+    """Remove the handlers of configured loggers and forget their settings.
+
+    The next configure_logging or get_logger call sets up the logger again,
+    e.g. to attach a fresh handler to a stream replaced by a test.
+
+    Args:
+        *names: Names of the loggers to reset (defaults to all loggers)
+    """
+    with _registry_lock:
+        for name in names or list(_registry):
+            registered = _registry.pop(name, None)
+            if registered is None:
+                continue
+            logger = logging.getLogger(name)
+            for handler in registered.handlers:
+                logger.removeHandler(handler)
+            for handler in registered.targets:
+                handler.flush()
+            _close_files(registered)
+
+
+def _open_file_handler(
+    path: str, formatter: logging.Formatter, max_bytes: int, backup_count: int
+) -> BufferedRotatingFileHandler:
+    """Get the handler of a log file, opening it for the first logger.
+
+    Every log file has one handler per process, so its flush thread, buffer
+    and rotation are shared by all loggers writing to it. The handler writes
+    every record, the levels of the loggers filter them, and the format of
+    the logger configured last applies. Called with the registry lock held.
+    """
+    handler, users = _file_handlers.get(path, (None, 0))
+    if handler is None:
+        handler = BufferedRotatingFileHandler(
+            path, max_bytes=max_bytes, backup_count=backup_count
+        )
+    handler.setFormatter(formatter)
+    _file_handlers[path] = (handler, users + 1)
+    return handler
+
+
+def _release_file_handler(handler: BufferedRotatingFileHandler) -> bool:
+    """Drop a logger from the users of a file handler.
+
+    Returns:
+        bool: Whether it was the last user and the handler needs closing
+    """
+    path = str(handler.path)
+    shared, users = _file_handlers.get(path, (None, 0))
+    if shared is not handler:
+        return True
+    if users > 1:
+        _file_handlers[path] = (handler, users - 1)
+        return False
+    del _file_handlers[path]
+    return True
+
+
+def _close_files(registered: _RegisteredLogger) -> None:
+    """Close the file handlers of a logger that is set up again or reset.
+
+    Handlers still used by other loggers stay open. In queue mode the listener
+    may still hold records for the handlers, so they are written first.
+    Called with the registry lock held, the listener is restarted for the
+    other loggers in queue mode.
+    """
+    files = [
+        handler
+        for handler in registered.targets
+        if isinstance(handler, BufferedRotatingFileHandler)
+        and _release_file_handler(handler)
+    ]
+    if not files:
+        return
+    stopped = registered.settings.use_queue and _stop_listener()
+    for handler in files:
+        handler.close()
+    if stopped and any(
+        other.settings.use_queue
+        for other in _registry.values()
+        if other is not registered
+    ):
+        _start_queue_listener()
 
 
 # Configure root logger for the azure_pipelines package
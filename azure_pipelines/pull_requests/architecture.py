@@ -1,22 +1,30 @@
 #!/usr/bin/env python3
 """Module for creating Pull Request comments with architecture diagrams."""
 
-from azure_pipelines.logging_config import get_logger
+import logging
+
+from azure_pipelines.logging_config import get_logger, log_event
 from azure_pipelines.pull_requests import pull_request_comment
 
 # Get configured logger for this module
 logger = get_logger(__name__)
 
+# Key of the thread showing the architecture diagram
+DIAGRAM_KEY = "architecture-diagram"
+
 
 def main():
-    """Create a Pull Request comment with architecture diagram from CDK output."""
+    """Create a Pull Request comment with architecture diagram from CDK output.
+
+    The diagram thread of earlier runs is updated with the new diagram.
+    """
     diagram_path = "./cdk.out/cdkgraph/diagram.png"
 
-    logger.info(f"Uploading architecture diagram from {diagram_path}")
+    log_event(logger, logging.INFO, "Uploading architecture diagram", path=diagram_path)
 
     try:
-        msg = pull_request_comment.Message()
-        msg.upload_attachment_and_comment(file_path=diagram_path)
+        with pull_request_comment.Message() as msg:
+            msg.upload_attachment_and_comment(file_path=diagram_path, key=DIAGRAM_KEY)
         logger.info("Successfully uploaded architecture diagram to PR comment")
     except Exception as exc:
         logger.exception("Failed to upload architecture diagram: %s", exc)
@@ -1,97 +1,275 @@
 """Module for creating Pull Request comments with CDK diff and validation reports."""
 
+import logging
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
 import pandas as pd
 
-from azure_pipelines.logging_config import get_logger
+from azure_pipelines.logging_config import get_logger, log_event
 from azure_pipelines.pull_requests import pull_request_comment
 
 # Get configured logger for this module
 logger = get_logger(__name__)
 
+# Key of the thread holding the CDK diff and validation reports
+COMMENT_KEY = "cdk-diff"
 
-def read_output_file(file_path: str = "./output.log") -> Optional[str]:
-    """Read the content of the output file.
+# Comment posted if cdk diff printed nothing
+NO_CHANGES_COMMENT = "CDK Diff found no resource is going to change"
+
+# Lines starting a resource or stack of the diff, chunks are split before them
+DIFF_BOUNDARY_PREFIXES = ("[+]", "[-]", "[~]", "Stack ")
+
+# Opens and closes a markdown code block
+CODE_FENCE = "```"
+
+
+def diff_comment(output_content: Optional[str]) -> str:
+    """Create the CDK diff comment.
 
     Args:
-        file_path: Path to the output file
+        output_content: Output of cdk diff
 
     Returns:
-        The content of the file or None if file doesn't exist
+        The comment text
     """
-    try:
-        with open(file_path, "r") as output_file:
-            return output_file.read()
-    except FileNotFoundError:
-        logger.exception(f"Output file not found: {file_path}")
-        return None
-    except Exception as e:
-        logger.exception(f"Error reading output file: {e}")
-        raise
+    if not output_content:
+        return NO_CHANGES_COMMENT
+    return output_content
+
+
+def _close_chunk(lines: List[str], fence: Optional[str]) -> str:
+    """Join the lines of a chunk and close its open code block."""
+    text = "".join(lines)
+    if fence is not None:
+        # Pieces of cut lines end without a line break
+        if not text.endswith("\n"):
+            text += "\n"
+        text += f"{CODE_FENCE}\n"
+    return text.rstrip("\n")
+
 
+def iter_diff_chunks(
+    lines: Iterable[str],
+    max_length: int = pull_request_comment.MAX_COMMENT_LENGTH,
+    first_length: Optional[int] = None,
+) -> Iterator[str]:
+    """Split the lines of a CDK diff into comments of at most max_length.
 
-def add_cdk_diff_comment(
-    msg: pull_request_comment.Message, output_content: Optional[str]
-) -> bool:
-    """Add CDK diff comment to the pull request.
+    Chunks end before a resource or stack line where possible, so a resource
+    is not torn across comments. A code block open at the end of a chunk is
+    closed and opened again with the same fence at the start of the next one.
+    Only the lines of the current chunk are held in memory.
 
     Args:
-        msg: Message object to add comments
-        output_content: Content to add as comment
+        lines: Lines of the diff, e.g. an open output file
+        max_length: Maximum length of a chunk
+        first_length: Maximum length of the first chunk, e.g. to leave room
+            for the thread marker (defaults to max_length)
 
-    Returns:
-        True if comment was added successfully, False otherwise
+    Yields:
+        str: Chunks of the diff in order
     """
-    if not output_content:
-        comment = "CDK Diff found no resource is going to change"
-    else:
-        comment = output_content
+    limit = min(max_length, first_length or max_length)
+    # Longest piece of a single line, leaves room for opening and closing fences
+    max_line = max(limit // 2, 1)
+    closing = len(CODE_FENCE) + 2
+
+    chunk: List[str] = []
+    size = 0
+    # Number of lines opening a code block before the content of the chunk
+    start = 0
+    # Opening line of the code block open at the end of the chunk
+    fence: Optional[str] = None
+    # Lines before the last resource boundary and the code block open there
+    split = 0
+    split_fence: Optional[str] = None
+
+    for line in lines:
+        if not line.endswith("\n"):
+            line += "\n"
+        pieces = [
+            line[offset : offset + max_line]  # noqa: E203
+            for offset in range(0, len(line), max_line)
+        ]
+        for piece in pieces:
+            if piece.startswith(DIFF_BOUNDARY_PREFIXES) and len(chunk) > start:
+                split, split_fence = len(chunk), fence
+
+            is_fence = piece.lstrip().startswith(CODE_FENCE)
+            after = (None if fence is not None else piece) if is_fence else fence
+            reserve = closing if after is not None else 0
+
+            while len(chunk) > start and size + len(piece) + reserve > limit:
+                limit = max_length
+                if split > start:
+                    yield _close_chunk(chunk[:split], split_fence)
+                    rest, reopen = chunk[split:], split_fence
+                else:
+                    yield _close_chunk(chunk, fence)
+                    rest, reopen = [], fence
+                chunk = ([reopen] if reopen is not None else []) + rest
+                start = 1 if reopen is not None else 0
+                size = sum(len(part) for part in chunk)
+                split, split_fence = 0, None
+
+            # A code block opened before any content belongs to the prefix
+            if is_fence and after is not None and len(chunk) == start:
+                start += 1
+            chunk.append(piece)
+            size += len(piece)
+            fence = after
+
+    if len(chunk) > start:
+        yield _close_chunk(chunk, fence)
+
+
+def stream_output_file(
+    file_path: str = "./output.log",
+    max_length: int = pull_request_comment.MAX_COMMENT_LENGTH,
+    first_length: Optional[int] = None,
+) -> Iterator[str]:
+    """Read the output file as CDK diff comments of at most max_length.
+
+    The file is read line by line while the comments are consumed, see
+    iter_diff_chunks.
+
+    Args:
+        file_path: Path to the output file
+        max_length: Maximum length of a comment
+        first_length: Maximum length of the first comment (defaults to
+            max_length)
+
+    Yields:
+        str: Comments of the diff in order, the no changes comment if the
+            file is missing or empty
+    """
+    empty = True
+    try:
+        with open(file_path, "r") as output_file:
+            for chunk in iter_diff_chunks(output_file, max_length, first_length):
+                if chunk.strip():
+                    empty = False
+                    yield chunk
+    except FileNotFoundError:
+        log_event(
+            logger,
+            logging.ERROR,
+            "Output file not found",
+            exc_info=True,
+            path=file_path,
+        )
+    except Exception as e:
+        log_event(
+            logger, logging.ERROR, "Error reading output file", exc_info=True, error=e
+        )
+        raise
+    if empty:
+        yield NO_CHANGES_COMMENT
 
-    logger.info("Adding CDK diff comment")
-    return msg.add_msg(comment=comment)
 
+def read_validation_reports(
+    templates_dir: str = "./synth/templates/",
+) -> Dict[str, str]:
+    """Read the validation reports from CSV files as markdown tables.
 
-def add_validation_reports(
-    msg: pull_request_comment.Message, templates_dir: str = "./synth/templates/"
-) -> None:
-    """Add validation reports from CSV files to the pull request.
+    Empty reports are skipped, unreadable ones are logged and skipped.
 
     Args:
-        msg: Message object to add comments
         templates_dir: Directory containing CSV template files
+
+    Returns:
+        Markdown table of every non-empty report by file name
     """
     templates_path = Path(templates_dir)
 
     if not templates_path.exists():
-        logger.warning(f"Templates directory not found: {templates_dir}")
-        return
+        log_event(
+            logger, logging.WARNING, "Templates directory not found", path=templates_dir
+        )
+        return {}
 
+    reports: Dict[str, str] = {}
     for csv_file in templates_path.glob("*.csv"):
         try:
             df = pd.read_csv(csv_file)
             if not df.empty:
-                logger.info(f"Adding CDK Validation report from {csv_file.name}")
-                if not msg.add_msg(comment=df.to_markdown()):
-                    logger.error(
-                        f"Failed to add validation report from {csv_file.name}"
-                    )
+                reports[csv_file.name] = df.to_markdown()
         except Exception as e:
-            logger.exception(f"Error processing CSV file {csv_file}: {e}")
+            log_event(
+                logger,
+                logging.ERROR,
+                "Error processing CSV file",
+                exc_info=True,
+                file=csv_file,
+                error=e,
+            )
+    return reports
 
 
-def main():
-    """Create Pull Request comments within azure-pipelines-pr.yml."""
-    msg = pull_request_comment.Message()
+def post_comments(
+    msg: pull_request_comment.Message,
+    output_content: Union[Optional[str], Iterator[str]],
+    templates_dir: str = "./synth/templates/",
+) -> Dict[str, bool]:
+    """Post the CDK diff and all validation reports as one comment thread.
+
+    The thread posted by an earlier run of the pull request is updated. A
+    diff given as iterator of chunks is posted as ordered replies while it
+    is read.
+
+    Args:
+        msg: Message to post the comments with
+        output_content: Output of cdk diff, or its chunks e.g. of
+            stream_output_file
+        templates_dir: Directory containing CSV template files
+
+    Returns:
+        Whether each comment was added, by "cdk diff" or report file name
+    """
+    diff = (
+        diff_comment(output_content)
+        if output_content is None or isinstance(output_content, str)
+        else output_content
+    )
+    comments: Dict[str, Union[str, Iterator[str]]] = {
+        "cdk diff": diff,
+        **read_validation_reports(templates_dir),
+    }
+    log_event(logger, logging.INFO, "Adding PR comments", count=len(comments))
+
+    batch = pull_request_comment.CommentBatch(msg, key=COMMENT_KEY)
+    for text in comments.values():
+        batch.add(text)
+    results = batch.send()
+
+    outcomes = dict(zip(comments, results))
+    for name, added in outcomes.items():
+        if not added:
+            log_event(logger, logging.ERROR, "Failed to add PR comment", comment=name)
+    return outcomes
+
 
-    # Add CDK diff comment
-    output_content = read_output_file()
-    if not add_cdk_diff_comment(msg, output_content):
-        logger.error("Failed to add CDK diff comment")
+def post_all_comments() -> Dict[str, bool]:
+    """Post the CDK diff and validation reports of the pipeline run.
 
-    # Add validation reports
-    add_validation_reports(msg)
+    The diff is streamed from output.log in chunks, see stream_output_file.
+
+    Returns:
+        Whether each comment was added
+    """
+    with pull_request_comment.Message() as msg:
+        diff = stream_output_file(
+            first_length=pull_request_comment.MAX_COMMENT_LENGTH
+            - pull_request_comment.thread_marker_length(COMMENT_KEY)
+        )
+        return post_comments(msg, diff)
+
+
+def main():
+    """Create Pull Request comments within azure-pipelines-pr.yml."""
+    post_all_comments()
 
 
 if __name__ == "__main__":
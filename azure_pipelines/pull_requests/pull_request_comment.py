@@ -1,12 +1,33 @@
 """Module for interacting with Azure DevOps Pull Request comments and attachments."""
 
+import asyncio
+import itertools
+import json
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union
+from types import GeneratorType, TracebackType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from azure_pipelines.logging_config import get_logger
+from azure_pipelines.logging_config import get_logger, log_event
 
 # Get configured logger for this module
 logger = get_logger(__name__)
@@ -14,12 +35,112 @@ logger = get_logger(__name__)
 # API version constant
 API_VERSION = "7.1"
 
+# Status codes retried for every method, e.g. throttling by Azure DevOps
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Status codes retried for POST, the request was not processed by the server
+POST_RETRY_STATUS_CODES = (429, 503)
+
+# Default retries, backoff in seconds, pooled connections and request timeout
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 30.0
+
+# Default number of requests AsyncMessage sends at the same time
+DEFAULT_CONCURRENCY = 8
+
+# Longest comment content posted as one comment, longer ones are split
+MAX_COMMENT_LENGTH = 150000
+
+# Largest encoded size of the comments sent with the thread creation
+MAX_THREAD_PAYLOAD_BYTES = 1000000
+
+# Hidden marker identifying the thread of a key, see thread_marker
+THREAD_MARKER = "<!-- azure-pipelines-bot:{key} -->"
+
+T = TypeVar("T")
+
+
+class _CommentRetry(Retry):
+    """Retry that only repeats POST requests the server rejected unprocessed.
+
+    A comment posted again after a 502 or 504 from a gateway may show up twice,
+    so POST is only retried on throttling and unavailability.
+    """
+
+    def is_retry(
+        self, method: str, status_code: int, has_retry_after: bool = False
+    ) -> bool:
+        """Check whether a response status is retried for the method."""
+        if method.upper() == "POST" and status_code not in POST_RETRY_STATUS_CODES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def create_session(
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    pool_size: int = DEFAULT_POOL_SIZE,
+) -> requests.Session:
+    """Create a session keeping connections to Azure DevOps open.
+
+    Connections are pooled per host and reused for later requests, so only the
+    first request pays for the TCP and TLS handshakes. Failed connections and
+    RETRY_STATUS_CODES are retried with exponential backoff, honouring the
+    Retry-After header. Read errors are not retried, the request may have
+    been processed.
+
+    Args:
+        retries: Maximum number of retries per request
+        backoff_factor: Backoff factor in seconds between retries
+        pool_size: Number of connections kept open per host
+
+    Returns:
+        requests.Session: Session with the retry adapter mounted
+    """
+    retry = _CommentRetry(
+        total=retries,
+        read=0,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST", "PATCH"},
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class Message:
-    """Handles Azure DevOps Pull Request comments and attachments."""
+    """Handles Azure DevOps Pull Request comments and attachments.
+
+    All requests go through one session, so connections to Azure DevOps are
+    kept open between comments. Use the message as context manager or call
+    ``close`` to close the connections of a session it created::
+
+        with Message() as msg:
+            msg.add_msg("CDK diff")
+
+    Args:
+        session: Session to send requests with (default: create_session())
+        timeout: Seconds to wait for a connection or response
+    """
 
-    def __init__(self):
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
         """Initialize with environment variables for Azure DevOps connection."""
+        self.session = session if session is not None else create_session()
+        self.timeout = timeout
+        self._owns_session = session is None
+
         # Get environment variables
         self.token = os.getenv("SYSTEM_ACCESSTOKEN")
         self.collection_uri = os.getenv("SYSTEM_COLLECTIONURI")
@@ -37,6 +158,24 @@ class Message:
             f"{self.repository_id}/pullRequests/{self.pull_request_id}"
         )
 
+    def close(self) -> None:
+        """Close the connections of the session created by this message."""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> "Message":
+        """Return the message."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the session created by this message."""
+        self.close()
+
     def add_msg(self, comment: str) -> bool:
         """Add a comment to Azure DevOps Pull Request.
 
@@ -46,8 +185,22 @@ class Message:
         Returns:
             bool: True if comment was added successfully, False otherwise
         """
+        return self.create_thread([comment]) is not None
+
+    def create_thread(self, comments: List[str]) -> Optional[int]:
+        """Create a comment thread on the pull request with one request.
+
+        Args:
+            comments: Comment texts of the thread, the first one starts it
+
+        Returns:
+            Optional[int]: ID of the thread, None if it wasn't created
+        """
         data = {
-            "comments": [{"parentCommentId": 1, "content": comment, "commentType": 1}],
+            "comments": [
+                {"parentCommentId": 1, "content": comment, "commentType": 1}
+                for comment in comments
+            ],
             "status": 1,
         }
 
@@ -57,29 +210,196 @@ class Message:
             "Authorization": f"Bearer {self.token}",
         }
 
-        logger.info(f"Sending PR comment to: {msg_url}")
-        response = requests.post(url=msg_url, json=data, headers=headers)
+        log_event(
+            logger, logging.INFO, "Sending PR comment", url=msg_url, count=len(comments)
+        )
+        response = self.session.post(
+            url=msg_url, json=data, headers=headers, timeout=self.timeout
+        )
 
-        logger.info(
-            f"Response Code: {response.status_code}, Response Reason: {response.reason}"
+        log_event(
+            logger,
+            logging.INFO,
+            "PR comment response",
+            status=response.status_code,
+            reason=response.reason,
+        )
+        if response.status_code != 200:
+            return None
+        return response.json().get("id")
+
+    def add_reply(
+        self, thread_id: int, comment: str, parent_comment_id: int = 1
+    ) -> bool:
+        """Reply to a comment of an existing thread.
+
+        Args:
+            thread_id: ID of the thread
+            comment: The reply text
+            parent_comment_id: ID of the comment to reply to (default: the first)
+
+        Returns:
+            bool: True if the reply was added successfully, False otherwise
+        """
+        data = {
+            "parentCommentId": parent_comment_id,
+            "content": comment,
+            "commentType": 1,
+        }
+
+        reply_url = (
+            f"{self.base_url}/threads/{thread_id}/comments?api-version={API_VERSION}"
+        )
+        headers = {
+            "content-type": "application/json",
+            "Authorization": f"Bearer {self.token}",
+        }
+
+        log_event(logger, logging.INFO, "Sending PR reply", url=reply_url)
+        response = self.session.post(
+            url=reply_url, json=data, headers=headers, timeout=self.timeout
+        )
+
+        log_event(
+            logger,
+            logging.INFO,
+            "PR reply response",
+            status=response.status_code,
+            reason=response.reason,
         )
         return response.status_code == 200
 
-    def upload_attachment_and_comment(self, file_path: Union[str, Path]) -> bool:
-        """Upload an attachment and add a comment with the attachment link.
+    def upsert_msg(self, key: str, comment: str) -> bool:
+        """Add a comment or update the comment posted with the same key.
+
+        Args:
+            key: Stable name of the comment, e.g. "cdk-diff"
+            comment: The comment text
+
+        Returns:
+            bool: True if the comment was added or updated, False otherwise
+        """
+        batch = CommentBatch(self, key=key)
+        batch.add(comment)
+        return batch.send()[0]
+
+    def list_threads(self) -> List[Dict[str, Any]]:
+        """List the comment threads of the pull request.
+
+        Returns:
+            List[Dict[str, Any]]: Threads with their comments, empty if the
+                listing failed
+        """
+        threads_url = f"{self.base_url}/threads?api-version={API_VERSION}"
+        headers = {"Authorization": f"Bearer {self.token}"}
+
+        response = self.session.get(
+            url=threads_url, headers=headers, timeout=self.timeout
+        )
+        log_event(
+            logger,
+            logging.INFO,
+            "PR thread listing response",
+            status=response.status_code,
+            reason=response.reason,
+        )
+
+        if response.status_code != 200:
+            return []
+        return response.json().get("value", [])
+
+    def find_thread(self, key: str) -> Optional[Dict[str, Any]]:
+        """Find the thread whose first comment carries the marker of a key.
+
+        Args:
+            key: Stable name of the thread
+
+        Returns:
+            Optional[Dict[str, Any]]: The thread, None if there is none
+        """
+        marker = thread_marker(key)
+        for thread in self.list_threads():
+            comments = thread.get("comments") or []
+            if thread.get("isDeleted") or not comments or comments[0].get("isDeleted"):
+                continue
+            if marker in (comments[0].get("content") or ""):
+                return thread
+        return None
+
+    def update_comment(self, thread_id: int, comment_id: int, comment: str) -> bool:
+        """Replace the content of a comment.
+
+        Args:
+            thread_id: ID of the thread
+            comment_id: ID of the comment in the thread
+            comment: The new comment text
+
+        Returns:
+            bool: True if the comment was updated, False otherwise
+        """
+        comment_url = (
+            f"{self.base_url}/threads/{thread_id}/comments/{comment_id}"
+            f"?api-version={API_VERSION}"
+        )
+        headers = {
+            "content-type": "application/json",
+            "Authorization": f"Bearer {self.token}",
+        }
+
+        log_event(logger, logging.INFO, "Updating PR comment", url=comment_url)
+        response = self.session.patch(
+            url=comment_url,
+            json={"content": comment},
+            headers=headers,
+            timeout=self.timeout,
+        )
+
+        log_event(
+            logger,
+            logging.INFO,
+            "PR comment update response",
+            status=response.status_code,
+            reason=response.reason,
+        )
+        return response.status_code == 200
+
+    def delete_comment(self, thread_id: int, comment_id: int) -> bool:
+        """Delete a comment.
+
+        Args:
+            thread_id: ID of the thread
+            comment_id: ID of the comment in the thread
+
+        Returns:
+            bool: True if the comment was deleted, False otherwise
+        """
+        comment_url = (
+            f"{self.base_url}/threads/{thread_id}/comments/{comment_id}"
+            f"?api-version={API_VERSION}"
+        )
+        headers = {"Authorization": f"Bearer {self.token}"}
+
+        log_event(logger, logging.INFO, "Deleting PR comment", url=comment_url)
+        response = self.session.delete(
+            url=comment_url, headers=headers, timeout=self.timeout
+        )
+        return response.status_code == 200
+
+    def upload_attachment(self, file_path: Union[str, Path]) -> Optional[str]:
+        """Upload a diagram as attachment of the pull request.
 
         Args:
             file_path: Path to the file to upload
 
         Returns:
-            bool: True if upload and comment were successful, False otherwise
+            Optional[str]: URL of the attachment, None if the upload failed
         """
         # Convert to Path object for better path handling
         path = Path(file_path)
 
         if not path.is_file():
-            logger.error(f"File does not exist: {path}")
-            return False
+            log_event(logger, logging.ERROR, "File does not exist", path=path)
+            return None
 
         file_name = f"diagram-{self.commit_sha_prefix}.png"
         attachment_url = (
@@ -91,30 +411,492 @@ class Message:
             "Authorization": f"Bearer {self.token}",
         }
 
-        logger.info(f"Uploading attachment: {file_name} to {attachment_url}")
+        log_event(
+            logger,
+            logging.INFO,
+            "Uploading attachment",
+            file=file_name,
+            url=attachment_url,
+        )
 
+        # Read the file up front, a retried request sends the content again
         with path.open("rb") as file:
-            response = requests.post(url=attachment_url, headers=headers, data=file)
+            content = file.read()
+        response = self.session.post(
+            url=attachment_url, headers=headers, data=content, timeout=self.timeout
+        )
 
-        logger.info(
-            f"Response Code: {response.status_code}, Response Reason: {response.reason}"
+        log_event(
+            logger,
+            logging.INFO,
+            "Attachment response",
+            status=response.status_code,
+            reason=response.reason,
         )
 
         if response.status_code == 201:
             logger.info("File uploaded successfully")
-            attachment_ref = response.json().get("url")
-
-            # Add comments with the attachment
-            self.add_msg(f"[Architecture Diagram]({attachment_ref})")
-            self.add_msg(f"""<img src="{attachment_ref}" alt="Architecture Diagram">""")
-            return True
+            return response.json().get("url")
         else:
-            logger.error(f"Failed to upload file. Response: {response.text}")
+            log_event(
+                logger, logging.ERROR, "Failed to upload file", response=response.text
+            )
+            return None
+
+    def upload_attachment_and_comment(
+        self, file_path: Union[str, Path], key: Optional[str] = None
+    ) -> bool:
+        """Upload an attachment and add a comment with the attachment link.
+
+        Args:
+            file_path: Path to the file to upload
+            key: Stable name to update the thread of earlier runs instead of
+                adding a new one
+
+        Returns:
+            bool: True if upload and comment were successful, False otherwise
+        """
+        attachment_ref = self.upload_attachment(file_path)
+        if attachment_ref is None:
+            return False
+
+        # Add comments with the attachment as one thread
+        batch = CommentBatch(self, key=key)
+        for comment in attachment_comments(attachment_ref):
+            batch.add(comment)
+        batch.send()
+        return True
+
+
+def attachment_comments(attachment_ref: str) -> List[str]:
+    """Create the comments linking and showing an uploaded diagram.
+
+    Args:
+        attachment_ref: URL of the attachment
+
+    Returns:
+        List[str]: Comments in the order they are posted
+    """
+    return [
+        f"[Architecture Diagram]({attachment_ref})",
+        f"""<img src="{attachment_ref}" alt="Architecture Diagram">""",
+    ]
+
+
+def thread_marker(key: str) -> str:
+    """Create the hidden marker identifying the thread of a key.
+
+    The marker is an HTML comment, so it doesn't show in the rendered comment.
+
+    Args:
+        key: Stable name of the thread, e.g. "cdk-diff"
+
+    Returns:
+        str: The marker
+    """
+    return THREAD_MARKER.format(key=key)
+
+
+def thread_marker_length(key: Optional[str]) -> int:
+    """Get the number of characters the marker of a key adds to a comment.
+
+    Args:
+        key: Stable name of the thread, None for threads without a marker
+
+    Returns:
+        int: Length of the marker and the blank line separating it
+    """
+    return 0 if key is None else len(thread_marker(key)) + 2
+
+
+def split_comment(comment: str, max_length: int = MAX_COMMENT_LENGTH) -> List[str]:
+    """Split a comment into parts of at most max_length characters.
+
+    Parts end at line breaks where possible, only longer lines are cut.
+
+    Args:
+        comment: The comment text
+        max_length: Maximum length of a part
+
+    Returns:
+        List[str]: Parts of the comment in order
+    """
+    if len(comment) <= max_length:
+        return [comment]
+
+    parts: List[str] = []
+    current = ""
+    for line in comment.splitlines(keepends=True):
+        while len(line) > max_length:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:max_length])
+            line = line[max_length:]
+        if len(current) + len(line) > max_length:
+            parts.append(current)
+            current = ""
+        current += line
+    if current:
+        parts.append(current)
+    return parts
+
+
+class CommentBatch:
+    """Comments collected during a run and posted as a single thread.
+
+    ``send`` creates one thread with as many comments as fit into
+    ``max_payload_bytes`` and adds the rest as replies in order. Comments
+    longer than ``max_comment_length`` are split into several comments::
+
+        batch = CommentBatch(msg)
+        batch.add(diff)
+        for report in reports:
+            batch.add(report)
+        results = batch.send()
+
+    Used as context manager the batch is sent at the end of the block unless
+    it raised.
+
+    A comment can also be added as iterable of parts, e.g. a generator reading
+    a large file. Its parts are consumed while sending, so only the parts of
+    the thread creation are held in memory at once. Generators are closed
+    unread if the thread cannot be created.
+
+    With a ``key`` the first comment carries the marker of the key and the
+    thread posted by an earlier run is updated instead: changed comments are
+    patched, unchanged ones are left alone, missing ones are added as replies
+    and surplus ones deleted. Replies of other authors are never touched.
+
+    Args:
+        message: Message to send the requests with
+        max_comment_length: Longest content of a single comment
+        max_payload_bytes: Largest encoded size of the thread creation comments
+        key: Stable name of the thread to update on later runs
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        max_comment_length: int = MAX_COMMENT_LENGTH,
+        max_payload_bytes: int = MAX_THREAD_PAYLOAD_BYTES,
+        key: Optional[str] = None,
+    ) -> None:
+        """Initialize an empty batch."""
+        self.message = message
+        self.key = key
+        self.max_comment_length = max_comment_length
+        self.max_payload_bytes = max_payload_bytes
+        self._comments: List[Union[str, Iterable[str]]] = []
+
+    def __len__(self) -> int:
+        """Return the number of comments waiting to be sent."""
+        return len(self._comments)
+
+    def add(self, comment: Union[str, Iterable[str]]) -> int:
+        """Add a comment to the batch.
+
+        Args:
+            comment: The comment text to add, or its parts in order
+
+        Returns:
+            int: Position of the comment in the results of send
+        """
+        self._comments.append(comment)
+        return len(self._comments) - 1
+
+    def send(self) -> List[bool]:
+        """Post the collected comments and empty the batch.
+
+        Returns:
+            List[bool]: Whether each comment was added, in the order of add
+        """
+        comments, self._comments = self._comments, []
+        stream = self._parts(comments)
+        parts: Iterator[Tuple[int, str]] = stream
+        first = next(parts, None)
+        if first is None:
+            return []
+
+        index, part = first
+        if self.key is not None:
+            part = f"{part}\n\n{thread_marker(self.key)}"
+        parts = itertools.chain([(index, part)], parts)
+        if self.key is not None:
+            thread = self.message.find_thread(self.key)
+            if thread is not None:
+                return self._update(thread, parts, len(comments))
+
+        # Start the thread with as many parts as fit into one request
+        head: List[Tuple[int, str]] = []
+        size = 0
+        for index, part in parts:
+            size += len(json.dumps(part).encode())
+            if head and size > self.max_payload_bytes:
+                parts = itertools.chain([(index, part)], parts)
+                break
+            head.append((index, part))
+
+        results = [True] * len(comments)
+        thread_id = self.message.create_thread([part for _, part in head])
+        if thread_id is None:
+            # Close streamed comments, e.g. the files they read, unread
+            stream.close()
+            for comment in comments:
+                if isinstance(comment, GeneratorType):
+                    comment.close()
+            return [False] * len(comments)
+
+        requests = 1
+        for index, part in parts:
+            if not self.message.add_reply(thread_id, part):
+                results[index] = False
+            requests += 1
+
+        log_event(
+            logger,
+            logging.INFO,
+            "Sent PR comment batch",
+            thread=thread_id,
+            comments=len(comments),
+            requests=requests,
+        )
+        return results
+
+    def _parts(
+        self, comments: List[Union[str, Iterable[str]]]
+    ) -> Iterator[Tuple[int, str]]:
+        """Yield the parts of all comments with the position of their comment.
+
+        The first part leaves room for the thread marker of the key.
+        """
+        max_length = self.max_comment_length - thread_marker_length(self.key)
+        for index, comment in enumerate(comments):
+            chunks = [comment] if isinstance(comment, str) else comment
+            for chunk in chunks:
+                for part in split_comment(chunk, max_length):
+                    yield index, part
+                    max_length = self.max_comment_length
+
+    def _update(
+        self, thread: Dict[str, Any], parts: Iterable[Tuple[int, str]], count: int
+    ) -> List[bool]:
+        """Update the comments of an existing thread to the given parts."""
+        comments = sorted(
+            (
+                comment
+                for comment in thread.get("comments", [])
+                if not comment.get("isDeleted")
+            ),
+            key=lambda comment: comment["id"],
+        )
+        # Only update comments of the author of the marked comment
+        author = comments[0].get("author", {}).get("id")
+        comments = [
+            comment
+            for comment in comments
+            if comment.get("author", {}).get("id") == author
+        ]
+
+        thread_id = thread["id"]
+        results = [True] * count
+        requests = 0
+        position = -1
+        for position, (index, part) in enumerate(parts):
+            if position < len(comments):
+                if comments[position].get("content") == part:
+                    continue
+                added = self.message.update_comment(
+                    thread_id, comments[position]["id"], part
+                )
+            else:
+                added = self.message.add_reply(thread_id, part)
+            requests += 1
+            if not added:
+                results[index] = False
+
+        for comment in comments[position + 1 :]:  # noqa: E203
+            self.message.delete_comment(thread_id, comment["id"])
+            requests += 1
+
+        log_event(
+            logger,
+            logging.INFO,
+            "Updated PR comment thread",
+            thread=thread_id,
+            key=self.key,
+            requests=requests,
+        )
+        return results
+
+    def __enter__(self) -> "CommentBatch":
+        """Return the batch."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Send the batch unless the block raised."""
+        if exc_type is None:
+            self.send()
+
+
+class AsyncMessage:
+    """Asyncio counterpart of Message posting independent requests concurrently.
+
+    Every call runs the matching Message method on one of ``concurrency``
+    worker threads, so at most that many requests are in flight, and all of
+    them share the connection pool of the session. ``gather`` runs several
+    calls together and returns their results in order::
+
+        async with AsyncMessage() as msg:
+            results = await msg.gather(
+                msg.add_msg(diff), *(msg.add_msg(report) for report in reports)
+            )
+
+    Args:
+        message: Message to send requests with (default: a Message with a pool
+            of ``concurrency`` connections)
+        concurrency: Maximum number of requests in flight
+
+    Comments of one thread are posted one after another, so ``comment.py`` and
+    ``architecture.py``, which post a single ``CommentBatch`` each, use
+    Message directly. AsyncMessage only pays off for independent threads.
+    """
+
+    def __init__(
+        self,
+        message: Optional[Message] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> None:
+        """Initialize the client without opening connections."""
+        self.message = (
+            message
+            if message is not None
+            else Message(session=create_session(pool_size=concurrency))
+        )
+        self.concurrency = concurrency
+        self._owns_message = message is None
+        # The default executor of asyncio may have fewer threads than requests
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="pr-request"
+        )
+
+    async def _run(self, function: Callable[..., T], *args: Any) -> T:
+        """Run a blocking Message method on a worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def add_msg(self, comment: str) -> bool:
+        """Add a comment to the pull request.
+
+        Args:
+            comment: The comment text to add
+
+        Returns:
+            bool: True if comment was added successfully, False otherwise
+        """
+        return await self._run(self.message.add_msg, comment)
+
+    async def upload_attachment_and_comment(
+        self, file_path: Union[str, Path], key: Optional[str] = None
+    ) -> bool:
+        """Upload an attachment and add the comments with the attachment link.
+
+        The upload runs alongside other requests, the thread with the two
+        comments follows it.
+
+        Args:
+            file_path: Path to the file to upload
+            key: Stable name to update the thread of earlier runs instead of
+                adding a new one
+
+        Returns:
+            bool: True if upload and comment were successful, False otherwise
+        """
+        attachment_ref = await self._run(self.message.upload_attachment, file_path)
+        if attachment_ref is None:
             return False
 
+        batch = CommentBatch(self.message, key=key)
+        for comment in attachment_comments(attachment_ref):
+            batch.add(comment)
+        await self.send_batch(batch)
+        return True
+
+    async def send_batch(self, batch: CommentBatch) -> List[bool]:
+        """Post a comment batch alongside other requests.
+
+        The thread and its replies are posted one after another to keep their
+        order.
+
+        Args:
+            batch: Comments to post as one thread
+
+        Returns:
+            List[bool]: Whether each comment of the batch was added
+        """
+        return await self._run(batch.send)
+
+    async def gather(self, *requests: Awaitable[bool]) -> List[bool]:
+        """Run requests concurrently and return their results in order.
+
+        A request raising an exception, e.g. a connection error after all
+        retries, is logged and counted as failed without stopping the others.
+
+        Args:
+            *requests: Calls of add_msg or upload_attachment_and_comment
+
+        Returns:
+            List[bool]: Result of every request
+        """
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        outcomes: List[bool] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                log_event(logger, logging.ERROR, "PR request failed", error=result)
+                outcomes.append(False)
+            else:
+                outcomes.append(result)
+        return outcomes
+
+    def close(self) -> None:
+        """Stop the worker threads and close the message created by this client.
+
+        Blocks until the pending requests are done, use aclose in coroutines.
+        """
+        self._executor.shutdown(wait=True)
+        if self._owns_message:
+            self.message.close()
+
+    async def aclose(self) -> None:
+        """Close the client without blocking the event loop.
+
+        Pending requests finish on the worker threads while other tasks of the
+        event loop keep running.
+        """
+        await asyncio.to_thread(self.close)
+
+    async def __aenter__(self) -> "AsyncMessage":
+        """Return the client."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the message created by this client."""
+        await self.aclose()
+
 
 if __name__ == "__main__":
     # Example usage
     message = Message()
     # message.add_msg("Example comment")
     # message.upload_attachment_and_comment("path/to/diagram.png")
+    message.close()
@@ -2,13 +2,14 @@
 """Module for creating and configuring Azure DevOps repositories and pipelines."""
 import argparse
 import base64
+import logging
 import os
 import subprocess
 import sys
 
 import requests
 
-from azure_pipelines.logging_config import get_logger
+from azure_pipelines.logging_config import get_logger, log_event
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
@@ -50,7 +51,12 @@ class CreateAzureRepo:
             logger.error("Repository ID not set. Create repository first.")
             return
 
-        logger.info(f"Creating new Azure pipelines on repository: {self.new_repo_name}")
+        log_event(
+            logger,
+            logging.INFO,
+            "Creating Azure pipelines",
+            repository=self.new_repo_name,
+        )
         post_url = f"https://dev.azure.com/{self.organization}/{self.parent_project_id}/_apis/pipelines?api-version={self.azure_api_version}"
 
         for stage in self.pipeline_stages:
@@ -81,8 +87,13 @@ class CreateAzureRepo:
             if stage == "pull-request":
                 self._handle_pull_request_pipeline(response)
 
-            logger.info(
-                f"Pipeline creation status: {response.status_code} - {response.reason}"
+            log_event(
+                logger,
+                logging.INFO,
+                "Pipeline creation status",
+                pipeline=body["name"],
+                status=response.status_code,
+                reason=response.reason,
             )
             if response.status_code == 200:
                 logger.info("Pipeline creation succeeded")
@@ -98,15 +109,21 @@ class CreateAzureRepo:
         try:
             self.cicd_pull_request_id = response.json()["id"]
         except (KeyError, ValueError):
-            logger.error(
-                f"Pipeline {self.new_repo_name}-pull-request already exists. Searching for its ID..."
+            log_event(
+                logger,
+                logging.ERROR,
+                "Pipeline already exists, searching for its ID",
+                pipeline=f"{self.new_repo_name}-pull-request",
             )
             get_url = f"https://dev.azure.com/{self.organization}/{self.source_project_name}/_apis/pipelines?api-version={self.azure_api_version}"
 
             search_response = requests.get(url=get_url, headers=self.headers)
             if search_response.status_code != 200:
-                logger.error(
-                    f"Failed to retrieve pipelines: {search_response.status_code}"
+                log_event(
+                    logger,
+                    logging.ERROR,
+                    "Failed to retrieve pipelines",
+                    status=search_response.status_code,
                 )
                 return
 
@@ -116,10 +133,16 @@ class CreateAzureRepo:
                     name = pipeline.get("name", "")
                     if self.new_repo_name in name and "pull-request" in name:
                         self.cicd_pull_request_id = pipeline["id"]
-                        logger.info(f"Found ID for {self.new_repo_name}-pull-request")
+                        log_event(
+                            logger,
+                            logging.INFO,
+                            "Found pipeline ID",
+                            pipeline=name,
+                            id=self.cicd_pull_request_id,
+                        )
                         break
             except (KeyError, ValueError) as e:
-                logger.error(f"Error parsing pipeline data: {e}")
+                log_event(logger, logging.ERROR, "Error parsing pipeline data", error=e)
 
     def create_azure_devops_repo(self) -> bool:
         """Create a new repository within this Azure DevOps project.
@@ -127,7 +150,12 @@ class CreateAzureRepo:
         Returns:
             bool: True if repository was created or found, False otherwise
         """
-        logger.info(f"Creating new Azure repository: {self.new_repo_name}")
+        log_event(
+            logger,
+            logging.INFO,
+            "Creating Azure repository",
+            repository=self.new_repo_name,
+        )
 
         body = {"name": self.new_repo_name, "project": {"id": self.parent_project_id}}
         url = f"https://dev.azure.com/{self.organization}/_apis/git/repositories?api-version={self.azure_api_version}"
@@ -142,8 +170,12 @@ class CreateAzureRepo:
             logger.info("Repository already exists, retrieving ID")
             return self._get_existing_repo_id()
         else:
-            logger.error(
-                f"Failed to create repository: {response.status_code} - {response.reason}"
+            log_event(
+                logger,
+                logging.ERROR,
+                "Failed to create repository",
+                status=response.status_code,
+                reason=response.reason,
             )
             return False
 
@@ -161,11 +193,17 @@ class CreateAzureRepo:
                 self.new_repository_id = response.json()["id"]
                 return True
             except (KeyError, ValueError) as e:
-                logger.error(f"Error parsing repository data: {e}")
+                log_event(
+                    logger, logging.ERROR, "Error parsing repository data", error=e
+                )
                 return False
         else:
-            logger.error(
-                f"Failed to retrieve repository: {response.status_code} - {response.reason}"
+            log_event(
+                logger,
+                logging.ERROR,
+                "Failed to retrieve repository",
+                status=response.status_code,
+                reason=response.reason,
             )
             return False
 
@@ -194,7 +232,7 @@ class CreateAzureRepo:
             logger.info("Git migration completed successfully")
             return True
         except subprocess.SubprocessError as e:
-            logger.error(f"Git migration failed: {e}")
+            log_event(logger, logging.ERROR, "Git migration failed", error=e)
             return False
 
     def create_pull_request_policy(self) -> bool:
@@ -238,8 +276,12 @@ class CreateAzureRepo:
             logger.info("Build validation policy created successfully")
             return True
         else:
-            logger.error(
-                f"Failed to create build validation policy: {response.status_code} - {response.reason}"
+            log_event(
+                logger,
+                logging.ERROR,
+                "Failed to create build validation policy",
+                status=response.status_code,
+                reason=response.reason,
             )
             return False
 
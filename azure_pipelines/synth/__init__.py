@@ -0,0 +1,4 @@
+"""Azure Pipelines Synth module.
+
+This module contains utilities for speeding up and inspecting CDK synthesis.
+"""
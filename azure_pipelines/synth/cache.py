@@ -0,0 +1,313 @@
+"""Module for caching synthesized CDK cloud assemblies.
+
+The cache is keyed by a hash of all inputs that influence the synthesized
+templates. On a hit the previous cloud assembly is copied into the output
+directory, so neither the construct tree nor the jsii kernel is needed.
+
+Configurations referencing SSM parameters are never cached. The config files
+only hold the ``ssm:`` references, a changed parameter value would restore a
+cloud assembly synthesized with the old value.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from azure_pipelines.load_env.resolver import parameter_references
+from azure_pipelines.logging_config import get_logger
+from azure_pipelines.synth.context import load_cdk_context
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Files whose content is part of the cache key, relative to the project directory
+DEFAULT_SOURCES = (
+    "app.py",
+    "cdk.json",
+    "cdk_sample_repo/**/*.py",
+    "azure_pipelines/load_env/**/*.py",
+    "config/**/*.json",
+)
+
+# Installed packages whose version is part of the cache key
+DEFAULT_PACKAGES = ("aws-cdk-lib", "cdk-nag", "aws-pdk", "constructs")
+
+# Environment variables read by the app while building the construct tree
+DEFAULT_ENV_VARS = (
+    "BUILD_SOURCEBRANCHNAME",
+    "BUILD_REPOSITORY_NAME",
+    "AZURE_PIPELINES_CDK_GRAPH",
+)
+
+# Context keys that do not influence the synthesized templates
+IGNORED_CONTEXT_KEYS = ("profile",)
+
+# Name of the file describing the inputs of a cache entry
+INPUTS_FILE = "synth-cache-inputs.json"
+
+# Default cache directory and the environment variable moving it
+DEFAULT_CACHE_DIR = ".synth-cache"
+CACHE_DIR_ENV_VAR = "AZURE_PIPELINES_SYNTH_CACHE_DIR"
+
+
+class SynthCache:
+    """Content-addressed cache for the CDK cloud assembly."""
+
+    def __init__(
+        self,
+        project_dir: Union[str, Path] = ".",
+        outdir: Union[str, Path] = "cdk.out",
+        cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+        context: Optional[Dict[str, Any]] = None,
+        sources: Iterable[str] = DEFAULT_SOURCES,
+        packages: Iterable[str] = DEFAULT_PACKAGES,
+        env_vars: Iterable[str] = DEFAULT_ENV_VARS,
+        enabled: bool = True,
+        max_entries: int = 5,
+    ) -> None:
+        """Initialize the synth cache.
+
+        Args:
+            project_dir: Root directory of the CDK project
+            outdir: Output directory of the cloud assembly
+            cache_dir: Directory holding the cache entries
+            context: CDK context of the app (defaults to the effective context)
+            sources: Glob patterns of files that are part of the cache key
+            packages: Distribution names whose versions are part of the cache key
+            env_vars: Environment variables that are part of the cache key
+            enabled: Whether the cache is used at all
+            max_entries: Number of cache entries to keep
+        """
+        self.project_dir = Path(project_dir)
+        self.outdir = Path(outdir)
+        self.cache_dir = Path(cache_dir)
+        if not self.cache_dir.is_absolute():
+            self.cache_dir = self.project_dir / self.cache_dir
+        self.context = (
+            context if context is not None else load_cdk_context(self.project_dir)
+        )
+        self.sources = tuple(sources)
+        self.packages = tuple(packages)
+        self.env_vars = tuple(env_vars)
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._inputs: Optional[Dict[str, Any]] = None
+        self._references: Optional[List[str]] = None
+
+    @classmethod
+    def from_environment(cls, project_dir: Union[str, Path] = ".") -> "SynthCache":
+        """Create a synth cache configured by the CDK CLI environment.
+
+        The cache can be disabled with AZURE_PIPELINES_SYNTH_CACHE=0 and moved with
+        AZURE_PIPELINES_SYNTH_CACHE_DIR.
+
+        Args:
+            project_dir: Root directory of the CDK project
+
+        Returns:
+            SynthCache: Configured cache instance
+        """
+        setting = os.getenv("AZURE_PIPELINES_SYNTH_CACHE", "1").lower()
+        enabled = setting not in ("0", "false", "no", "off")
+        return cls(
+            project_dir=project_dir,
+            outdir=os.getenv("CDK_OUTDIR", "cdk.out"),
+            cache_dir=os.getenv(CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR),
+            enabled=enabled,
+        )
+
+    def _source_files(self) -> List[Path]:
+        """Collect all source files that are part of the cache key."""
+        files = set()
+        for pattern in self.sources:
+            files.update(p for p in self.project_dir.glob(pattern) if p.is_file())
+        return sorted(files)
+
+    def _relative(self, path: Path) -> str:
+        """Get the POSIX path of a file relative to the project directory."""
+        return path.relative_to(self.project_dir).as_posix()
+
+    @staticmethod
+    def _file_hash(path: Path) -> str:
+        """Get the SHA-256 digest of a file."""
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    @staticmethod
+    def _package_version(package: str) -> str:
+        """Get the installed version of a package without importing it."""
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return "not-installed"
+
+    @property
+    def references(self) -> List[str]:
+        """Names of the SSM parameters referenced by the synth inputs.
+
+        Returns:
+            Sorted parameter names of the JSON source files and the context.
+        """
+        if self._references is None:
+            names = set(parameter_references(self.context))
+            for path in self._source_files():
+                if path.suffix != ".json":
+                    continue
+                try:
+                    names.update(parameter_references(json.loads(path.read_bytes())))
+                except json.JSONDecodeError:
+                    continue
+            self._references = sorted(names)
+        return self._references
+
+    def _skipped(self) -> bool:
+        """Check whether the cache must not be used for the current inputs."""
+        if not self.enabled:
+            return True
+        if self.references:
+            logger.info(
+                f"Synth cache skipped, the configuration references "
+                f"{len(self.references)} SSM parameters"
+            )
+            return True
+        return False
+
+    @property
+    def inputs(self) -> Dict[str, Any]:
+        """All inputs of the cache key.
+
+        Returns:
+            A JSON serializable description of the synth inputs.
+        """
+        if self._inputs is None:
+            self._inputs = {
+                "files": {
+                    self._relative(path): self._file_hash(path)
+                    for path in self._source_files()
+                },
+                "context": {
+                    key: value
+                    for key, value in self.context.items()
+                    if key not in IGNORED_CONTEXT_KEYS
+                },
+                "packages": {
+                    package: self._package_version(package) for package in self.packages
+                },
+                "env": {name: os.getenv(name) for name in self.env_vars},
+                "python": sys.version_info[:2],
+            }
+        return self._inputs
+
+    @property
+    def key(self) -> str:
+        """Content hash of all synth inputs.
+
+        Returns:
+            str: Hex digest identifying the cache entry
+        """
+        payload = json.dumps(self.inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def entry_dir(self) -> Path:
+        """Directory of the cache entry for the current inputs."""
+        return self.cache_dir / self.key
+
+    def restore(self) -> bool:
+        """Restore the cloud assembly from the cache.
+
+        An entry removed while it is copied, e.g. pruned by a concurrent synth,
+        counts as a miss.
+
+        Returns:
+            bool: True if the cloud assembly was restored, False on a cache miss
+        """
+        if not self.enabled:
+            logger.info("Synth cache is disabled")
+            return False
+        if self._skipped():
+            return False
+
+        entry = self.entry_dir
+        if not (entry / "manifest.json").is_file():
+            logger.info(f"Synth cache miss for key {self.key[:12]}")
+            return False
+
+        try:
+            shutil.copytree(entry, self.outdir, dirs_exist_ok=True)
+            # Mark the entry as recently used for pruning
+            os.utime(entry)
+        except (OSError, shutil.Error) as e:
+            logger.warning(f"Failed to restore synth cache entry {self.key[:12]}: {e}")
+            return False
+        (self.outdir / INPUTS_FILE).unlink(missing_ok=True)
+        logger.info(f"Synth cache hit for key {self.key[:12]}, restored {self.outdir}")
+        return True
+
+    def store(self, outdir: Optional[Union[str, Path]] = None) -> bool:
+        """Store the current cloud assembly in the cache.
+
+        Args:
+            outdir: Directory of the synthesized cloud assembly (defaults to outdir)
+
+        Returns:
+            bool: True if a cache entry was written, False otherwise
+        """
+        if self._skipped():
+            return False
+
+        source = Path(outdir) if outdir is not None else self.outdir
+        if not (source / "manifest.json").is_file():
+            logger.warning(f"No cloud assembly found in {source}, not caching")
+            return False
+
+        entry = self.entry_dir
+        if entry.exists():
+            return True
+
+        # Copy to a temporary directory first so that readers never see partial entries
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.cache_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            shutil.copytree(source, tmp_dir)
+            with (tmp_dir / INPUTS_FILE).open("w") as json_file:
+                json.dump(self.inputs, json_file, indent=2, sort_keys=True, default=str)
+            os.replace(tmp_dir, entry)
+        except OSError as e:
+            logger.warning(f"Failed to store synth cache entry: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        logger.info(f"Stored synth cache entry {self.key[:12]}")
+        self.prune()
+        return True
+
+    def prune(self) -> None:
+        """Remove the least recently used entries beyond max_entries.
+
+        Only directories holding a cloud assembly are entries, other synths may
+        remove them at the same time.
+        """
+        if not self.cache_dir.is_dir():
+            return
+
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.name[0] == ".":
+                continue
+            try:
+                if (path / "manifest.json").is_file():
+                    entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        stale_entries = [path for _, path in entries[self.max_entries :]]  # noqa: E203
+        for stale in stale_entries:
+            logger.debug(f"Pruning synth cache entry {stale.name[:12]}")
+            shutil.rmtree(stale, ignore_errors=True)
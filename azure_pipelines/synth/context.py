@@ -0,0 +1,72 @@
+"""Module for reading the CDK context without starting the jsii kernel."""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Union
+
+from azure_pipelines.logging_config import get_logger
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Environment variables used by the CDK CLI to hand the context to the app
+CONTEXT_ENV = "CDK_CONTEXT_JSON"
+CONTEXT_OVERFLOW_ENV = "CONTEXT_OVERFLOW_LOCATION_ENV"
+
+
+def load_cdk_context(project_dir: Union[str, Path] = ".") -> Dict[str, Any]:
+    """Load the effective CDK context of the app.
+
+    The context of ``cdk.json`` is merged with the context passed by the CDK CLI,
+    so that values given with ``--context`` take precedence.
+
+    Args:
+        project_dir: Directory containing the cdk.json file
+
+    Returns:
+        The merged context as a dictionary.
+    """
+    context: Dict[str, Any] = {}
+
+    cdk_json = Path(project_dir) / "cdk.json"
+    if cdk_json.is_file():
+        try:
+            with cdk_json.open() as json_file:
+                context.update(json.load(json_file).get("context", {}))
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring invalid cdk.json: {e}")
+
+    env_context = os.getenv(CONTEXT_ENV)
+    if env_context:
+        context.update(json.loads(env_context))
+
+    # Large contexts are written to a file by the CDK CLI instead
+    overflow_file = os.getenv(CONTEXT_OVERFLOW_ENV)
+    if overflow_file and Path(overflow_file).is_file():
+        with open(overflow_file) as json_file:
+            context.update(json.load(json_file))
+
+    return context
+
+
+def context_flag(
+    context: Dict[str, Any], key: str, env_var: str, default: bool = False
+) -> bool:
+    """Read a boolean switch from the CDK context or an environment variable.
+
+    Args:
+        context: CDK context as returned by load_cdk_context
+        key: Name of the context key
+        env_var: Name of the environment variable used as fallback
+        default: Value to use if neither is set
+
+    Returns:
+        The value of the switch.
+    """
+    value = context.get(key, os.getenv(env_var))
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
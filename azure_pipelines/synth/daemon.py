@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""Module for a long-running synth daemon keeping the CDK runtime warm.
+
+A cold ``cdk synth`` starts a new interpreter, imports ``aws_cdk`` and boots a
+jsii node kernel before any construct code runs. The daemon pays for this once,
+watches the files selected by ``watch.include``/``watch.exclude`` of cdk.json,
+re-synthesizes into the output directory on changes and answers synth requests
+of the client commands.
+
+Usage::
+
+    python -m azure_pipelines.synth.daemon serve -c environment=developer
+    python -m azure_pipelines.synth.daemon synth -c environment=developer
+    python -m azure_pipelines.synth.daemon stop
+"""
+
+import argparse
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple, Union
+
+from azure_pipelines.logging_config import DEFAULT_LOG_DIR, LOG_DIR_ENV_VAR, get_logger
+from azure_pipelines.synth.cache import SynthCache
+from azure_pipelines.synth.context import context_flag, load_cdk_context
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# File describing how to reach a running daemon, relative to the project directory
+STATE_FILE = ".synth-daemon.json"
+
+# Paths the CDK CLI never watches in addition to watch.exclude
+DEFAULT_EXCLUDES = ("cdk.out", "**/.*", "**/node_modules", "**/__pycache__", "**/*.pyc")
+
+# Modules that are reloaded when a Python source file changes
+PROJECT_MODULES = ("cdk_sample_repo", "azure_pipelines.load_env")
+
+# Snapshot of the watched files: relative path -> (mtime in ns, size)
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def compile_glob(pattern: str) -> Pattern[str]:
+    """Compile a watch glob into a regular expression.
+
+    ``**`` matches any number of directories, ``*`` and ``?`` do not match
+    path separators.
+
+    Args:
+        pattern: Glob pattern relative to the project directory
+
+    Returns:
+        The compiled regular expression.
+    """
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+        elif pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+        elif pattern[index] == "*":
+            regex += "[^/]*"
+            index += 1
+        elif pattern[index] == "?":
+            regex += "[^/]"
+            index += 1
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+    return re.compile(regex + r"\Z")
+
+
+def log_directory_pattern(project_dir: Union[str, Path]) -> Optional[str]:
+    """Get the log directory relative to the project directory.
+
+    Args:
+        project_dir: Root directory of the watched files
+
+    Returns:
+        The relative path of the log directory, or None if it is outside the
+        project directory.
+    """
+    log_dir = Path(os.environ.get(LOG_DIR_ENV_VAR) or DEFAULT_LOG_DIR).resolve()
+    try:
+        relative = log_dir.relative_to(Path(project_dir).resolve())
+    except ValueError:
+        return None
+    return relative.as_posix() if relative.parts else None
+
+
+class FileWatcher:
+    """Detect changed files by polling their modification times.
+
+    The log directory of ``AZURE_PIPELINES_LOG_DIR`` is never watched if it is
+    inside the project, otherwise every log write of a synth would trigger the
+    next one.
+
+    Args:
+        project_dir: Root directory of the watched files
+        include: Glob patterns of watched files
+        exclude: Glob patterns of ignored files and directories
+    """
+
+    def __init__(
+        self,
+        project_dir: Union[str, Path] = ".",
+        include: Iterable[str] = ("**",),
+        exclude: Iterable[str] = (),
+    ) -> None:
+        """Initialize the watcher and take the first snapshot."""
+        self.project_dir = Path(project_dir)
+        self.include = [compile_glob(pattern) for pattern in include]
+        exclude = [*DEFAULT_EXCLUDES, *exclude]
+        log_dir = log_directory_pattern(self.project_dir)
+        if log_dir is not None:
+            exclude.append(log_dir)
+        self.exclude = [compile_glob(pattern) for pattern in exclude]
+        self.snapshot = self.scan()
+
+    @classmethod
+    def from_cdk_json(
+        cls, project_dir: Union[str, Path] = ".", outdir: Optional[str] = None
+    ) -> "FileWatcher":
+        """Create a watcher from the watch settings of cdk.json.
+
+        Args:
+            project_dir: Directory containing the cdk.json file
+            outdir: Output directory of the daemon, never watched
+
+        Returns:
+            FileWatcher: Watcher for the configured files
+        """
+        watch: Dict[str, List[str]] = {}
+        cdk_json = Path(project_dir) / "cdk.json"
+        if cdk_json.is_file():
+            with cdk_json.open() as json_file:
+                watch = json.load(json_file).get("watch", {})
+
+        exclude = list(watch.get("exclude", []))
+        if outdir and not Path(outdir).is_absolute():
+            exclude.append(Path(outdir).as_posix())
+        return cls(project_dir, watch.get("include", ["**"]), exclude)
+
+    def _excluded(self, relative: str) -> bool:
+        """Check whether a path or one of its parent directories is excluded."""
+        parts = relative.split("/")
+        for depth in range(1, len(parts) + 1):
+            prefix = "/".join(parts[:depth])
+            if any(pattern.match(prefix) for pattern in self.exclude):
+                return True
+        return False
+
+    def scan(self) -> Snapshot:
+        """Take a snapshot of all watched files.
+
+        Returns:
+            Modification time and size of every watched file.
+        """
+        snapshot: Snapshot = {}
+        for root, dirs, files in os.walk(self.project_dir):
+            root_path = Path(root)
+            relative_root = root_path.relative_to(self.project_dir).as_posix()
+            relative_root = "" if relative_root == "." else f"{relative_root}/"
+
+            # Do not descend into excluded directories
+            dirs[:] = [d for d in dirs if not self._excluded(relative_root + d)]
+
+            for name in files:
+                relative = relative_root + name
+                if self._excluded(relative):
+                    continue
+                if not any(pattern.match(relative) for pattern in self.include):
+                    continue
+                try:
+                    stat = (root_path / name).stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[relative] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self) -> List[str]:
+        """Return all files changed, added or removed since the last poll.
+
+        Returns:
+            Sorted relative paths of the changed files.
+        """
+        current = self.scan()
+        changed = {
+            path
+            for path in current.keys() | self.snapshot.keys()
+            if current.get(path) != self.snapshot.get(path)
+        }
+        self.snapshot = current
+        return sorted(changed)
+
+
+def reload_project_modules(prefixes: Iterable[str] = PROJECT_MODULES) -> None:
+    """Drop project modules from the module cache so they are imported again.
+
+    The CDK libraries stay loaded, so the jsii kernel keeps running.
+
+    Args:
+        prefixes: Names of the packages to reload
+    """
+    for name in list(sys.modules):
+        if any(name == prefix or name.startswith(f"{prefix}.") for prefix in prefixes):
+            del sys.modules[name]
+
+
+def default_synthesize(
+    context: Dict[str, Any], outdir: Union[str, Path], graph: bool
+) -> Union[str, Path]:
+    """Synthesize the CDK app in this process.
+
+    Args:
+        context: CDK context of the app
+        outdir: Output directory of the cloud assembly
+        graph: Whether to generate the CDK graph diagram
+
+    Returns:
+        The output directory of the cloud assembly.
+    """
+    from cdk_sample_repo.cdk_sample_repo_app import synthesize
+
+    return synthesize(context=context, outdir=outdir, graph=graph).outdir
+
+
+class SynthDaemon:
+    """Serve synth requests from a warm interpreter and jsii kernel.
+
+    All synths are serialized, because the jsii kernel does not support
+    concurrent calls.
+
+    Args:
+        project_dir: Root directory of the CDK project
+        context: Context overrides used for synths triggered by file changes
+        outdir: Output directory for synths triggered by file changes
+        synthesize: Callable synthesizing the app (defaults to the CDK app)
+        use_cache: Whether to use the synth cache
+    """
+
+    def __init__(
+        self,
+        project_dir: Union[str, Path] = ".",
+        context: Optional[Dict[str, Any]] = None,
+        outdir: str = "cdk.out",
+        synthesize: Callable[..., Any] = default_synthesize,
+        use_cache: bool = True,
+    ) -> None:
+        """Initialize the daemon."""
+        self.project_dir = Path(project_dir).resolve()
+        self.context = dict(context or {})
+        self.outdir = outdir
+        self.synthesize = synthesize
+        self.use_cache = use_cache
+        self.watcher = FileWatcher.from_cdk_json(self.project_dir, outdir)
+        self.synth_count = 0
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._python_sources = self._python_snapshot()
+
+    def _python_snapshot(self) -> Snapshot:
+        """Get the snapshot of the watched Python sources."""
+        return {
+            path: stamp
+            for path, stamp in self.watcher.scan().items()
+            if path.endswith(".py")
+        }
+
+    def synth(
+        self,
+        context: Optional[Dict[str, Any]] = None,
+        outdir: Optional[Union[str, Path]] = None,
+    ) -> Dict[str, Any]:
+        """Synthesize the app.
+
+        Args:
+            context: Context overrides merged into the context of cdk.json
+            outdir: Output directory (defaults to the daemon output directory)
+
+        Returns:
+            The result of the synth.
+        """
+        outdir_path = Path(outdir or self.outdir)
+        if not outdir_path.is_absolute():
+            outdir_path = self.project_dir / outdir_path
+
+        with self._lock:
+            start = time.perf_counter()
+            merged = load_cdk_context(self.project_dir)
+            merged.update(self.context if context is None else context)
+
+            # Pick up changed construct code without restarting the kernel
+            python_sources = self._python_snapshot()
+            if python_sources != self._python_sources:
+                logger.info("Python sources changed, reloading project modules")
+                reload_project_modules()
+                self._python_sources = python_sources
+
+            try:
+                cache = SynthCache(
+                    project_dir=self.project_dir,
+                    outdir=outdir_path,
+                    context=merged,
+                    enabled=self.use_cache,
+                )
+                cache_hit = cache.restore()
+                if not cache_hit:
+                    graph = context_flag(merged, "graph", "AZURE_PIPELINES_CDK_GRAPH")
+                    self.synthesize(merged, outdir_path, graph)
+                    cache.store(outdir_path)
+                result = {"success": True, "cacheHit": cache_hit}
+            except Exception as exc:
+                logger.exception(f"Synth failed: {exc}")
+                result = {"success": False, "error": str(exc)}
+
+            result.update(
+                {
+                    "outdir": str(outdir_path),
+                    "seconds": round(time.perf_counter() - start, 3),
+                }
+            )
+            self.synth_count += 1
+            self.last_result = result
+            logger.info(f"Synth finished in {result['seconds']}s: {result}")
+            return result
+
+    def watch(self, interval: float = 1.0) -> None:
+        """Re-synthesize whenever a watched file changes.
+
+        Args:
+            interval: Seconds between two polls
+        """
+        while not self._stopped.wait(interval):
+            changed = self.watcher.poll()
+            if changed:
+                logger.info(f"Detected changes in {', '.join(changed[:5])}")
+                self.synth()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a single client request.
+
+        Args:
+            request: Request with a 'command' and its arguments
+
+        Returns:
+            The response for the client.
+        """
+        command = request.get("command")
+        if command == "synth":
+            return self.synth(request.get("context"), request.get("outdir"))
+        if command == "status":
+            return {
+                "success": True,
+                "pid": os.getpid(),
+                "synthCount": self.synth_count,
+                "lastResult": self.last_result,
+            }
+        if command == "stop":
+            self._stopped.set()
+            return {"success": True}
+        return {"success": False, "error": f"Unknown command: {command}"}
+
+    def serve(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        watch: bool = True,
+        interval: float = 1.0,
+        state_file: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """Serve client requests until a stop request arrives.
+
+        Args:
+            host: Address to listen on
+            port: Port to listen on (0 picks a free port)
+            watch: Whether to re-synthesize on file changes
+            interval: Seconds between two polls of the watched files
+            state_file: File telling clients how to connect
+        """
+        state_path = Path(state_file or self.project_dir / STATE_FILE)
+        authkey = secrets.token_bytes(32)
+
+        with Listener((host, port), authkey=authkey) as listener:
+            address = listener.address
+            write_state(state_path, address, authkey)
+            logger.info(f"Synth daemon listening on {address[0]}:{address[1]}")
+
+            if watch:
+                threading.Thread(
+                    target=self.watch, args=(interval,), daemon=True
+                ).start()
+
+            try:
+                while not self._stopped.is_set():
+                    try:
+                        connection = listener.accept()
+                    except Exception as exc:
+                        logger.warning(f"Rejected client connection: {exc}")
+                        continue
+                    with connection:
+                        request = connection.recv()
+                        connection.send(self.handle(request))
+            finally:
+                self._stopped.set()
+                state_path.unlink(missing_ok=True)
+                logger.info("Synth daemon stopped")
+
+
+def write_state(path: Path, address: Tuple[str, int], authkey: bytes) -> None:
+    """Write the connection details of the daemon, readable only by the owner.
+
+    Args:
+        path: Path of the state file
+        address: Host and port of the daemon
+        authkey: Key clients must authenticate with
+    """
+    state = {
+        "host": address[0],
+        "port": address[1],
+        "authkey": authkey.hex(),
+        "pid": os.getpid(),
+    }
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "w") as state_file:
+        json.dump(state, state_file)
+
+
+def request_daemon(
+    request: Dict[str, Any], state_file: Union[str, Path] = STATE_FILE
+) -> Dict[str, Any]:
+    """Send a request to a running daemon.
+
+    Args:
+        request: Request with a 'command' and its arguments
+        state_file: File written by the daemon on startup
+
+    Returns:
+        The response of the daemon.
+
+    Raises:
+        ConnectionError: If no daemon is running.
+    """
+    try:
+        with open(state_file) as json_file:
+            state = json.load(json_file)
+    except FileNotFoundError:
+        raise ConnectionError(
+            "Synth daemon is not running, start it with "
+            "'python -m azure_pipelines.synth.daemon serve'"
+        ) from None
+
+    with Client(
+        (state["host"], state["port"]), authkey=bytes.fromhex(state["authkey"])
+    ) as connection:
+        connection.send(request)
+        return connection.recv()
+
+
+def parse_context(values: Optional[List[str]]) -> Dict[str, Any]:
+    """Parse key=value context arguments.
+
+    Args:
+        values: Arguments in the form key=value
+
+    Returns:
+        The context values.
+    """
+    context: Dict[str, Any] = {}
+    for value in values or []:
+        key, _, raw = value.partition("=")
+        context[key] = raw
+    return context
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Warm CDK synth daemon")
+    parser.add_argument("command", choices=["serve", "synth", "status", "stop"])
+    parser.add_argument(
+        "-c",
+        "--context",
+        action="append",
+        help="Context value key=value, can be repeated",
+    )
+    parser.add_argument(
+        "-o",
+        "--outdir",
+        default=os.getenv("CDK_OUTDIR", "cdk.out"),
+        help="Output directory of the cloud assembly",
+    )
+    parser.add_argument("--port", type=int, default=0, help="Port of the daemon")
+    parser.add_argument(
+        "--interval", type=float, default=1.0, help="Seconds between file polls"
+    )
+    parser.add_argument(
+        "--no-watch", action="store_true", help="Do not watch files for changes"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Do not use the synth cache"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the daemon or send a command to it."""
+    args = parse_arguments()
+    context = parse_context(args.context)
+
+    if args.command == "serve":
+        # The daemon gets its context and output directory from the requests
+        os.environ.pop("CDK_CONTEXT_JSON", None)
+        os.environ.pop("CDK_OUTDIR", None)
+
+        daemon = SynthDaemon(
+            context=context, outdir=args.outdir, use_cache=not args.no_cache
+        )
+        daemon.serve(port=args.port, watch=not args.no_watch, interval=args.interval)
+        return
+
+    request: Dict[str, Any] = {"command": args.command}
+    if args.command == "synth":
+        # Forward the context of the CDK CLI when used as the app command
+        cli_context = json.loads(os.getenv("CDK_CONTEXT_JSON", "{}"))
+        request["context"] = {**cli_context, **context}
+        request["outdir"] = str(Path(args.outdir).resolve())
+
+    try:
+        response = request_daemon(request)
+    except ConnectionError as exc:
+        logger.error(str(exc))
+        sys.exit(2)
+
+    print(json.dumps(response, indent=2))
+    if not response.get("success"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Module for synthesizing all environments of the CDK app in parallel.
+
+Every environment file in the config directory is synthesized by its own
+``app.py`` process into its own output directory. A combined manifest lists
+the result of all environments. Every environment keeps its synth cache
+entries in its own subdirectory of the synth cache, so environments neither
+evict nor prune the entries of each other. Log files are written to a
+subdirectory per environment of ``AZURE_PIPELINES_LOG_DIR`` as well, so no two
+processes rotate the same file.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from azure_pipelines.logging_config import LOG_DIR_ENV_VAR, get_logger
+from azure_pipelines.synth.cache import CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR
+from azure_pipelines.synth.context import load_cdk_context
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Name of the combined manifest in the output directory
+MANIFEST_FILE = "environments.json"
+
+
+def discover_environments(config_dir: Union[str, Path] = "config") -> List[str]:
+    """Find all environments with a config file.
+
+    Files starting with an underscore are shared layers, not environments.
+
+    Args:
+        config_dir: Directory containing the environment JSON files
+
+    Returns:
+        Sorted list of environment names.
+    """
+    return sorted(
+        path.stem
+        for path in Path(config_dir).glob("*.json")
+        if not path.name.startswith("_")
+    )
+
+
+def read_stacks(outdir: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """Read the stack artifacts of a cloud assembly.
+
+    Args:
+        outdir: Directory of the cloud assembly
+
+    Returns:
+        Stack artifacts keyed by artifact ID.
+    """
+    manifest_path = Path(outdir) / "manifest.json"
+    if not manifest_path.is_file():
+        return {}
+
+    with manifest_path.open() as json_file:
+        artifacts = json.load(json_file).get("artifacts", {})
+
+    return {
+        artifact_id: {
+            "stackName": artifact.get("properties", {}).get("stackName", artifact_id),
+            "environment": artifact.get("environment"),
+            "templateFile": artifact.get("properties", {}).get("templateFile"),
+        }
+        for artifact_id, artifact in artifacts.items()
+        if artifact.get("type") == "aws:cloudformation:stack"
+    }
+
+
+def synth_environment(
+    environment: str,
+    outdir: Union[str, Path],
+    project_dir: Union[str, Path] = ".",
+    app_command: Optional[Sequence[str]] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Synthesize a single environment in a separate process.
+
+    Args:
+        environment: Name of the environment to synthesize
+        outdir: Output directory of the cloud assembly
+        project_dir: Root directory of the CDK project
+        app_command: Command running the CDK app (defaults to app.py)
+        context: CDK context shared by all environments
+
+    Returns:
+        The result of the synthesis.
+    """
+    command = list(app_command or [sys.executable, "app.py"])
+    app_context = dict(
+        context if context is not None else load_cdk_context(project_dir)
+    )
+    app_context["environment"] = environment
+
+    env = dict(os.environ)
+    env["CDK_OUTDIR"] = str(outdir)
+    env["CDK_CONTEXT_JSON"] = json.dumps(app_context)
+    cache_dir = Path(os.environ.get(CACHE_DIR_ENV_VAR) or DEFAULT_CACHE_DIR)
+    env[CACHE_DIR_ENV_VAR] = str(cache_dir / environment)
+    if os.environ.get(LOG_DIR_ENV_VAR):
+        log_dir = Path(os.environ[LOG_DIR_ENV_VAR]).absolute()
+        env[LOG_DIR_ENV_VAR] = str(log_dir / environment)
+
+    logger.info(f"Synthesizing environment {environment} into {outdir}")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        command,
+        cwd=project_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    duration = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        logger.error(
+            f"Synthesizing environment {environment} failed: {completed.stderr[-2000:]}"
+        )
+    else:
+        logger.info(f"Synthesized environment {environment} in {duration:.1f}s")
+
+    return {
+        "environment": environment,
+        "outdir": str(outdir),
+        "success": completed.returncode == 0,
+        "returnCode": completed.returncode,
+        "durationSeconds": round(duration, 3),
+        "stacks": read_stacks(Path(project_dir) / outdir),
+    }
+
+
+def synthesize_all(
+    environments: Optional[Sequence[str]] = None,
+    project_dir: Union[str, Path] = ".",
+    config_dir: Union[str, Path] = "config",
+    outdir: Union[str, Path] = "cdk.out",
+    max_workers: Optional[int] = None,
+    app_command: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Synthesize several environments in parallel worker processes.
+
+    Every environment is written to ``<outdir>/<environment>`` and a combined
+    manifest is written to ``<outdir>/environments.json``.
+
+    Args:
+        environments: Environments to synthesize (defaults to all config files)
+        project_dir: Root directory of the CDK project
+        config_dir: Directory containing the environment JSON files
+        outdir: Parent output directory of all cloud assemblies
+        max_workers: Maximum number of concurrent synth processes
+        app_command: Command running the CDK app (defaults to app.py)
+
+    Returns:
+        The combined manifest.
+    """
+    project_path = Path(project_dir)
+    if environments is None:
+        environments = discover_environments(project_path / config_dir)
+
+    context = load_cdk_context(project_path)
+    workers = max_workers or min(len(environments), os.cpu_count() or 1) or 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                synth_environment,
+                environment,
+                Path(outdir) / environment,
+                project_path,
+                app_command,
+                context,
+            )
+            for environment in environments
+        ]
+        results = [future.result() for future in futures]
+
+    manifest = {
+        "success": all(result["success"] for result in results),
+        "durationSeconds": round(time.perf_counter() - start, 3),
+        "maxWorkers": workers,
+        "environments": {result["environment"]: result for result in results},
+    }
+
+    manifest_path = project_path / outdir / MANIFEST_FILE
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with manifest_path.open("w") as json_file:
+        json.dump(manifest, json_file, indent=2)
+
+    logger.info(
+        f"Synthesized {len(results)} environments in {manifest['durationSeconds']}s, "
+        f"manifest written to {manifest_path}"
+    )
+    return manifest
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Synthesize all CDK environments in parallel"
+    )
+    parser.add_argument(
+        "-e",
+        "--environment",
+        action="append",
+        dest="environments",
+        help="Environment to synthesize, can be repeated (default: all in config/)",
+    )
+    parser.add_argument(
+        "-o",
+        "--outdir",
+        default="cdk.out",
+        help="Parent output directory of the cloud assemblies",
+    )
+    parser.add_argument(
+        "-w",
+        "--max-workers",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent synth processes",
+    )
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Synthesize all environments and fail if any of them failed."""
+    args = parse_arguments()
+
+    manifest = synthesize_all(
+        environments=args.environments,
+        outdir=args.outdir,
+        max_workers=args.max_workers,
+    )
+
+    if not manifest["success"]:
+        failed = [
+            name
+            for name, result in manifest["environments"].items()
+            if not result["success"]
+        ]
+        logger.error(f"Synthesis failed for environments: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Module for profiling the phases of a CDK synth run.
+
+The profiler records the wall time, the Python allocation peak (tracemalloc) and
+the resident set size of every phase and writes them to ``synth-profile.json``
+in the cloud assembly directory. The resident set size only covers the Python
+process, the jsii node kernel runs in a separate child process.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from azure_pipelines.logging_config import get_logger
+from azure_pipelines.synth.context import context_flag
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+# Name of the profile written to the cloud assembly directory
+PROFILE_FILE = "synth-profile.json"
+
+# Version of the profile format, increase on incompatible changes
+PROFILE_VERSION = 1
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Get the peak resident set size of the current process.
+
+    Returns:
+        The peak RSS in bytes or None if it cannot be determined.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class SynthProfiler:
+    """Collect timings and memory usage of the synth phases."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        """Initialize the profiler.
+
+        Args:
+            enabled: Whether to record anything at all
+        """
+        self.enabled = enabled
+        self.phases: List[Dict[str, Any]] = []
+        self.aspects: Dict[str, Dict[str, Any]] = {}
+        self._start = time.perf_counter()
+
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_context(cls, context: Dict[str, Any]) -> "SynthProfiler":
+        """Create a profiler enabled by the CDK context.
+
+        Profiling is enabled with ``--context profile=true`` or
+        AZURE_PIPELINES_SYNTH_PROFILE=1.
+
+        Args:
+            context: CDK context as returned by load_cdk_context
+
+        Returns:
+            SynthProfiler: Enabled or disabled profiler
+        """
+        return cls(
+            enabled=context_flag(context, "profile", "AZURE_PIPELINES_SYNTH_PROFILE")
+        )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Measure a phase of the synth run.
+
+        Args:
+            name: Name of the phase in the report
+        """
+        if not self.enabled:
+            yield
+            return
+
+        tracemalloc.reset_peak()
+        traced_start, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _, traced_peak = tracemalloc.get_traced_memory()
+            self.phases.append(
+                {
+                    "name": name,
+                    "seconds": round(seconds, 6),
+                    "tracemallocPeakBytes": traced_peak,
+                    "tracemallocPeakIncreaseBytes": traced_peak - traced_start,
+                    "peakRssBytes": peak_rss_bytes(),
+                }
+            )
+            logger.debug(f"Synth phase {name} took {seconds:.3f}s")
+
+    def add_aspect_time(self, name: str, seconds: float) -> None:
+        """Add the duration of a single aspect visit.
+
+        Args:
+            name: Name of the aspect
+            seconds: Duration of the visit
+        """
+        stats = self.aspects.setdefault(name, {"seconds": 0.0, "visits": 0})
+        stats["seconds"] += seconds
+        stats["visits"] += 1
+
+    def timed_aspect(self, name: str, aspect: Any) -> Any:
+        """Wrap an aspect to measure the time spent visiting constructs.
+
+        Aspects run inside ``app.synth()``, so their time is only visible through
+        such a wrapper. The wrapper adds a Python callback per visited construct,
+        which is included in the measured time. Without profiling the aspect is
+        returned unchanged.
+
+        Args:
+            name: Name of the aspect in the report
+            aspect: The aspect to wrap
+
+        Returns:
+            The wrapped or the original aspect.
+        """
+        if not self.enabled:
+            return aspect
+
+        import jsii
+        from aws_cdk import IAspect
+
+        profiler = self
+
+        @jsii.implements(IAspect)
+        class TimedAspect:
+            def visit(self, node: Any) -> None:
+                start = time.perf_counter()
+                try:
+                    aspect.visit(node)
+                finally:
+                    profiler.add_aspect_time(name, time.perf_counter() - start)
+
+        return TimedAspect()
+
+    def report(self, **metadata: Any) -> Dict[str, Any]:
+        """Build the profile report.
+
+        Args:
+            **metadata: Additional fields describing the run
+
+        Returns:
+            The JSON serializable report.
+        """
+        traced_peak = max(
+            (phase["tracemallocPeakBytes"] for phase in self.phases), default=0
+        )
+        return {
+            "version": PROFILE_VERSION,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "python": ".".join(map(str, sys.version_info[:3])),
+            **metadata,
+            "totalSeconds": round(time.perf_counter() - self._start, 6),
+            "peakRssBytes": peak_rss_bytes(),
+            "tracemallocPeakBytes": traced_peak,
+            "phases": self.phases,
+            "aspects": {
+                name: {"seconds": round(stats["seconds"], 6), "visits": stats["visits"]}
+                for name, stats in self.aspects.items()
+            },
+        }
+
+    def write(self, outdir: Union[str, Path], **metadata: Any) -> Optional[Path]:
+        """Write the profile report into the cloud assembly directory.
+
+        Args:
+            outdir: Directory of the cloud assembly
+            **metadata: Additional fields describing the run
+
+        Returns:
+            The path of the written report or None if profiling is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        path = Path(outdir) / PROFILE_FILE
+        os.makedirs(path.parent, exist_ok=True)
+        with path.open("w") as json_file:
+            json.dump(self.report(**metadata), json_file, indent=2)
+
+        logger.info(f"Synth profile written to {path}")
+        return path
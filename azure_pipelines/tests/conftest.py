@@ -36,6 +36,7 @@ def azure_devops_env():
 def mock_pull_request_comment(mocker):
     """Fixture to mock the pull_request_comment.Message class."""
     mock_msg = MagicMock()
+    mock_msg.__enter__.return_value = mock_msg
     mocker.patch(
         "azure_pipelines.pull_requests.pull_request_comment.Message",
         return_value=mock_msg,
@@ -0,0 +1,231 @@
+"""Local fake of the Azure DevOps pull request REST API.
+
+Serves the thread, comment and attachment endpoints used by ``Message`` over
+HTTP/1.1 with keep-alive. Every new connection sleeps ``handshake_delay``
+seconds to stand in for the TCP and TLS handshakes with dev.azure.com, every
+request sleeps ``latency`` seconds. Used by the tests and ``bench_pr_comment``.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FakeAzureDevOps(ThreadingHTTPServer):
+    """Fake Azure DevOps server recording requests and connections.
+
+    Args:
+        handshake_delay: Seconds every new connection takes to open
+        latency: Seconds every request takes to answer
+        failures: Status codes returned by the next requests, None lets a
+            request succeed
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        handshake_delay: float = 0.0,
+        latency: float = 0.0,
+        failures: Optional[List[Optional[int]]] = None,
+    ) -> None:
+        """Bind the server to a free local port."""
+        super().__init__(("127.0.0.1", 0), _FakeAzureDevOpsHandler)
+        self.handshake_delay = handshake_delay
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: List[Tuple[str, str, bytes]] = []
+        self.threads: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def collection_uri(self) -> str:
+        """URL to use as SYSTEM_COLLECTIONURI."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def environment(self) -> Dict[str, str]:
+        """Pipeline variables pointing Message at this server."""
+        return {
+            "SYSTEM_COLLECTIONURI": self.collection_uri,
+            "SYSTEM_PULLREQUEST_PULLREQUESTID": "22",
+            "SYSTEM_TEAMPROJECT": "fabrikam",
+            "BUILD_REPOSITORY_ID": "repository",
+            "SYSTEM_ACCESSTOKEN": "token",
+            "BUILD_SOURCEVERSION": "abcdef123456",
+        }
+
+    def start(self) -> "FakeAzureDevOps":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeAzureDevOps":
+        """Start the server."""
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop the server."""
+        self.stop()
+
+    def record(self, method: str, path: str, body: bytes) -> Optional[int]:
+        """Record a request and return the status of an injected failure."""
+        with self._lock:
+            self.requests.append((method, path, body))
+            return self.failures.pop(0) if self.failures else None
+
+    def add_reply(
+        self, thread_id: int, payload: Dict[str, Any], author: str = "bot"
+    ) -> Dict[str, Any]:
+        """Add a comment to a stored thread."""
+        with self._lock:
+            comments = self.threads[thread_id]["comments"]
+            comment = {"id": len(comments) + 1, "author": {"id": author}, **payload}
+            comments.append(comment)
+            return comment
+
+    def create_thread(
+        self, payload: Dict[str, Any], author: str = "bot"
+    ) -> Dict[str, Any]:
+        """Store a new comment thread."""
+        with self._lock:
+            thread_id = len(self.threads) + 1
+            thread = {"id": thread_id, **payload}
+            thread["comments"] = [
+                {"id": index + 1, "author": {"id": author}, **comment}
+                for index, comment in enumerate(payload.get("comments", []))
+            ]
+            self.threads[thread_id] = thread
+            return thread
+
+    def comment(self, path: str) -> Optional[Dict[str, Any]]:
+        """Look up the comment of a .../threads/<id>/comments/<id> path."""
+        parts = path.split("/")
+        if len(parts) < 4 or parts[-2] != "comments" or parts[-4] != "threads":
+            return None
+        thread = self.threads.get(int(parts[-3]))
+        if thread is None:
+            return None
+        for comment in thread["comments"]:
+            if comment["id"] == int(parts[-1]):
+                return comment
+        return None
+
+
+class _FakeAzureDevOpsHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake Azure DevOps server."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't wait for delayed ACKs
+    disable_nagle_algorithm = True
+    server: FakeAzureDevOps
+
+    def setup(self) -> None:
+        """Count the connection and pay the handshake delay."""
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake_delay)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Keep the test output quiet."""
+
+    def do_POST(self) -> None:
+        """Create threads, add replies and upload attachments."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server._lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        time.sleep(self.server.latency)
+        with self.server._lock:
+            self.server.in_flight -= 1
+        failure = self.server.record("POST", self.path, body)
+        if failure is not None:
+            self._send(failure, {"message": "injected failure"})
+            return
+
+        path = self.path.split("?")[0]
+        parts = path.split("/")
+        if path.endswith("/threads"):
+            self._send(200, self.server.create_thread(json.loads(body)))
+        elif parts[-1] == "comments" and int(parts[-2]) in self.server.threads:
+            self._send(200, self.server.add_reply(int(parts[-2]), json.loads(body)))
+        elif "/attachments/" in path:
+            self._send(201, {"url": f"{self.server.collection_uri}{path.lstrip('/')}"})
+        else:
+            self._send(404, {"message": "not found"})
+
+    def do_GET(self) -> None:
+        """List the threads of the pull request."""
+        time.sleep(self.server.latency)
+        failure = self.server.record("GET", self.path, b"")
+        if failure is not None:
+            self._send(failure, {"message": "injected failure"})
+            return
+        if not self.path.split("?")[0].endswith("/threads"):
+            self._send(404, {"message": "not found"})
+            return
+
+        with self.server._lock:
+            threads = json.loads(json.dumps(list(self.server.threads.values())))
+        self._send(200, {"value": threads, "count": len(threads)})
+
+    def do_PATCH(self) -> None:
+        """Update the content of a comment."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        failure = self.server.record("PATCH", self.path, body)
+        if failure is not None:
+            self._send(failure, {"message": "injected failure"})
+            return
+
+        with self.server._lock:
+            comment = self.server.comment(self.path.split("?")[0])
+            if comment is not None:
+                comment["content"] = json.loads(body)["content"]
+        if comment is None:
+            self._send(404, {"message": "not found"})
+        else:
+            self._send(200, comment)
+
+    def do_DELETE(self) -> None:
+        """Mark a comment as deleted."""
+        time.sleep(self.server.latency)
+        failure = self.server.record("DELETE", self.path, b"")
+        if failure is not None:
+            self._send(failure, {"message": "injected failure"})
+            return
+
+        with self.server._lock:
+            comment = self.server.comment(self.path.split("?")[0])
+            if comment is not None:
+                comment["isDeleted"] = True
+        self._send(404 if comment is None else 200, None)
+
+    def _send(self, status: int, payload: Optional[Dict[str, Any]]) -> None:
+        """Send a JSON response keeping the connection open."""
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
@@ -13,6 +13,7 @@ from azure_pipelines.pull_requests import architecture
 def mock_message():
     """Mock Message instance."""
     message = MagicMock()
+    message.__enter__.return_value = message
     message.upload_attachment_and_comment.return_value = True
     return message
 
@@ -26,7 +27,7 @@ def test_main_success(mock_message):
         architecture.main()
 
         mock_message.upload_attachment_and_comment.assert_called_once_with(
-            file_path="./cdk.out/cdkgraph/diagram.png"
+            file_path="./cdk.out/cdkgraph/diagram.png", key="architecture-diagram"
         )
 
 
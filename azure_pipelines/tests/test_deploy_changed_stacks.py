@@ -0,0 +1,187 @@
+"""
+Tests for the deploy.changed_stacks module.
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from azure_pipelines.deploy.changed_stacks import (
+    CloudFormationTemplateSource,
+    find_changed_stacks,
+    main,
+    read_assembly,
+    stack_fingerprint,
+)
+
+
+class StackNotFoundError(Exception):
+    """Error shaped like a botocore ClientError for a missing stack."""
+
+    def __init__(self, stack_name):
+        super().__init__(stack_name)
+        self.response = {
+            "Error": {
+                "Code": "ValidationError",
+                "Message": f"Stack with id {stack_name} does not exist",
+            }
+        }
+
+
+class FakeCloudFormation:
+    """Local stand-in for the DescribeStacks and GetTemplate APIs."""
+
+    def __init__(self, stacks):
+        self.stacks = stacks
+        self.calls = []
+
+    def describe_stacks(self, StackName):
+        self.calls.append(("describe_stacks", StackName))
+        if StackName not in self.stacks:
+            raise StackNotFoundError(StackName)
+        stack = self.stacks[StackName]
+        return {
+            "Stacks": [
+                {
+                    "StackName": StackName,
+                    "StackStatus": stack.get("status", "UPDATE_COMPLETE"),
+                    "Tags": [
+                        {"Key": key, "Value": value}
+                        for key, value in stack.get("tags", {}).items()
+                    ],
+                    "EnableTerminationProtection": False,
+                }
+            ]
+        }
+
+    def get_template(self, StackName, TemplateStage):
+        self.calls.append(("get_template", StackName))
+        return {"TemplateBody": self.stacks[StackName]["template"]}
+
+
+TEMPLATE = {"Resources": {"Bucket": {"Type": "AWS::S3::Bucket"}}}
+
+
+@pytest.fixture
+def assembly(tmp_path):
+    """Write a cloud assembly with three stacks."""
+    artifacts = {}
+    for name in ("Unchanged", "Changed", "New"):
+        template = dict(TEMPLATE, Description=name)
+        (tmp_path / f"{name}.template.json").write_text(json.dumps(template))
+        artifacts[name] = {
+            "type": "aws:cloudformation:stack",
+            "environment": "aws://123456789012/eu-central-1",
+            "displayName": name,
+            "properties": {
+                "templateFile": f"{name}.template.json",
+                "stackName": f"stack-{name.lower()}",
+                "tags": {"Environment": "developer"},
+            },
+        }
+    artifacts["Tree"] = {"type": "cdk:tree"}
+    (tmp_path / "manifest.json").write_text(json.dumps({"artifacts": artifacts}))
+    return tmp_path
+
+
+@pytest.fixture
+def cloudformation():
+    """Create deployed stacks matching and differing from the assembly."""
+    return FakeCloudFormation(
+        {
+            # JSON key order and whitespace of the deployed template differ
+            "stack-unchanged": {
+                "template": json.dumps(
+                    {"Description": "Unchanged", **TEMPLATE}, indent=4
+                ),
+                "tags": {"Environment": "developer"},
+            },
+            "stack-changed": {
+                "template": dict(TEMPLATE, Description="Old"),
+                "tags": {"Environment": "developer"},
+            },
+        }
+    )
+
+
+def test_read_assembly(assembly):
+    """Test that only stack artifacts are read with their environment."""
+    stacks = read_assembly(assembly)
+
+    assert [stack.artifact_id for stack in stacks] == ["Unchanged", "Changed", "New"]
+    assert stacks[0].key == "123456789012/eu-central-1/stack-unchanged"
+    assert stacks[0].tags == {"Environment": "developer"}
+
+
+def test_fingerprint_ignores_formatting():
+    """Test that key order does not change the fingerprint but tags do."""
+    first = stack_fingerprint({"a": 1, "b": 2}, {"Tag": "1"}, False)
+
+    assert first == stack_fingerprint({"b": 2, "a": 1}, {"Tag": "1"}, False)
+    assert first != stack_fingerprint({"a": 1, "b": 2}, {"Tag": "2"}, False)
+    assert first != stack_fingerprint({"a": 1, "b": 2}, {"Tag": "1"}, True)
+
+
+def test_find_changed_stacks(assembly, cloudformation):
+    """Test that unchanged stacks are skipped and new stacks are deployed."""
+    source = CloudFormationTemplateSource(lambda region: cloudformation)
+
+    results = find_changed_stacks(read_assembly(assembly), source)
+
+    assert {result["artifactId"]: result["changed"] for result in results} == {
+        "Unchanged": False,
+        "Changed": True,
+        "New": True,
+    }
+    assert results[2]["deployedHash"] is None
+
+
+def test_tag_change_is_detected(assembly, cloudformation):
+    """Test that changed stack tags require a deployment."""
+    cloudformation.stacks["stack-unchanged"]["tags"] = {"Environment": "old"}
+    source = CloudFormationTemplateSource(lambda region: cloudformation)
+
+    results = find_changed_stacks(read_assembly(assembly), source)
+
+    assert results[0]["changed"] is True
+
+
+def test_failed_stack_is_redeployed(assembly, cloudformation):
+    """Test that stacks not in a completed state are always deployed."""
+    cloudformation.stacks["stack-unchanged"]["status"] = "UPDATE_ROLLBACK_COMPLETE"
+    source = CloudFormationTemplateSource(lambda region: cloudformation)
+
+    results = find_changed_stacks(read_assembly(assembly), source)
+
+    assert results[0]["changed"] is True
+    assert ("get_template", "stack-unchanged") not in cloudformation.calls
+
+
+def test_other_errors_are_raised(assembly):
+    """Test that API errors other than a missing stack are not swallowed."""
+
+    class BrokenCloudFormation:
+        def describe_stacks(self, StackName):
+            raise PermissionError("AccessDenied")
+
+    source = CloudFormationTemplateSource(lambda region: BrokenCloudFormation())
+
+    with pytest.raises(PermissionError):
+        find_changed_stacks(read_assembly(assembly), source)
+
+
+def test_main_writes_report(assembly, cloudformation, tmp_path):
+    """Test the report consumed by the deploy pipeline."""
+    output = tmp_path / "changed-stacks.json"
+    argv = ["changed_stacks", "-a", str(assembly), "-o", str(output)]
+
+    with patch("sys.argv", argv), patch(
+        "azure_pipelines.deploy.changed_stacks.CloudFormationTemplateSource._boto3_client",
+        return_value=cloudformation,
+    ):
+        main()
+
+    report = json.loads(output.read_text())
+    assert report["changedStacks"] == ["Changed", "New"]
+    assert len(report["stacks"]) == 3
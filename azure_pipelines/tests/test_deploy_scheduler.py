@@ -0,0 +1,126 @@
+"""
+Tests for the deploy.scheduler module.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from azure_pipelines.deploy.scheduler import (
+    DeployScheduler,
+    plan_waves,
+    read_dependency_graph,
+)
+
+
+class FakeBackend:
+    """Deploy backend recording the order and concurrency of deployments."""
+
+    def __init__(self, seconds=0.02, failing=()):
+        self.seconds = seconds
+        self.failing = set(failing)
+        self.started = []
+        self.finished = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def deploy(self, stack):
+        with self._lock:
+            self.started.append(stack)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.active -= 1
+            self.finished.append(stack)
+        if stack in self.failing:
+            raise RuntimeError(f"{stack} failed")
+
+
+# network <- database <- app, network <- cache, monitoring is independent
+GRAPH = {
+    "network": set(),
+    "database": {"network"},
+    "cache": {"network"},
+    "app": {"database", "cache"},
+    "monitoring": set(),
+}
+
+
+def test_read_dependency_graph(tmp_path):
+    """Test that only dependencies between stacks are read."""
+    manifest = {
+        "artifacts": {
+            "Network.assets": {"type": "cdk:asset-manifest"},
+            "Network": {
+                "type": "aws:cloudformation:stack",
+                "displayName": "Network",
+                "dependencies": ["Network.assets"],
+            },
+            "App": {
+                "type": "aws:cloudformation:stack",
+                "displayName": "App",
+                "dependencies": ["Network", "App.assets"],
+            },
+        }
+    }
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+
+    assert read_dependency_graph(tmp_path) == {"Network": set(), "App": {"Network"}}
+    assert read_dependency_graph(tmp_path, ["App"]) == {"App": set()}
+    with pytest.raises(ValueError, match="Missing"):
+        read_dependency_graph(tmp_path, ["Missing"])
+
+
+def test_plan_waves():
+    """Test the topological sort into waves."""
+    assert plan_waves(GRAPH) == [
+        ["monitoring", "network"],
+        ["cache", "database"],
+        ["app"],
+    ]
+
+
+def test_plan_waves_rejects_cycles():
+    """Test that cyclic dependencies are reported."""
+    with pytest.raises(ValueError, match="cycle"):
+        plan_waves({"a": {"b"}, "b": {"a"}})
+
+
+def test_dependencies_are_deployed_first():
+    """Test that no stack starts before its dependencies finished."""
+    backend = FakeBackend()
+
+    assert DeployScheduler(GRAPH, backend, max_concurrency=4).run() is True
+
+    for stack, dependencies in GRAPH.items():
+        started = backend.started.index(stack)
+        for dependency in dependencies:
+            assert dependency in backend.finished[:started]
+
+
+def test_concurrency_is_capped():
+    """Test that independent stacks run in parallel up to the cap."""
+    graph = {f"stack-{index}": set() for index in range(6)}
+    backend = FakeBackend(seconds=0.05)
+
+    start = time.perf_counter()
+    DeployScheduler(graph, backend, max_concurrency=3).run()
+
+    assert backend.max_active == 3
+    assert time.perf_counter() - start < 6 * 0.05
+
+
+def test_failure_stops_run():
+    """Test that a failed stack prevents further deployments."""
+    backend = FakeBackend(failing={"network"})
+    scheduler = DeployScheduler(GRAPH, backend, max_concurrency=1)
+
+    assert scheduler.run() is False
+    assert backend.started == ["monitoring", "network"]
+    assert scheduler.results["network"]["status"] == "failed"
+    assert scheduler.results["network"]["error"] == "network failed"
+    assert scheduler.results["app"]["status"] == "skipped"
@@ -3,11 +3,13 @@ Tests for the load_env.config module.
 """
 
 import json
-from unittest.mock import mock_open, patch
+import os
+from collections.abc import Mapping
+from unittest.mock import patch
 
 import pytest
 
-from azure_pipelines.load_env.config import CDKConfig
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
 
 
 @pytest.fixture
@@ -26,7 +28,7 @@ def test_init(sample_config):
     config = CDKConfig(environment=environment)
 
     assert config._environment == environment
-    assert isinstance(config.data, dict)
+    assert isinstance(config.data, Mapping)
     assert config.load_config() == sample_config
 
 
@@ -47,13 +49,13 @@ def test_load_config_file_not_found():
             CDKConfig(environment=environment)
 
 
-def test_load_config_invalid_json():
+def test_load_config_invalid_json(tmp_path):
     """Test load_config method with invalid JSON."""
     environment = "invalid"
+    (tmp_path / f"{environment}.json").write_text("invalid json")
 
-    with patch("builtins.open", mock_open(read_data="invalid json")):
-        with pytest.raises(json.JSONDecodeError):
-            CDKConfig(environment=environment)
+    with pytest.raises(json.JSONDecodeError):
+        CDKConfig(environment=environment, config_dir=tmp_path)
 
 
 def test_get_value(sample_config):
@@ -70,3 +72,73 @@ def test_get_value(sample_config):
 
     # Test non-existing key without default
     assert config.get_value("NonExistentKey") is None
+
+
+@pytest.fixture
+def config_dir(tmp_path, sample_config):
+    """Create a config directory with a single environment."""
+    (tmp_path / "developer.json").write_text(json.dumps(sample_config))
+    return tmp_path
+
+
+def rewrite(path, data):
+    """Rewrite a config file and move its modification time forward."""
+    path.write_text(json.dumps(data))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_registry_parses_once(config_dir):
+    """Test that every config object shares the parsed file."""
+    registry = ConfigRegistry(config_dir)
+
+    with patch("json.loads", wraps=json.loads) as loads:
+        configs = [
+            CDKConfig("developer", config_dir=config_dir, registry=registry)
+            for _ in range(10)
+        ]
+
+    assert loads.call_count == 1
+    assert all(config.data is configs[0].data for config in configs)
+    assert registry.stats == {"hits": 9, "misses": 1, "reloads": 0, "entries": 1}
+
+
+def test_registry_returns_read_only_views(config_dir):
+    """Test that a config object cannot change the shared configuration."""
+    config = CDKConfig("developer", config_dir=config_dir, registry=ConfigRegistry())
+
+    with pytest.raises(TypeError):
+        config.data["AccountId"] = "123"
+
+
+def test_registry_reloads_changed_file(config_dir, sample_config):
+    """Test that changed files are parsed again."""
+    registry = ConfigRegistry(config_dir)
+    registry.get("developer")
+
+    rewrite(config_dir / "developer.json", {**sample_config, "QueueName": "new"})
+
+    assert registry.get("developer")["QueueName"] == "new"
+    assert registry.reloads == 1
+
+
+def test_registry_ignores_touched_file(config_dir, sample_config):
+    """Test that a new modification time with the same content is a hit."""
+    registry = ConfigRegistry(config_dir)
+    data = registry.get("developer")
+
+    rewrite(config_dir / "developer.json", sample_config)
+
+    assert registry.get("developer") is data
+    assert registry.stats["reloads"] == 0
+    assert registry.stats["hits"] == 1
+
+
+def test_registry_clear(config_dir):
+    """Test that clear drops parsed files and counters."""
+    registry = ConfigRegistry(config_dir)
+    registry.get("developer")
+
+    registry.clear()
+
+    assert registry.stats == {"hits": 0, "misses": 0, "reloads": 0, "entries": 0}
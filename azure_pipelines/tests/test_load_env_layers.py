@@ -0,0 +1,144 @@
+"""
+Tests for the load_env.layers module and layered configuration loading.
+"""
+
+import json
+
+import pytest
+
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
+from azure_pipelines.load_env.layers import (
+    FrozenConfig,
+    context_overrides,
+    merge_layers,
+)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Create a config directory with base, group and environment layers."""
+    (tmp_path / "_groups").mkdir()
+    (tmp_path / "_base.json").write_text(
+        json.dumps(
+            {
+                "AWSRegion": "eu-central-1",
+                "Network": {"VpcCidr": "10.0.0.0/16", "MaxAzs": 2},
+            }
+        )
+    )
+    (tmp_path / "_groups" / "production.json").write_text(
+        json.dumps({"Network": {"MaxAzs": 3}, "Retention": 90})
+    )
+    (tmp_path / "prod.json").write_text(
+        json.dumps({"$group": "production", "AccountId": "1", "Retention": 365})
+    )
+    (tmp_path / "dev.json").write_text(json.dumps({"AccountId": "2"}))
+    return tmp_path
+
+
+def test_merge_layers():
+    """Test that nested objects are merged and meta keys are dropped."""
+    merged = merge_layers(
+        {"A": {"B": 1, "C": [1, 2]}, "D": 1},
+        {"$group": "x", "A": {"C": [3]}, "D": None},
+    )
+
+    assert merged == {"A": {"B": 1, "C": [3]}, "D": None}
+
+
+def test_context_overrides():
+    """Test JSON and dotted path overrides from the CDK context."""
+    context = {
+        "environment": "dev",
+        "config": '{"QueueName": "queue"}',
+        "config.Network.VpcCidr": "10.1.0.0/16",
+    }
+
+    assert context_overrides(context) == {
+        "QueueName": "queue",
+        "Network": {"VpcCidr": "10.1.0.0/16"},
+    }
+    assert context_overrides({"environment": "dev"}) == {}
+
+
+def test_frozen_config_lookups():
+    """Test top level and dotted path lookups."""
+    config = FrozenConfig({"Network": {"Subnets": {"Public": 2}}, "Tags": ["a"]})
+
+    assert config["Network.Subnets.Public"] == 2
+    assert config["Network"]["Subnets"]["Public"] == 2
+    assert config["Tags"] == ["a"]
+    assert type(config["Network"]) is dict
+    assert type(config.get("Tags")) is list
+    assert list(config) == ["Network", "Tags"]
+    assert config.get("Network.Missing", "default") == "default"
+
+
+def test_frozen_config_is_immutable():
+    """Test that neither the object nor nested values can be changed."""
+    config = FrozenConfig({"Network": {"MaxAzs": 2}, "Tags": ["a"]})
+
+    with pytest.raises(AttributeError):
+        config.extra = 1
+    config["Network"]["MaxAzs"] = 3
+    config["Tags"].append("b")
+    assert config["Network.MaxAzs"] == 2
+    assert config["Network"] == {"MaxAzs": 2}
+    assert config["Tags"] == ["a"]
+    assert not hasattr(config, "__dict__")
+
+
+def test_layers_are_merged(config_dir):
+    """Test the precedence of base, group, environment and overrides."""
+    config = CDKConfig(
+        "prod",
+        config_dir=config_dir,
+        registry=ConfigRegistry(),
+        overrides={"Network": {"VpcCidr": "10.9.0.0/16"}},
+    )
+
+    assert config.get_value("AWSRegion") == "eu-central-1"
+    assert config.get_value("Network.MaxAzs") == 3
+    assert config.get_value("Network.VpcCidr") == "10.9.0.0/16"
+    assert config.get_value("Retention") == 365
+    assert config.get_value("$group") is None
+
+
+def test_environment_without_group(config_dir):
+    """Test that environments without a group only use the base layer."""
+    config = CDKConfig("dev", config_dir=config_dir, registry=ConfigRegistry())
+
+    assert config.get_value("Network.MaxAzs") == 2
+    assert config.get_value("Retention") is None
+
+
+def test_missing_group_file(config_dir):
+    """Test that an unknown group is reported."""
+    (config_dir / "broken.json").write_text(json.dumps({"$group": "missing"}))
+
+    with pytest.raises(FileNotFoundError, match="missing"):
+        CDKConfig("broken", config_dir=config_dir, registry=ConfigRegistry())
+
+
+def test_registry_recompiles_on_base_change(config_dir):
+    """Test that a changed shared layer recompiles dependent environments."""
+    registry = ConfigRegistry(config_dir)
+    assert registry.get("prod")["AWSRegion"] == "eu-central-1"
+
+    # The size of the file changes even if the modification time does not
+    (config_dir / "_base.json").write_text(json.dumps({"AWSRegion": "eu-west-1"}))
+
+    assert registry.get("prod")["AWSRegion"] == "eu-west-1"
+    assert registry.stats["reloads"] == 1
+
+
+def test_registry_caches_overrides_separately(config_dir):
+    """Test that different overrides produce different compiled configs."""
+    registry = ConfigRegistry(config_dir)
+
+    plain = registry.get("dev")
+    overridden = registry.get("dev", overrides={"AccountId": "3"})
+
+    assert plain["AccountId"] == "2"
+    assert overridden["AccountId"] == "3"
+    assert registry.get("dev") is plain
@@ -0,0 +1,153 @@
+"""
+Tests for the load_env.resolver module.
+"""
+
+import json
+import stat
+
+import pytest
+
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
+from azure_pipelines.load_env.resolver import ConfigResolutionError, ParameterResolver
+
+
+class FakeSSM:
+    """Local stand-in for the GetParameters API."""
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.calls = []
+
+    def get_parameters(self, Names, WithDecryption):
+        assert len(Names) <= 10
+        assert not WithDecryption
+        self.calls.append(list(Names))
+        return {
+            "Parameters": [
+                {"Name": name, "Type": type_, "Value": value}
+                for name, (type_, value) in self.parameters.items()
+                if name in Names
+            ],
+            "InvalidParameters": [
+                name for name in Names if name not in self.parameters
+            ],
+        }
+
+
+@pytest.fixture
+def ssm():
+    """SSM stand-in with 25 string parameters."""
+    parameters = {f"/platform/param-{i}": ("String", f"value-{i}") for i in range(25)}
+    parameters["/platform/subnets"] = ("StringList", "a,b")
+    parameters["/platform/password"] = ("SecureString", "encrypted")
+    return FakeSSM(parameters)
+
+
+@pytest.fixture
+def resolver(tmp_path, ssm):
+    """Resolver caching in a temporary directory."""
+    return ParameterResolver(
+        cache_file=tmp_path / "cache" / "parameters.json",
+        client_factory=lambda region: ssm,
+    )
+
+
+def test_resolve_in_batches(resolver, ssm):
+    """Test that all references are fetched in batches of 10."""
+    config = {
+        "AWSRegion": "eu-central-1",
+        "Params": [f"ssm:/platform/param-{i}" for i in range(25)],
+        "Nested": {"Again": "ssm:/platform/param-0"},
+    }
+
+    resolved = resolver.resolve(config)
+
+    assert resolved["Params"] == [f"value-{i}" for i in range(25)]
+    assert resolved["Nested"]["Again"] == "value-0"
+    assert [len(call) for call in ssm.calls] == [10, 10, 5]
+
+
+def test_resolve_types(resolver):
+    """Test string lists, secure strings and secrets."""
+    resolved = resolver.resolve(
+        {
+            "Subnets": "ssm:/platform/subnets",
+            "Password": "ssm:/platform/password",
+            "Token": "secretsmanager:app/token:api",
+            "Plain": "value",
+        }
+    )
+
+    assert resolved == {
+        "Subnets": ["a", "b"],
+        "Password": "{{resolve:ssm-secure:/platform/password}}",
+        "Token": "{{resolve:secretsmanager:app/token:SecretString:api}}",
+        "Plain": "value",
+    }
+
+
+def test_cache_is_reused(tmp_path, resolver, ssm):
+    """Test that another resolver in a later synth reads the disk cache."""
+    config = {"QueueName": "ssm:/platform/param-1"}
+    resolver.resolve(config)
+
+    second = ParameterResolver(
+        cache_file=resolver.cache_file, client_factory=lambda region: ssm
+    )
+
+    assert second.resolve(config) == {"QueueName": "value-1"}
+    assert len(ssm.calls) == 1
+    assert second.api_calls == 0
+    assert stat.S_IMODE(resolver.cache_file.stat().st_mode) == 0o600
+    assert "encrypted" not in resolver.cache_file.read_text()
+
+
+def test_cache_expires(resolver, ssm):
+    """Test that parameters are fetched again after the TTL."""
+    resolver.ttl = 0
+    config = {"QueueName": "ssm:/platform/param-1"}
+
+    resolver.resolve(config)
+    resolver.resolve(config)
+
+    assert len(ssm.calls) == 2
+
+
+def test_missing_parameters(resolver):
+    """Test that all missing parameters are reported."""
+    with pytest.raises(ConfigResolutionError) as error:
+        resolver.resolve(
+            {"AWSRegion": "eu-west-1", "A": "ssm:/missing/b", "B": "ssm:/missing/a"}
+        )
+
+    assert error.value.names == ["/missing/a", "/missing/b"]
+    assert error.value.region == "eu-west-1"
+
+
+def test_no_references_without_client(tmp_path):
+    """Test that configurations without references don't create a client."""
+
+    def client_factory(region):
+        raise AssertionError("no client expected")
+
+    resolver = ParameterResolver(cache_file=None, client_factory=client_factory)
+
+    assert resolver.resolve({"QueueName": "queue"}) == {"QueueName": "queue"}
+
+
+def test_config_resolves_references(tmp_path, resolver, ssm):
+    """Test that CDKConfig resolves references once per compiled config."""
+    (tmp_path / "developer.json").write_text(
+        json.dumps({"AWSRegion": "eu-central-1", "QueueName": "ssm:/platform/param-2"})
+    )
+    registry = ConfigRegistry()
+
+    configs = [
+        CDKConfig(
+            "developer", config_dir=tmp_path, registry=registry, resolver=resolver
+        )
+        for _ in range(3)
+    ]
+
+    assert configs[2].get_value("QueueName") == "value-2"
+    assert len(ssm.calls) == 1
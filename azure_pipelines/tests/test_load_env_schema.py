@@ -0,0 +1,131 @@
+"""
+Tests for the load_env.schema module and typed configuration access.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from unittest.mock import patch
+
+import pytest
+
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
+from azure_pipelines.load_env.schema import ConfigValidationError, setting, validate
+
+
+@dataclass(frozen=True)
+class NetworkSchema:
+    vpc_cidr: str = setting("VpcCidr")
+    max_azs: int = setting("MaxAzs", default=2)
+
+
+@dataclass(frozen=True)
+class AppSchema:
+    account_id: str = setting("AccountId", pattern=r"\d{12}")
+    network: NetworkSchema = setting("Network")
+    retention: float = setting("Retention", default=30.0)
+    subnets: Tuple[str, ...] = setting("Subnets", default=())
+    queue_name: Optional[str] = setting("QueueName", default=None)
+
+
+@pytest.fixture
+def valid_config():
+    """Configuration matching the schema."""
+    return {
+        "AccountId": "123456789012",
+        "Network": {"VpcCidr": "10.0.0.0/16"},
+        "Retention": 7,
+        "Subnets": ["a", "b"],
+    }
+
+
+def test_validate(valid_config):
+    """Test that valid configurations are converted into the schema."""
+    config = validate(AppSchema, valid_config)
+
+    assert config.account_id == "123456789012"
+    assert config.network == NetworkSchema(vpc_cidr="10.0.0.0/16", max_azs=2)
+    assert config.retention == 7.0
+    assert config.subnets == ("a", "b")
+    assert config.queue_name is None
+
+
+def test_validate_reports_all_errors():
+    """Test that all invalid keys are reported at once."""
+    data = {"AccountId": "42", "Network": {"MaxAzs": True}, "Subnets": "a"}
+
+    with pytest.raises(ConfigValidationError) as error:
+        validate(AppSchema, data, source="developer")
+
+    assert error.value.errors == [
+        "AccountId: '42' does not match '\\\\d{12}'",
+        "Network.VpcCidr: missing required key",
+        "Network.MaxAzs: expected int, got True",
+        "Subnets: expected a list, got 'a'",
+    ]
+    assert "Invalid configuration 'developer'" in str(error.value)
+
+
+def test_validate_rejects_non_dataclass():
+    """Test that schemas must be dataclasses."""
+    with pytest.raises(TypeError):
+        validate(dict, {})
+
+
+def test_config_validates_once(tmp_path, valid_config):
+    """Test that the schema is validated once per compiled configuration."""
+    (tmp_path / "developer.json").write_text(json.dumps(valid_config))
+    registry = ConfigRegistry()
+
+    with patch(
+        "azure_pipelines.load_env.config.validate", wraps=validate
+    ) as validate_mock:
+        configs = [
+            CDKConfig(
+                "developer", config_dir=tmp_path, registry=registry, schema=AppSchema
+            )
+            for _ in range(5)
+        ]
+
+    assert validate_mock.call_count == 1
+    assert configs[0].typed is configs[4].typed
+    assert configs[0].typed.network.vpc_cidr == "10.0.0.0/16"
+
+
+def test_config_fails_fast(tmp_path):
+    """Test that missing required keys fail when the config is loaded."""
+    (tmp_path / "developer.json").write_text(
+        json.dumps({"Network": {"VpcCidr": "10.0.0.0/16"}})
+    )
+
+    with pytest.raises(ConfigValidationError, match="AccountId: missing"):
+        CDKConfig(
+            "developer",
+            config_dir=tmp_path,
+            registry=ConfigRegistry(),
+            schema=AppSchema,
+        )
+
+
+def test_typed_without_schema(tmp_path, valid_config):
+    """Test that typed access requires a schema."""
+    (tmp_path / "developer.json").write_text(json.dumps(valid_config))
+    config = CDKConfig("developer", config_dir=tmp_path, registry=ConfigRegistry())
+
+    with pytest.raises(AttributeError, match="without a schema"):
+        config.typed
+
+
+def test_get_value_skips_debug_output(tmp_path, valid_config):
+    """Test that the available keys are only listed with debug logging."""
+    (tmp_path / "developer.json").write_text(json.dumps(valid_config))
+    config = CDKConfig("developer", config_dir=tmp_path, registry=ConfigRegistry())
+
+    with patch("azure_pipelines.load_env.config.logger") as logger:
+        logger.isEnabledFor.return_value = False
+        assert config.get_value("Missing", "default") == "default"
+
+    logger.isEnabledFor.assert_called_once_with(logging.DEBUG)
+    logger.debug.assert_not_called()
+    assert config.get_value("Network.VpcCidr") == "10.0.0.0/16"
@@ -0,0 +1,136 @@
+"""
+Tests for the load_env.snapshot module and the config compile command.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from unittest.mock import patch
+
+import pytest
+
+from azure_pipelines.load_env.__main__ import import_schema
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
+from azure_pipelines.load_env.schema import ConfigValidationError, setting
+from azure_pipelines.load_env.snapshot import SNAPSHOT_FILE, load_snapshot
+
+
+@dataclass(frozen=True)
+class AccountSchema:
+    account_id: str = setting("AccountId", pattern=r"\d+")
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    """Create a config directory with base, group and environment layers."""
+    (tmp_path / "_groups").mkdir()
+    (tmp_path / "_base.json").write_text(json.dumps({"AWSRegion": "eu-central-1"}))
+    (tmp_path / "_groups" / "production.json").write_text(json.dumps({"Retention": 90}))
+    (tmp_path / "prod.json").write_text(
+        json.dumps({"$group": "production", "AccountId": "1"})
+    )
+    (tmp_path / "dev.json").write_text(json.dumps({"AccountId": "2"}))
+    return tmp_path
+
+
+def test_compile_snapshot(config_dir):
+    """Test that all environments are merged into the snapshot."""
+    path = ConfigRegistry(config_dir).compile_snapshot(schema=AccountSchema)
+
+    snapshot = load_snapshot(config_dir)
+
+    assert path == config_dir / SNAPSHOT_FILE
+    assert snapshot.environments == {
+        "dev": {"AWSRegion": "eu-central-1", "AccountId": "2"},
+        "prod": {"AWSRegion": "eu-central-1", "AccountId": "1", "Retention": 90},
+    }
+    assert snapshot.schema == f"{__name__}:AccountSchema"
+    assert [name for name, _ in snapshot.sources] == [
+        "_base.json",
+        "_groups/production.json",
+        "dev.json",
+        "prod.json",
+    ]
+    assert snapshot.is_fresh()
+
+
+def test_compile_snapshot_reports_all_environments(config_dir):
+    """Test that invalid environments are reported together."""
+    (config_dir / "dev.json").write_text(json.dumps({"AccountId": "x"}))
+    (config_dir / "test.json").write_text(json.dumps({}))
+
+    with pytest.raises(ConfigValidationError) as error:
+        ConfigRegistry(config_dir).compile_snapshot(schema=AccountSchema)
+
+    assert error.value.errors == [
+        "dev: AccountId: 'x' does not match '\\\\d+'",
+        "test: AccountId: missing required key",
+    ]
+    assert not (config_dir / SNAPSHOT_FILE).exists()
+
+
+def test_config_loads_snapshot(config_dir):
+    """Test that no JSON file is parsed if the snapshot is up to date."""
+    ConfigRegistry(config_dir).compile_snapshot()
+
+    with patch("json.loads", wraps=json.loads) as loads:
+        config = CDKConfig(
+            "prod",
+            config_dir=config_dir,
+            registry=ConfigRegistry(),
+            overrides={"Retention": 7},
+        )
+
+    assert loads.call_count == 0
+    assert config.get_value("Retention") == 7
+    assert config.get_value("AWSRegion") == "eu-central-1"
+
+
+@pytest.mark.parametrize(
+    "change, environment, account_id",
+    [
+        (
+            lambda path: (path / "dev.json").write_text(
+                json.dumps({"AccountId": "22"})
+            ),
+            "dev",
+            "22",
+        ),
+        (
+            lambda path: (path / "new.json").write_text(json.dumps({"AccountId": "3"})),
+            "new",
+            "3",
+        ),
+        (lambda path: os.remove(path / "_groups" / "production.json"), "dev", "2"),
+    ],
+    ids=["changed", "added", "removed"],
+)
+def test_outdated_snapshot_is_ignored(config_dir, change, environment, account_id):
+    """Test that changed config files fall back to the JSON files."""
+    ConfigRegistry(config_dir).compile_snapshot()
+
+    change(config_dir)
+
+    assert not load_snapshot(config_dir).is_fresh()
+    config = CDKConfig(environment, config_dir=config_dir, registry=ConfigRegistry())
+    assert config.get_value("AccountId") == account_id
+
+
+def test_corrupt_snapshot_is_ignored(config_dir):
+    """Test that snapshots of other versions or corrupt files are ignored."""
+    (config_dir / SNAPSHOT_FILE).write_bytes(b"CDKCFG\x00\x00garbage")
+    assert load_snapshot(config_dir) is None
+
+    ConfigRegistry(config_dir).compile_snapshot()
+    content = (config_dir / SNAPSHOT_FILE).read_bytes()
+    (config_dir / SNAPSHOT_FILE).write_bytes(content[:20])
+
+    assert load_snapshot(config_dir) is None
+    config = CDKConfig("dev", config_dir=config_dir, registry=ConfigRegistry())
+    assert config.get_value("AccountId") == "2"
+
+
+def test_import_schema():
+    """Test importing the schema of the compile command."""
+    assert import_schema(f"{__name__}:AccountSchema") is AccountSchema
+    assert import_schema("") is None
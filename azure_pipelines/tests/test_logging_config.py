@@ -2,9 +2,31 @@
 Tests for the logging_config module.
 """
 
+import gzip
+import io
+import json
 import logging
+import logging.handlers
+import sys
+import threading
+import time
+from unittest.mock import patch
 
-from azure_pipelines.logging_config import configure_logging, get_logger
+from azure_pipelines.logging_config import (
+    BufferedRotatingFileHandler,
+    JsonFormatter,
+    StructuredMessage,
+    caller_module_name,
+    configure_logging,
+    get_log_directory,
+    get_logger,
+    log_event,
+    reset_logging,
+    stop_queue_listener,
+)
+
+# Maximum average seconds to create a logger without a name
+LOGGER_CREATION_BUDGET = 0.001
 
 
 def test_configure_logging_default():
@@ -68,3 +90,432 @@ def test_get_logger_param_override(mock_env):
 
     # Clean up handlers to avoid affecting other tests
     logger.handlers.clear()
+
+
+def test_caller_module_name():
+    """Test that the caller is the first module outside of logging_config."""
+    assert caller_module_name() == __name__
+
+    logger = get_logger()
+    assert logger.name == __name__
+
+    # Clean up handlers to avoid affecting other tests
+    logger.handlers.clear()
+
+
+def call_nested(depth, function):
+    """Call a function below the given number of extra stack frames."""
+    if depth == 0:
+        return function()
+    return call_nested(depth - 1, function)
+
+
+def test_logger_creation_budget():
+    """Test that creating loggers stays cheap with a deep stack."""
+    calls = 200
+
+    def create_loggers():
+        start = time.perf_counter()
+        for _ in range(calls):
+            logger = configure_logging()
+        logger.handlers.clear()
+        return (time.perf_counter() - start) / calls
+
+    seconds = call_nested(300, create_loggers)
+
+    assert seconds < LOGGER_CREATION_BUDGET
+
+
+def test_get_logger_is_idempotent():
+    """Test that repeated calls keep the configured handler."""
+    logger = get_logger("test_registry")
+    handlers = list(logger.handlers)
+
+    for _ in range(10):
+        assert get_logger("test_registry") is logger
+
+    assert logger.handlers == handlers
+    assert len(handlers) == 1
+    reset_logging("test_registry")
+
+
+def test_level_change_keeps_handlers():
+    """Test that a new level is applied to the existing handler."""
+    logger = get_logger("test_registry")
+    handler = logger.handlers[0]
+
+    get_logger("test_registry", log_level=logging.WARNING)
+
+    assert logger.handlers == [handler]
+    assert logger.level == handler.level == logging.WARNING
+    reset_logging("test_registry")
+
+
+def test_format_change_replaces_handlers():
+    """Test that other settings set up the logger again."""
+    logger = get_logger("test_registry")
+    handler = logger.handlers[0]
+
+    get_logger("test_registry", log_format="%(message)s")
+
+    assert len(logger.handlers) == 1
+    assert logger.handlers[0] is not handler
+    assert logger.handlers[0].formatter._fmt == "%(message)s"
+    reset_logging("test_registry")
+
+
+def test_cleared_handlers_are_restored():
+    """Test that handlers removed outside of the registry are set up again."""
+    logger = get_logger("test_registry")
+    logger.handlers.clear()
+
+    get_logger("test_registry")
+
+    assert len(logger.handlers) == 1
+    reset_logging("test_registry")
+
+
+def test_reset_logging():
+    """Test that reset removes the handlers of the given loggers."""
+    first = get_logger("test_registry_first")
+    second = get_logger("test_registry_second")
+
+    reset_logging("test_registry_first", "test_registry_second")
+
+    assert first.handlers == second.handlers == []
+    assert get_logger("test_registry_first").handlers
+    reset_logging("test_registry_first")
+
+
+class SlowStream(io.StringIO):
+    """Console that takes a while for every write."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.threads = set()
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        return super().write(text)
+
+
+def test_queue_mode(monkeypatch):
+    """Test that records are written by the listener thread without blocking."""
+    stream = SlowStream(delay=0.02)
+    monkeypatch.setattr("sys.stdout", stream)
+    logger = configure_logging("test_queue", log_format="%(message)s", use_queue=True)
+
+    start = time.perf_counter()
+    for index in range(10):
+        logger.info(f"message {index}")
+    seconds = time.perf_counter() - start
+    stop_queue_listener()
+
+    assert seconds < 0.02
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], logging.handlers.QueueHandler)
+    assert stream.getvalue().splitlines() == [f"message {i}" for i in range(10)]
+    assert threading.current_thread().name not in stream.threads
+    reset_logging("test_queue")
+
+
+def test_queue_mode_from_environment(mock_env, monkeypatch):
+    """Test that the environment enables queue mode and levels still apply."""
+    stream = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stream)
+
+    with mock_env(AZURE_PIPELINES_LOG_QUEUE="true"):
+        logger = get_logger("test_queue", log_level=logging.WARNING)
+
+    logger.info("dropped")
+    logger.warning("written")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    stop_queue_listener()
+
+    output = stream.getvalue()
+    assert isinstance(logger.handlers[0], logging.handlers.QueueHandler)
+    assert "dropped" not in output
+    assert "written" in output
+    assert "ValueError: boom" in output
+    reset_logging("test_queue")
+
+
+class CountingValue:
+    """Field value that counts how often it is rendered."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "value"
+
+
+def test_structured_message():
+    """Test rendering a structured message as logfmt."""
+    message = StructuredMessage(
+        "Sent PR comment", {"status": 200, "reason": "Not Found", "empty": ""}
+    )
+
+    assert str(message) == 'Sent PR comment status=200 reason="Not Found" empty=""'
+
+
+def test_log_event_is_deferred(monkeypatch):
+    """Test that fields are not rendered if the level is disabled."""
+    stream = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stream)
+    logger = configure_logging(
+        "test_structured", log_level=logging.WARNING, log_format="%(message)s"
+    )
+    value = CountingValue()
+
+    log_event(logger, logging.INFO, "Skipped", value=value)
+    assert value.calls == 0
+
+    log_event(logger, logging.WARNING, "Written", value=value)
+    assert value.calls == 1
+    assert stream.getvalue() == "Written value=value\n"
+    reset_logging("test_structured")
+
+
+def test_json_formatter():
+    """Test that fields and exceptions are written as JSON keys."""
+    formatter = JsonFormatter()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test_json").makeRecord(
+            "test_json",
+            logging.ERROR,
+            __file__,
+            1,
+            StructuredMessage("Upload failed", {"status": 500, "path": None}),
+            None,
+            sys.exc_info(),
+        )
+
+    entry = json.loads(formatter.format(record))
+
+    assert entry["status"] == 500
+    assert entry["path"] is None
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "test_json"
+    assert entry["message"] == "Upload failed"
+    assert entry["timestamp"].endswith("+00:00")
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_json_formatter_without_orjson(monkeypatch):
+    """Test that the standard library encodes entries if orjson is missing."""
+    monkeypatch.setattr("azure_pipelines.logging_config.orjson", None)
+    record = logging.makeLogRecord(
+        {"name": "test_json", "msg": "Created %s", "args": ("repo",)}
+    )
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Created repo"
+
+
+def test_json_output_in_queue_mode(mock_env, monkeypatch):
+    """Test that fields reach the JSON formatter through the queue."""
+    stream = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stream)
+
+    with mock_env(AZURE_PIPELINES_LOG_FORMAT="json", AZURE_PIPELINES_LOG_QUEUE="true"):
+        logger = get_logger("test_json_queue")
+
+    log_event(logger, logging.INFO, "Sent PR comment", status=200)
+    stop_queue_listener()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Sent PR comment"
+    assert entry["status"] == 200
+    reset_logging("test_json_queue")
+
+
+def make_record(message):
+    """Create a record logging the message."""
+    return logging.makeLogRecord({"name": "test_file", "msg": message})
+
+
+def wait_for(condition, timeout=2.0):
+    """Wait until the condition holds or the timeout passed."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_file_handler_buffers_records(tmp_path):
+    """Test that records are written on flush, not on every emit."""
+    path = tmp_path / "pipeline.log"
+    handler = BufferedRotatingFileHandler(path, flush_interval=60)
+
+    handler.emit(make_record("first"))
+    handler.emit(make_record("second"))
+    assert path.read_text() == ""
+
+    handler.flush()
+    assert path.read_text() == "first\nsecond\n"
+    handler.close()
+
+
+def test_file_handler_flushes_in_background(tmp_path):
+    """Test that a full buffer and the flush interval both write the file."""
+    full = BufferedRotatingFileHandler(
+        tmp_path / "full.log", buffer_bytes=10, flush_interval=60
+    )
+    timed = BufferedRotatingFileHandler(tmp_path / "timed.log", flush_interval=0.05)
+
+    full.emit(make_record("long enough"))
+    timed.emit(make_record("short"))
+
+    assert wait_for(lambda: (tmp_path / "full.log").read_text() == "long enough\n")
+    assert wait_for(lambda: (tmp_path / "timed.log").read_text() == "short\n")
+    full.close()
+    timed.close()
+
+
+def test_file_handler_rotates_and_compresses(tmp_path):
+    """Test that full files become compressed segments in order."""
+    path = tmp_path / "pipeline.log"
+    handler = BufferedRotatingFileHandler(
+        path, max_bytes=20, backup_count=100, buffer_bytes=0
+    )
+
+    for index in range(10):
+        handler.emit(make_record(f"message {index}"))
+        handler.flush()
+    handler.close()
+
+    segments = sorted(tmp_path.glob("pipeline.log.*"))
+    assert segments and all(segment.suffix == ".gz" for segment in segments)
+    lines = []
+    for segment in segments:
+        with gzip.open(segment, "rt") as content:
+            lines.extend(content.read().splitlines())
+    lines.extend(path.read_text().splitlines())
+    assert lines == [f"message {index}" for index in range(10)]
+
+
+def test_file_handler_keeps_backup_count(tmp_path):
+    """Test that only the newest compressed segments are kept."""
+    path = tmp_path / "pipeline.log"
+    handler = BufferedRotatingFileHandler(
+        path, max_bytes=10, backup_count=2, buffer_bytes=0
+    )
+
+    for index in range(10):
+        handler.emit(make_record(f"message {index}"))
+        handler.flush()
+    handler.close()
+
+    segments = sorted(tmp_path.glob("pipeline.log.*.gz"))
+    assert len(segments) == 2
+    with gzip.open(segments[-1], "rt") as content:
+        assert content.read() == "message 8\n"
+
+
+def test_file_output_from_environment(mock_env, tmp_path):
+    """Test that a log directory in the environment enables file output."""
+    log_dir = tmp_path / "logs"
+
+    with mock_env(AZURE_PIPELINES_LOG_DIR=str(log_dir)):
+        assert get_log_directory() == log_dir
+        logger = get_logger("test_file_output", console_output=False)
+
+    logger.info("written to file")
+    reset_logging("test_file_output")
+
+    assert "written to file" in (log_dir / "azure_pipelines.log").read_text()
+
+
+def run_with_timeout(function, timeout=5.0):
+    """Run a function on a thread and check that it does not hang."""
+    thread = threading.Thread(target=function, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"{function.__name__} did not return"
+
+
+def test_reconfigure_file_output_in_queue_mode(tmp_path):
+    """Test that a logger writing files in queue mode can be set up again."""
+    options = dict(
+        file_output=True, console_output=False, use_queue=True, log_file="queue.log"
+    )
+    with patch.dict("os.environ", {"AZURE_PIPELINES_LOG_DIR": str(tmp_path)}):
+        logger = configure_logging(
+            "test_queue_file", log_format="%(message)s", **options
+        )
+        logger.info("first")
+
+        run_with_timeout(
+            lambda: configure_logging(
+                "test_queue_file", log_format="new %(message)s", **options
+            )
+        )
+    logger.info("second")
+    run_with_timeout(lambda: reset_logging("test_queue_file"))
+    stop_queue_listener()
+
+    assert (tmp_path / "queue.log").read_text() == "first\nnew second\n"
+
+
+def test_reset_keeps_other_loggers_in_queue_mode(tmp_path, monkeypatch):
+    """Test that resetting a file logger in queue mode keeps the others writing."""
+    stream = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stream)
+    other = configure_logging(
+        "test_queue_other", log_format="%(message)s", use_queue=True
+    )
+    with patch.dict("os.environ", {"AZURE_PIPELINES_LOG_DIR": str(tmp_path)}):
+        configure_logging(
+            "test_queue_file", file_output=True, console_output=False, use_queue=True
+        )
+
+    run_with_timeout(lambda: reset_logging("test_queue_file"))
+    other.info("still written")
+    stop_queue_listener()
+
+    assert stream.getvalue() == "still written\n"
+    reset_logging("test_queue_other")
+
+
+def flush_threads():
+    """Number of running flush threads of file handlers."""
+    return sum(thread.name == "log-flush" for thread in threading.enumerate())
+
+
+def test_loggers_share_file_handler(tmp_path):
+    """Test that all loggers writing to one file share a single handler."""
+    before = flush_threads()
+    with patch.dict("os.environ", {"AZURE_PIPELINES_LOG_DIR": str(tmp_path)}):
+        first = configure_logging(
+            "test_shared_first", file_output=True, console_output=False
+        )
+        with patch("pathlib.Path.mkdir") as mkdir:
+            second = configure_logging(
+                "test_shared_second",
+                file_output=True,
+                console_output=False,
+                log_format="%(message)s",
+            )
+
+    assert first.handlers[0] is second.handlers[0]
+    assert flush_threads() == before + 1
+    mkdir.assert_not_called()
+
+    reset_logging("test_shared_first")
+    second.info("still open")
+    reset_logging("test_shared_second")
+
+    assert flush_threads() == before
+    assert (tmp_path / "azure_pipelines.log").read_text() == "still open\n"
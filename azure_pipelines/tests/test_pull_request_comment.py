@@ -2,13 +2,24 @@
 Tests for the pull_requests.pull_request_comment module.
 """
 
+import asyncio
 import os
-from unittest.mock import mock_open, patch
+import time
+from unittest.mock import MagicMock, mock_open, patch
 
 import pytest
 import requests_mock
 
-from azure_pipelines.pull_requests.pull_request_comment import Message
+from azure_pipelines.pull_requests.pull_request_comment import (
+    MAX_COMMENT_LENGTH,
+    AsyncMessage,
+    CommentBatch,
+    Message,
+    create_session,
+    split_comment,
+    thread_marker,
+)
+from azure_pipelines.tests.fake_azure_devops import FakeAzureDevOps
 
 
 @pytest.fixture
@@ -121,7 +132,8 @@ def test_upload_attachment_and_comment_success(
         result = message_instance.upload_attachment_and_comment(file_path)
 
         assert result is True
-        assert mock.call_count == 3  # 1 upload + 2 comments
+        assert mock.call_count == 2  # 1 upload + 1 thread with both comments
+        assert len(mock.last_request.json()["comments"]) == 2
 
 
 def test_upload_attachment_and_comment_upload_failure(message_instance, api_url):
@@ -141,3 +153,384 @@ def test_upload_attachment_and_comment_upload_failure(message_instance, api_url)
         result = message_instance.upload_attachment_and_comment(file_path)
 
         assert result is False
+
+
+@pytest.fixture
+def fake_server():
+    """Run a fake Azure DevOps server."""
+    with FakeAzureDevOps() as server:
+        yield server
+
+
+def make_message(server, **kwargs):
+    """Create a Message sending requests to the fake server without backoff."""
+    with patch.dict(os.environ, server.environment()):
+        return Message(session=create_session(backoff_factor=0, **kwargs))
+
+
+def test_connections_are_reused(fake_server):
+    """Test that comments share one keep-alive connection."""
+    with make_message(fake_server) as message:
+        for index in range(5):
+            assert message.add_msg(comment=f"Comment {index}")
+
+    assert len(fake_server.requests) == 5
+    assert fake_server.connections == 1
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_add_msg_retries_unprocessed_requests(fake_server, status):
+    """Test that throttled and unavailable requests are sent again."""
+    fake_server.failures = [status, status]
+
+    with make_message(fake_server) as message:
+        assert message.add_msg(comment="Retried")
+
+    assert len(fake_server.requests) == 3
+    assert len(fake_server.threads) == 1
+
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_add_msg_does_not_repeat_posts(fake_server, status):
+    """Test that comments are not posted again after gateway errors."""
+    fake_server.failures = [status]
+
+    with make_message(fake_server) as message:
+        assert not message.add_msg(comment="Maybe posted")
+
+    assert len(fake_server.requests) == 1
+
+
+def test_retried_upload_sends_file_again(fake_server, tmp_path):
+    """Test that a retried upload sends the complete file."""
+    diagram = tmp_path / "diagram.png"
+    diagram.write_bytes(b"image data")
+    fake_server.failures = [503]
+
+    with make_message(fake_server) as message:
+        assert message.upload_attachment_and_comment(diagram)
+
+    uploads = [body for _, path, body in fake_server.requests if "attachments" in path]
+    assert uploads == [b"image data", b"image data"]
+    assert fake_server.connections == 1
+
+
+def test_retries_are_limited(fake_server):
+    """Test that retries give up after the configured number."""
+    fake_server.failures = [503] * 5
+
+    with make_message(fake_server, retries=2) as message:
+        assert not message.add_msg(comment="Unavailable")
+
+    assert len(fake_server.requests) == 3
+
+
+def test_close_only_owned_session(azure_devops_env):
+    """Test that only sessions created by the message are closed."""
+    session = MagicMock()
+
+    with patch.dict(os.environ, azure_devops_env):
+        with Message(session=session):
+            pass
+        with Message() as message:
+            owned = message.session = MagicMock()
+
+    session.close.assert_not_called()
+    owned.close.assert_called_once_with()
+
+
+def test_async_message_posts_concurrently(fake_server):
+    """Test that comments are posted in parallel up to the limit."""
+    fake_server.latency = 0.1
+
+    async def post():
+        message = make_message(fake_server, pool_size=4)
+        async with AsyncMessage(message=message, concurrency=4) as msg:
+            return await msg.gather(*(msg.add_msg(f"Report {i}") for i in range(8)))
+
+    start = time.perf_counter()
+    results = asyncio.run(post())
+    seconds = time.perf_counter() - start
+
+    assert results == [True] * 8
+    assert fake_server.max_in_flight == 4
+    assert fake_server.connections == 4
+    assert seconds < 0.4
+
+
+def test_async_message_upload_alongside_comments(fake_server, tmp_path):
+    """Test that the upload runs with other comments and keeps its order."""
+    diagram = tmp_path / "diagram.png"
+    diagram.write_bytes(b"image data")
+    fake_server.latency = 0.05
+
+    async def post():
+        async with AsyncMessage(message=make_message(fake_server)) as msg:
+            return await msg.gather(
+                msg.upload_attachment_and_comment(diagram),
+                msg.upload_attachment_and_comment(tmp_path / "missing.png"),
+                msg.add_msg("Report"),
+            )
+
+    results = asyncio.run(post())
+
+    threads = [
+        [comment["content"] for comment in thread["comments"]]
+        for thread in fake_server.threads.values()
+    ]
+    assert results == [True, False, True]
+    assert fake_server.max_in_flight == 2
+    assert ["Report"] in threads
+    diagram_comments = next(thread for thread in threads if thread != ["Report"])
+    assert diagram_comments[0].startswith("[Architecture Diagram]")
+    assert diagram_comments[1].startswith("<img")
+
+
+def test_async_message_close_keeps_event_loop_running(fake_server):
+    """Test that closing waits for pending requests without blocking the loop."""
+    fake_server.latency = 0.2
+    ticks = []
+
+    async def heartbeat():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def post():
+        beat = asyncio.create_task(heartbeat())
+        async with AsyncMessage(message=make_message(fake_server)) as msg:
+            pending = asyncio.ensure_future(msg.add_msg("Slow report"))
+            await asyncio.sleep(0.02)
+            closing = time.perf_counter()
+        closed = time.perf_counter()
+        beat.cancel()
+        return await pending, closing, closed
+
+    added, closing, closed = asyncio.run(post())
+
+    during_close = [tick for tick in ticks if closing <= tick <= closed]
+    assert added is True
+    assert closed - closing > 0.1
+    assert len(during_close) > 5
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+
+
+def thread_contents(server):
+    """Contents of the comments of every thread on the fake server."""
+    return [
+        [comment["content"] for comment in thread["comments"]]
+        for thread in server.threads.values()
+    ]
+
+
+def test_comment_batch_creates_one_thread(fake_server):
+    """Test that a batch is posted with a single request."""
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message)
+        for text in ("Diff", "Report 1", "Report 2"):
+            batch.add(text)
+
+        assert batch.send() == [True, True, True]
+
+    assert len(fake_server.requests) == 1
+    assert thread_contents(fake_server) == [["Diff", "Report 1", "Report 2"]]
+    assert len(batch) == 0
+
+
+def test_comment_batch_replies_beyond_payload_limit(fake_server):
+    """Test that comments not fitting into the thread become ordered replies."""
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message, max_comment_length=10, max_payload_bytes=20)
+        batch.add("first")
+        batch.add("second")
+        batch.add("line one\nline two\n")
+
+        assert batch.send() == [True, True, True]
+
+    assert thread_contents(fake_server) == [
+        ["first", "second", "line one\n", "line two\n"]
+    ]
+    assert len(fake_server.requests) == 3
+    assert fake_server.requests[1][1].split("?")[0].endswith("/threads/1/comments")
+
+
+def test_comment_batch_streams_parts(fake_server):
+    """Test that parts of an iterable are read while the replies are posted."""
+    read = []
+
+    def chunks():
+        for text in ("one", "two", "three"):
+            read.append(text)
+            yield text
+
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message, max_payload_bytes=1)
+        batch.add(chunks())
+        batch.add("report")
+
+        assert read == []
+        assert batch.send() == [True, True]
+
+    assert read == ["one", "two", "three"]
+    assert thread_contents(fake_server) == [["one", "two", "three", "report"]]
+    assert len(fake_server.requests) == 4
+
+
+def test_comment_batch_closes_parts_on_failure(fake_server):
+    """Test that a failed thread creation stops reading streamed comments."""
+    fake_server.failures = [400]
+    read = []
+    closed = []
+
+    def chunks():
+        try:
+            for text in ("one", "two", "three", "four"):
+                read.append(text)
+                yield text
+        finally:
+            closed.append(True)
+
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message, max_payload_bytes=1)
+        batch.add(chunks())
+        assert batch.send() == [False]
+
+    assert read == ["one", "two"]
+    assert closed == [True]
+
+
+def test_comment_batch_failures(fake_server):
+    """Test the results of a failed thread creation and a failed reply."""
+    fake_server.failures = [400]
+
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message, max_payload_bytes=1)
+        batch.add("first")
+        batch.add("second")
+        assert batch.send() == [False, False]
+
+        fake_server.failures = [None, 400]
+        batch.add("first")
+        batch.add("second")
+        batch.add("third")
+        assert batch.send() == [True, False, True]
+
+    assert thread_contents(fake_server) == [["first", "third"]]
+
+
+def test_comment_batch_context_manager(fake_server):
+    """Test that the batch is sent at the end of a block without errors."""
+    with make_message(fake_server) as message:
+        with CommentBatch(message) as batch:
+            batch.add("sent")
+
+        with pytest.raises(RuntimeError):
+            with CommentBatch(message) as batch:
+                batch.add("not sent")
+                raise RuntimeError("failed")
+
+    assert thread_contents(fake_server) == [["sent"]]
+
+
+@pytest.mark.parametrize(
+    "comment, parts",
+    [
+        ("short", ["short"]),
+        ("one\ntwo\nthree\n", ["one\ntwo\n", "three\n"]),
+        ("abcdefghijklmnop\nq", ["abcdefgh", "ijklmnop", "\nq"]),
+    ],
+)
+def test_split_comment(comment, parts):
+    """Test splitting comments at line breaks and cutting long lines."""
+    assert split_comment(comment, max_length=8) == parts
+
+
+def test_keyed_batch_keeps_comment_limit(fake_server):
+    """Test that the thread marker does not push a comment over the limit."""
+    diff = "".join(f"line {index:04d} " + "x" * 90 + "\n" for index in range(2000))
+
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message, key="cdk-diff")
+        batch.add(diff)
+
+        assert batch.send() == [True]
+
+    contents = thread_contents(fake_server)[0]
+    assert len(contents) == 2
+    assert all(len(content) <= MAX_COMMENT_LENGTH for content in contents)
+    assert contents[0].endswith(thread_marker("cdk-diff"))
+
+
+def test_upsert_updates_thread_of_earlier_run(fake_server):
+    """Test that a later run patches the comment of the same key."""
+    with make_message(fake_server) as message:
+        assert message.upsert_msg("cdk-diff", "first diff")
+        assert message.upsert_msg("report", "report")
+
+    with make_message(fake_server) as message:
+        assert message.upsert_msg("cdk-diff", "second diff")
+
+    marker = thread_marker("cdk-diff")
+    assert thread_contents(fake_server) == [
+        [f"second diff\n\n{marker}"],
+        [f"report\n\n{thread_marker('report')}"],
+    ]
+    assert [method for method, _, _ in fake_server.requests[-2:]] == ["GET", "PATCH"]
+
+
+def test_upsert_skips_unchanged_comments(fake_server):
+    """Test that unchanged comments cost only the thread listing."""
+    with make_message(fake_server) as message:
+        for _ in range(3):
+            assert message.upsert_msg("cdk-diff", "same diff")
+
+    assert [method for method, _, _ in fake_server.requests] == [
+        "GET",
+        "POST",
+        "GET",
+        "GET",
+    ]
+    assert len(fake_server.threads) == 1
+
+
+def test_upsert_batch_resizes_thread(fake_server):
+    """Test that replies are added and removed without touching others."""
+    with make_message(fake_server) as message:
+        batch = CommentBatch(message, max_payload_bytes=1, key="reports")
+        for text in ("diff", "report 1", "report 2"):
+            batch.add(text)
+        assert batch.send() == [True, True, True]
+
+        fake_server.add_reply(1, {"content": "Looks good"}, author="reviewer")
+
+        for text in ("diff", "report 1 changed"):
+            batch.add(text)
+        assert batch.send() == [True, True]
+
+    comments = fake_server.threads[1]["comments"]
+    assert [
+        (comment["content"], comment.get("isDeleted", False)) for comment in comments
+    ] == [
+        (f"diff\n\n{thread_marker('reports')}", False),
+        ("report 1 changed", False),
+        ("report 2", True),
+        ("Looks good", False),
+    ]
+    assert len(fake_server.threads) == 1
+
+
+def test_upsert_creates_thread_if_listing_fails(fake_server):
+    """Test that a failed listing falls back to a new thread."""
+    fake_server.failures = [500]
+
+    with make_message(fake_server, retries=0) as message:
+        assert message.upsert_msg("cdk-diff", "diff")
+        assert message.upsert_msg("cdk-diff", "new diff")
+
+    assert [method for method, _, _ in fake_server.requests] == [
+        "GET",
+        "POST",
+        "GET",
+        "PATCH",
+    ]
+    assert len(fake_server.threads) == 1
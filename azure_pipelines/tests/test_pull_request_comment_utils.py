@@ -2,13 +2,17 @@
 Tests for the pull_requests.comment module.
 """
 
+import os
+import tracemalloc
+from functools import partial
 from pathlib import Path
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
 
-from azure_pipelines.pull_requests import comment
+from azure_pipelines.pull_requests import comment, pull_request_comment
+from azure_pipelines.tests.fake_azure_devops import FakeAzureDevOps
 
 
 @pytest.fixture
@@ -17,148 +21,287 @@ def mock_message():
     return MagicMock()
 
 
-def test_read_output_file_success(mock_file_content):
-    """Test read_output_file with successful file read."""
-    file_path = "./output.log"
+def test_stream_output_file_error():
+    """Test that errors other than a missing output file are raised."""
+    with patch("builtins.open", side_effect=PermissionError()), pytest.raises(
+        PermissionError
+    ):
+        list(comment.stream_output_file("./error.log"))
 
-    with patch("builtins.open", mock_open(read_data=mock_file_content)):
-        result = comment.read_output_file(file_path)
 
-        assert result == mock_file_content
+def test_read_validation_reports_directory_not_found():
+    """Test that a missing templates directory has no reports."""
+    assert comment.read_validation_reports("./nonexistent/") == {}
 
 
-def test_read_output_file_not_found():
-    """Test read_output_file when file is not found."""
-    file_path = "./nonexistent.log"
+def test_post_comments_skips_empty_reports(mock_message, mock_file_content):
+    """Test that empty validation reports are not posted."""
+    mock_message.find_thread.return_value = None
+    mock_message.create_thread.return_value = 7
+    csv_files = [Path("empty.csv")]
 
-    with patch("builtins.open", side_effect=FileNotFoundError()):
-        result = comment.read_output_file(file_path)
+    with patch("pathlib.Path.exists", return_value=True), patch(
+        "pathlib.Path.glob", return_value=csv_files
+    ), patch("pandas.read_csv", return_value=pd.DataFrame()):
+        results = comment.post_comments(mock_message, mock_file_content)
 
-        assert result is None
+    assert results == {"cdk diff": True}
+    mock_message.create_thread.assert_called_once_with(
+        [f"{mock_file_content}\n\n<!-- azure-pipelines-bot:cdk-diff -->"]
+    )
 
 
-def test_read_output_file_error():
-    """Test read_output_file with other errors."""
-    file_path = "./error.log"
+def test_post_comments_skips_unreadable_reports(mock_message, sample_dataframe):
+    """Test that a report failing to read does not stop the others."""
+    mock_message.find_thread.return_value = None
+    mock_message.create_thread.return_value = 7
+    csv_files = [Path("report1.csv"), Path("error.csv")]
 
-    with patch("builtins.open", side_effect=PermissionError()), pytest.raises(
-        PermissionError
-    ):
-        comment.read_output_file(file_path)
+    def mock_read_csv(file_path):
+        if "error.csv" in str(file_path):
+            raise Exception("CSV error")
+        return sample_dataframe
+
+    with patch("pathlib.Path.exists", return_value=True), patch(
+        "pathlib.Path.glob", return_value=csv_files
+    ), patch("pandas.read_csv", side_effect=mock_read_csv):
+        results = comment.post_comments(mock_message, None)
 
+    assert results == {"cdk diff": True, "report1.csv": True}
 
-def test_add_cdk_diff_comment_with_content(mock_message, mock_file_content):
-    """Test add_cdk_diff_comment with content."""
-    result = comment.add_cdk_diff_comment(mock_message, mock_file_content)
 
-    mock_message.add_msg.assert_called_once_with(comment=mock_file_content)
-    assert result == mock_message.add_msg.return_value
+def test_main_success(mock_pull_request_comment, mock_file_content):
+    """Test that main posts the diff and all reports as one thread."""
+    mock_pull_request_comment.find_thread.return_value = None
 
+    with patch(
+        "azure_pipelines.pull_requests.comment.stream_output_file",
+        return_value=iter([mock_file_content]),
+    ), patch(
+        "azure_pipelines.pull_requests.comment.read_validation_reports",
+        return_value={"report1.csv": "report 1", "report2.csv": "report 2"},
+    ):
 
-def test_add_cdk_diff_comment_without_content(mock_message):
-    """Test add_cdk_diff_comment without content."""
-    result = comment.add_cdk_diff_comment(mock_message, None)
+        comment.main()
 
-    mock_message.add_msg.assert_called_once_with(
-        comment="CDK Diff found no resource is going to change"
+    mock_pull_request_comment.find_thread.assert_called_once_with("cdk-diff")
+    mock_pull_request_comment.create_thread.assert_called_once_with(
+        [
+            f"{mock_file_content}\n\n<!-- azure-pipelines-bot:cdk-diff -->",
+            "report 1",
+            "report 2",
+        ]
     )
-    assert result == mock_message.add_msg.return_value
+    mock_pull_request_comment.add_reply.assert_not_called()
 
 
-def test_add_validation_reports_directory_not_found(mock_message):
-    """Test add_validation_reports when directory is not found."""
-    templates_dir = "./nonexistent/"
+def test_main_comment_failure(mock_pull_request_comment, mock_file_content):
+    """Test main function with comment failure."""
+    mock_pull_request_comment.find_thread.return_value = None
+    mock_pull_request_comment.create_thread.return_value = None
 
-    with patch("pathlib.Path.exists", return_value=False):
-        comment.add_validation_reports(mock_message, templates_dir)
+    with patch(
+        "azure_pipelines.pull_requests.comment.stream_output_file",
+        return_value=iter([mock_file_content]),
+    ), patch(
+        "azure_pipelines.pull_requests.comment.read_validation_reports",
+        return_value={"report1.csv": "report 1"},
+    ):
 
-        mock_message.add_msg.assert_not_called()
+        # Should not raise exception
+        comment.main()
 
+    mock_pull_request_comment.create_thread.assert_called_once()
 
-def test_add_validation_reports_with_csv_files(mock_message, sample_dataframe):
-    """Test add_validation_reports with CSV files."""
-    templates_dir = "./synth/templates/"
-    csv_files = [
-        Path(templates_dir) / "report1.csv",
-        Path(templates_dir) / "report2.csv",
-    ]
+
+def test_post_comments_reports_results(mock_message, sample_dataframe):
+    """Test that every comment gets its own result."""
+    mock_message.find_thread.return_value = None
+    mock_message.create_thread.return_value = 7
+    mock_message.add_reply.side_effect = [True, False]
+    csv_files = [Path("report1.csv"), Path("report2.csv")]
+    report = sample_dataframe.to_markdown()
 
     with patch("pathlib.Path.exists", return_value=True), patch(
         "pathlib.Path.glob", return_value=csv_files
-    ), patch("pandas.read_csv", return_value=sample_dataframe):
+    ), patch("pandas.read_csv", return_value=sample_dataframe), patch(
+        "azure_pipelines.pull_requests.pull_request_comment.CommentBatch",
+        partial(pull_request_comment.CommentBatch, max_payload_bytes=1),
+    ):
+        results = comment.post_comments(mock_message, None, "./synth/templates/")
+
+    assert results == {"cdk diff": True, "report1.csv": True, "report2.csv": False}
+    mock_message.create_thread.assert_called_once_with(
+        [
+            "CDK Diff found no resource is going to change\n\n"
+            "<!-- azure-pipelines-bot:cdk-diff -->"
+        ]
+    )
+    assert [call.args for call in mock_message.add_reply.call_args_list] == [
+        (7, report),
+        (7, report),
+    ]
 
-        comment.add_validation_reports(mock_message, templates_dir)
 
-        # Should be called once for each CSV file
-        assert mock_message.add_msg.call_count == 2
-        mock_message.add_msg.assert_called_with(comment=sample_dataframe.to_markdown())
+def make_diff(resources):
+    """Create cdk diff output as written to output.log by the pipeline."""
+    lines = ["```bash\n", "Stack SampleStack\n", "Resources\n"]
+    for index in range(resources):
+        lines += [
+            f"[+] AWS::S3::Bucket Bucket{index} Bucket{index}ABCDEF\n",
+            f" + |- BucketName: sample-bucket-{index}\n",
+            " \\`- Versioning: Enabled\n",
+        ]
+    return lines + ["```\n"]
 
 
-def test_add_validation_reports_with_empty_csv(mock_message):
-    """Test add_validation_reports with empty CSV files."""
-    templates_dir = "./synth/templates/"
-    csv_files = [Path(templates_dir) / "empty.csv"]
-    empty_df = pd.DataFrame()
+def test_iter_diff_chunks_small_diff():
+    """Test that a diff shorter than the limit is a single chunk."""
+    lines = make_diff(2)
 
-    with patch("pathlib.Path.exists", return_value=True), patch(
-        "pathlib.Path.glob", return_value=csv_files
-    ), patch("pandas.read_csv", return_value=empty_df):
+    assert list(comment.iter_diff_chunks(lines)) == ["".join(lines).rstrip("\n")]
 
-        comment.add_validation_reports(mock_message, templates_dir)
 
-        # Should not be called for empty DataFrames
-        mock_message.add_msg.assert_not_called()
+def test_iter_diff_chunks_splits_at_resources():
+    """Test that chunks end before resources and keep code blocks balanced."""
+    lines = make_diff(50)
 
+    chunks = list(comment.iter_diff_chunks(lines, max_length=300))
 
-def test_add_validation_reports_with_error(mock_message, sample_dataframe):
-    """Test add_validation_reports with error during processing."""
-    templates_dir = "./synth/templates/"
-    csv_files = [Path(templates_dir) / "report1.csv", Path(templates_dir) / "error.csv"]
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 300
+        assert chunk.startswith("```bash\n")
+        assert chunk.endswith("```")
+        assert chunk.count("```") == 2
+    for chunk in chunks[1:]:
+        assert chunk.split("\n")[1].startswith("[+] AWS::S3::Bucket")
 
-    def mock_read_csv(file_path):
-        if "error.csv" in str(file_path):
-            raise Exception("CSV error")
-        return sample_dataframe
+    # Without the added fences the chunks are the diff again
+    content = [line for chunk in chunks for line in chunk.split("\n")[1:-1]]
+    assert content == [line.rstrip("\n") for line in lines[1:-1]]
 
-    with patch("pathlib.Path.exists", return_value=True), patch(
-        "pathlib.Path.glob", return_value=csv_files
-    ), patch("pandas.read_csv", side_effect=mock_read_csv):
 
-        # Should not raise exception
-        comment.add_validation_reports(mock_message, templates_dir)
+def test_iter_diff_chunks_splits_long_resources_at_lines():
+    """Test that a resource longer than the limit is split between lines."""
+    lines = ["[~] AWS::IAM::Policy Policy\n"] + [
+        f" + statement {i}\n" for i in range(40)
+    ]
 
-        # Should be called only for the successful CSV
-        assert mock_message.add_msg.call_count == 1
+    chunks = list(comment.iter_diff_chunks(lines, max_length=100))
 
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "\n".join(chunks) == "".join(lines).rstrip("\n")
 
-def test_main_success(mock_pull_request_comment, mock_file_content):
-    """Test main function with successful execution."""
-    with patch(
-        "azure_pipelines.pull_requests.comment.read_output_file",
-        return_value=mock_file_content,
-    ), patch(
-        "azure_pipelines.pull_requests.comment.add_cdk_diff_comment", return_value=True
-    ), patch(
-        "azure_pipelines.pull_requests.comment.add_validation_reports"
-    ) as mock_add_reports:
 
-        comment.main()
+def test_iter_diff_chunks_cuts_long_lines():
+    """Test that lines longer than the limit are cut."""
+    chunks = list(comment.iter_diff_chunks(["x" * 250], max_length=100))
 
-        mock_add_reports.assert_called_once()
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunk.replace("\n", "") for chunk in chunks) == "x" * 250
 
 
-def test_main_comment_failure(mock_pull_request_comment, mock_file_content):
-    """Test main function with comment failure."""
+def test_iter_diff_chunks_closes_fences_after_cut_lines():
+    """Test that code blocks are closed on their own line after a cut line."""
+    lines = ["```bash\n", "[~] AWS::IAM::Policy Policy\n", "y" * 250 + "\n", "```\n"]
+
+    chunks = list(comment.iter_diff_chunks(lines, max_length=100))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 100
+        assert chunk.startswith("```bash\n")
+        assert chunk.endswith("\n```")
+        assert chunk.count("```") == 2
+    content = "".join(chunk.split("\n", 1)[1].rsplit("\n", 1)[0] for chunk in chunks)
+    assert content.replace("\n", "") == "[~] AWS::IAM::Policy Policy" + "y" * 250
+
+
+def test_stream_output_file(tmp_path):
+    """Test that the output file is streamed in chunks."""
+    output = tmp_path / "output.log"
+    output.write_text("".join(make_diff(50)))
+
+    chunks = list(comment.stream_output_file(str(output), max_length=500))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 for chunk in chunks)
+
+
+@pytest.mark.parametrize("content", [None, "", "\n\n"])
+def test_stream_output_file_without_diff(tmp_path, content):
+    """Test the comment of a missing or empty output file."""
+    output = tmp_path / "output.log"
+    if content is not None:
+        output.write_text(content)
+
+    assert list(comment.stream_output_file(str(output))) == [
+        "CDK Diff found no resource is going to change"
+    ]
+
+
+def test_stream_output_file_memory_is_bounded(tmp_path):
+    """Test that memory does not grow with the size of the output file."""
+    output = tmp_path / "output.log"
+    with open(output, "w") as output_file:
+        for _ in range(200):
+            output_file.writelines(make_diff(100))
+    assert output.stat().st_size > 2_000_000
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in comment.stream_output_file(str(output), 10000))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count > 200
+    assert peak < 500_000
+
+
+def test_post_comments_streams_diff_as_replies(mock_message, tmp_path):
+    """Test that a streamed diff is posted as ordered replies of the thread."""
+    mock_message.find_thread.return_value = None
+    mock_message.create_thread.return_value = 7
+    output = tmp_path / "output.log"
+    output.write_text("".join(make_diff(20)))
+    chunks = list(comment.stream_output_file(str(output), max_length=300))
+
     with patch(
-        "azure_pipelines.pull_requests.comment.read_output_file",
-        return_value=mock_file_content,
-    ), patch(
-        "azure_pipelines.pull_requests.comment.add_cdk_diff_comment", return_value=False
-    ), patch(
-        "azure_pipelines.pull_requests.comment.add_validation_reports"
-    ) as mock_add_reports:
+        "azure_pipelines.pull_requests.pull_request_comment.CommentBatch",
+        partial(pull_request_comment.CommentBatch, max_payload_bytes=1),
+    ):
+        results = comment.post_comments(
+            mock_message,
+            comment.stream_output_file(str(output), max_length=300),
+            str(tmp_path),
+        )
+
+    assert results == {"cdk diff": True}
+    mock_message.create_thread.assert_called_once_with(
+        [f"{chunks[0]}\n\n<!-- azure-pipelines-bot:cdk-diff -->"]
+    )
+    assert [call.args for call in mock_message.add_reply.call_args_list] == [
+        (7, chunk) for chunk in chunks[1:]
+    ]
 
-        comment.main()
 
-        # Should still try to add validation reports even if comment fails
-        mock_add_reports.assert_called_once()
+def test_post_all_comments_keeps_comment_limit(monkeypatch, tmp_path):
+    """Test that no streamed diff comment exceeds the limit with the marker."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "output.log").write_text(
+        "".join(f"line {index:04d} " + "x" * 90 + "\n" for index in range(2000))
+    )
+
+    with FakeAzureDevOps() as server:
+        with patch.dict(os.environ, server.environment()):
+            results = comment.post_all_comments()
+
+    contents = [item["content"] for item in server.threads[1]["comments"]]
+    assert results == {"cdk diff": True}
+    assert len(contents) == 2
+    assert all(
+        len(content) <= pull_request_comment.MAX_COMMENT_LENGTH for content in contents
+    )
+    assert contents[0].endswith("<!-- azure-pipelines-bot:cdk-diff -->")
@@ -0,0 +1,205 @@
+"""
+Tests for the synth.cache module.
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from azure_pipelines.synth.cache import INPUTS_FILE, SynthCache
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """Create a minimal CDK project layout."""
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "developer.json").write_text('{"AccountId": "1"}')
+    (tmp_path / "cdk_sample_repo").mkdir()
+    (tmp_path / "cdk_sample_repo" / "stack.py").write_text("# stack")
+    (tmp_path / "app.py").write_text("# app")
+    (tmp_path / "cdk.json").write_text(json.dumps({"context": {"flag": True}}))
+    return tmp_path
+
+
+@pytest.fixture
+def synth_cache(project_dir):
+    """Create a synth cache for the temporary project."""
+    return SynthCache(
+        project_dir=project_dir,
+        outdir=project_dir / "cdk.out",
+        context={"environment": "developer"},
+    )
+
+
+def write_assembly(outdir, content="template"):
+    """Write a fake cloud assembly."""
+    outdir.mkdir(parents=True, exist_ok=True)
+    (outdir / "manifest.json").write_text("{}")
+    (outdir / "stack.template.json").write_text(content)
+
+
+def test_key_is_stable(project_dir, synth_cache):
+    """Test that identical inputs produce identical keys."""
+    other = SynthCache(
+        project_dir=project_dir,
+        outdir=project_dir / "cdk.out",
+        context={"environment": "developer"},
+    )
+
+    assert synth_cache.key == other.key
+    assert "config/developer.json" in synth_cache.inputs["files"]
+
+
+def test_key_changes_with_inputs(project_dir, synth_cache):
+    """Test that changed files, context and versions change the key."""
+    key = synth_cache.key
+
+    (project_dir / "config" / "developer.json").write_text('{"AccountId": "2"}')
+    changed_file = SynthCache(
+        project_dir=project_dir, context={"environment": "developer"}
+    )
+    assert changed_file.key != key
+
+    changed_context = SynthCache(
+        project_dir=project_dir, context={"environment": "prod"}
+    )
+    assert changed_context.key != changed_file.key
+
+    with patch.object(SynthCache, "_package_version", return_value="9.9.9"):
+        changed_version = SynthCache(
+            project_dir=project_dir, context={"environment": "developer"}
+        )
+        assert changed_version.key != changed_file.key
+
+
+def test_restore_miss(synth_cache):
+    """Test restore on an empty cache."""
+    assert synth_cache.restore() is False
+
+
+def test_store_and_restore(project_dir, synth_cache):
+    """Test that a stored cloud assembly is restored."""
+    outdir = project_dir / "cdk.out"
+    write_assembly(outdir)
+
+    assert synth_cache.store() is True
+    assert (synth_cache.entry_dir / INPUTS_FILE).is_file()
+
+    # Remove the output and restore it from the cache
+    (outdir / "stack.template.json").unlink()
+    assert synth_cache.restore() is True
+    assert (outdir / "stack.template.json").read_text() == "template"
+    assert not (outdir / INPUTS_FILE).exists()
+
+
+@pytest.mark.parametrize(
+    "config,context",
+    [
+        ({"QueueName": "ssm:/platform/queue-name"}, {"environment": "developer"}),
+        (
+            {"AccountId": "1"},
+            {"environment": "developer", "config": {"Tags": ["ssm:/platform/tag"]}},
+        ),
+    ],
+)
+def test_parameter_references_skip_cache(project_dir, config, context):
+    """Test that configurations with SSM references are never restored."""
+    (project_dir / "config" / "developer.json").write_text(json.dumps(config))
+    synth_cache = SynthCache(
+        project_dir=project_dir, outdir=project_dir / "cdk.out", context=context
+    )
+    write_assembly(project_dir / "cdk.out")
+
+    assert synth_cache.references
+    assert synth_cache.store() is False
+    assert not synth_cache.cache_dir.exists()
+
+    # An entry written before the reference was added is not restored either
+    write_assembly(synth_cache.entry_dir, "stale")
+    assert synth_cache.restore() is False
+    assert (project_dir / "cdk.out" / "stack.template.json").read_text() == "template"
+
+
+def test_store_without_assembly(synth_cache):
+    """Test that nothing is stored without a cloud assembly."""
+    assert synth_cache.store() is False
+    assert not synth_cache.cache_dir.exists()
+
+
+def test_disabled(project_dir):
+    """Test that a disabled cache neither stores nor restores."""
+    cache = SynthCache(
+        project_dir=project_dir, outdir=project_dir / "cdk.out", enabled=False
+    )
+    write_assembly(project_dir / "cdk.out")
+
+    assert cache.store() is False
+    assert cache.restore() is False
+
+
+def test_prune(project_dir):
+    """Test that only max_entries cache entries are kept."""
+    outdir = project_dir / "cdk.out"
+    write_assembly(outdir)
+
+    for environment in ("a", "b", "c"):
+        SynthCache(
+            project_dir=project_dir,
+            outdir=outdir,
+            context={"environment": environment},
+            max_entries=2,
+        ).store()
+
+    entries = [p for p in (project_dir / ".synth-cache").iterdir()]
+    assert len(entries) == 2
+
+
+def test_prune_keeps_other_directories(project_dir):
+    """Test that only cloud assemblies count as entries."""
+    environment_dir = project_dir / ".synth-cache" / "developer"
+    environment_dir.mkdir(parents=True)
+    write_assembly(project_dir / "cdk.out")
+
+    cache = SynthCache(
+        project_dir=project_dir,
+        outdir=project_dir / "cdk.out",
+        context={"environment": "a"},
+        max_entries=1,
+    )
+    cache.store()
+    (project_dir / ".synth-cache" / "removed").mkdir()
+    with patch("pathlib.Path.iterdir", autospec=True) as iterdir:
+        # An entry pruned by a concurrent synth is still listed
+        iterdir.return_value = [
+            cache.entry_dir,
+            environment_dir,
+            project_dir / ".synth-cache" / "gone",
+        ]
+        cache.prune()
+
+    assert environment_dir.is_dir()
+    assert cache.entry_dir.is_dir()
+
+
+def test_restore_of_removed_entry_is_a_miss(project_dir, synth_cache):
+    """Test that an entry removed while it is copied counts as a miss."""
+    write_assembly(project_dir / "cdk.out")
+    synth_cache.store()
+
+    with patch("shutil.copytree", side_effect=FileNotFoundError("pruned")):
+        assert synth_cache.restore() is False
+
+
+def test_from_environment(mock_env, project_dir):
+    """Test configuration through environment variables."""
+    with mock_env(
+        AZURE_PIPELINES_SYNTH_CACHE="0",
+        CDK_OUTDIR="synth/templates",
+        CDK_CONTEXT_JSON='{"environment": "developer"}',
+    ):
+        cache = SynthCache.from_environment(project_dir)
+
+    assert cache.enabled is False
+    assert str(cache.outdir) == "synth/templates"
+    assert cache.context == {"flag": True, "environment": "developer"}
@@ -0,0 +1,55 @@
+"""
+Tests for the synth.context module.
+"""
+
+import json
+
+import pytest
+
+from azure_pipelines.synth.context import context_flag, load_cdk_context
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """Create a project with a cdk.json file."""
+    (tmp_path / "cdk.json").write_text(
+        json.dumps({"app": "python3 app.py", "context": {"graph": False, "a": 1}})
+    )
+    return tmp_path
+
+
+def test_load_cdk_context_from_cdk_json(mock_env, project_dir):
+    """Test that the context of cdk.json is loaded."""
+    with mock_env(CDK_CONTEXT_JSON=""):
+        assert load_cdk_context(project_dir) == {"graph": False, "a": 1}
+
+
+def test_load_cdk_context_cli_override(mock_env, project_dir):
+    """Test that the context passed by the CDK CLI takes precedence."""
+    with mock_env(CDK_CONTEXT_JSON='{"graph": "true", "environment": "developer"}'):
+        context = load_cdk_context(project_dir)
+
+    assert context == {"graph": "true", "a": 1, "environment": "developer"}
+
+
+def test_load_cdk_context_without_cdk_json(mock_env, tmp_path):
+    """Test loading the context without a cdk.json file."""
+    with mock_env(CDK_CONTEXT_JSON=""):
+        assert load_cdk_context(tmp_path) == {}
+
+
+@pytest.mark.parametrize(
+    "context, env_value, expected",
+    [
+        ({"graph": True}, None, True),
+        ({"graph": "false"}, "1", False),
+        ({}, "1", True),
+        ({}, "off", False),
+        ({}, None, False),
+    ],
+)
+def test_context_flag(mock_env, context, env_value, expected):
+    """Test reading switches from the context and environment variables."""
+    env = {"AZURE_PIPELINES_CDK_GRAPH": env_value} if env_value is not None else {}
+    with mock_env(**env):
+        assert context_flag(context, "graph", "AZURE_PIPELINES_CDK_GRAPH") is expected
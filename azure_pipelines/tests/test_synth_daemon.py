@@ -0,0 +1,194 @@
+"""
+Tests for the synth.daemon module.
+"""
+
+import json
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from azure_pipelines.synth.daemon import (
+    FileWatcher,
+    SynthDaemon,
+    compile_glob,
+    request_daemon,
+)
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """Create a minimal CDK project with watch settings."""
+    (tmp_path / "cdk_sample_repo").mkdir()
+    (tmp_path / "cdk_sample_repo" / "stack.py").write_text("# stack")
+    (tmp_path / "cdk_sample_repo" / "__init__.py").write_text("")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_stack.py").write_text("# test")
+    (tmp_path / "app.py").write_text("# app")
+    (tmp_path / "cdk.json").write_text(
+        json.dumps(
+            {
+                "watch": {"include": ["**"], "exclude": ["**/__init__.py", "tests"]},
+                "context": {"flag": True},
+            }
+        )
+    )
+    return tmp_path
+
+
+def touch(path, content):
+    """Write a file and move its modification time forward."""
+    path.write_text(content)
+    stamp = time.time() + 10
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.mark.parametrize(
+    "pattern,path,expected",
+    [
+        ("**", "cdk_sample_repo/stack.py", True),
+        ("**/__init__.py", "__init__.py", True),
+        ("**/__init__.py", "cdk_sample_repo/__init__.py", True),
+        ("*.py", "cdk_sample_repo/stack.py", False),
+        ("cdk*.json", "cdk.context.json", True),
+        ("tests", "tests/test_stack.py", False),
+    ],
+)
+def test_compile_glob(pattern, path, expected):
+    """Test the translation of watch globs."""
+    assert bool(compile_glob(pattern).match(path)) is expected
+
+
+def test_watcher_respects_cdk_json(project_dir):
+    """Test that excluded files and directories are not watched."""
+    (project_dir / "cdk.out").mkdir()
+    (project_dir / "cdk.out" / "manifest.json").write_text("{}")
+
+    watcher = FileWatcher.from_cdk_json(project_dir)
+
+    assert sorted(watcher.snapshot) == [
+        "app.py",
+        "cdk.json",
+        "cdk_sample_repo/stack.py",
+    ]
+
+
+def test_watcher_detects_changes(project_dir):
+    """Test that changed, added and removed files are reported once."""
+    watcher = FileWatcher.from_cdk_json(project_dir)
+
+    touch(project_dir / "cdk_sample_repo" / "stack.py", "# changed")
+    (project_dir / "cdk_sample_repo" / "new.py").write_text("# new")
+    (project_dir / "app.py").unlink()
+    touch(project_dir / "tests" / "test_stack.py", "# ignored")
+
+    assert watcher.poll() == [
+        "app.py",
+        "cdk_sample_repo/new.py",
+        "cdk_sample_repo/stack.py",
+    ]
+    assert watcher.poll() == []
+
+
+@pytest.mark.parametrize("log_dir", [None, "build/logs"])
+def test_watcher_ignores_log_directory(project_dir, monkeypatch, log_dir):
+    """Test that log writes inside the project do not trigger a synth."""
+    monkeypatch.chdir(project_dir)
+    if log_dir is None:
+        monkeypatch.delenv("AZURE_PIPELINES_LOG_DIR", raising=False)
+        log_path = project_dir / "logs"
+    else:
+        monkeypatch.setenv("AZURE_PIPELINES_LOG_DIR", log_dir)
+        log_path = project_dir / log_dir
+    log_path.mkdir(parents=True)
+    (log_path / "daemon.log").write_text("started\n")
+
+    watcher = FileWatcher.from_cdk_json(project_dir)
+    touch(log_path / "daemon.log", "started\nsynthesized\n")
+    (log_path / "daemon.log.20250101.gz").write_text("segment")
+
+    assert "daemon.log" not in "".join(watcher.snapshot)
+    assert watcher.poll() == []
+
+
+def test_synth_uses_cache(project_dir):
+    """Test that unchanged inputs are served from the synth cache."""
+    calls = []
+
+    def fake_synthesize(context, outdir, graph):
+        calls.append(context)
+        outdir.mkdir(parents=True, exist_ok=True)
+        (outdir / "manifest.json").write_text("{}")
+        return outdir
+
+    daemon = SynthDaemon(project_dir, synthesize=fake_synthesize)
+
+    first = daemon.synth({"environment": "developer"})
+    second = daemon.synth({"environment": "developer"})
+
+    assert first["success"] and not first["cacheHit"]
+    assert second["success"] and second["cacheHit"]
+    assert calls == [{"flag": True, "environment": "developer"}]
+    assert first["outdir"] == str(project_dir / "cdk.out")
+
+
+def test_synth_reports_failures(project_dir):
+    """Test that a failing synth does not stop the daemon."""
+
+    def failing_synthesize(context, outdir, graph):
+        raise RuntimeError("broken stack")
+
+    daemon = SynthDaemon(project_dir, synthesize=failing_synthesize, use_cache=False)
+
+    result = daemon.synth()
+
+    assert result["success"] is False
+    assert result["error"] == "broken stack"
+    assert daemon.handle({"command": "status"})["synthCount"] == 1
+
+
+def test_serve_round_trip(project_dir):
+    """Test synth, status and stop requests against a running daemon."""
+    state_file = project_dir / ".synth-daemon.json"
+
+    def fake_synthesize(context, outdir, graph):
+        outdir.mkdir(parents=True, exist_ok=True)
+        return outdir
+
+    daemon = SynthDaemon(project_dir, synthesize=fake_synthesize, use_cache=False)
+    server = threading.Thread(
+        target=daemon.serve, kwargs={"watch": False, "state_file": state_file}
+    )
+    server.start()
+    try:
+        for _ in range(100):
+            if state_file.exists():
+                break
+            time.sleep(0.05)
+
+        assert stat.S_IMODE(state_file.stat().st_mode) == 0o600
+
+        outdir = project_dir / "custom.out"
+        result = request_daemon(
+            {"command": "synth", "context": {}, "outdir": str(outdir)}, state_file
+        )
+        assert result["success"] is True
+        assert outdir.is_dir()
+
+        status = request_daemon({"command": "status"}, state_file)
+        assert status["synthCount"] == 1
+        assert status["pid"] == os.getpid()
+    finally:
+        request_daemon({"command": "stop"}, state_file)
+        server.join(timeout=10)
+
+    assert not server.is_alive()
+    assert not state_file.exists()
+
+
+def test_request_without_daemon(tmp_path):
+    """Test the error when no daemon is running."""
+    with pytest.raises(ConnectionError, match="not running"):
+        request_daemon({"command": "status"}, tmp_path / ".synth-daemon.json")
@@ -0,0 +1,141 @@
+"""
+Tests for the synth.multi_env module.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from azure_pipelines.synth import multi_env
+
+# Fake CDK app writing a cloud assembly with one stack per environment
+FAKE_APP = """
+import json, os, pathlib, sys, time
+context = json.loads(os.environ["CDK_CONTEXT_JSON"])
+environment = context["environment"]
+if environment == "broken":
+    sys.exit("synth failed")
+time.sleep(float(context.get("delay", 0)))
+outdir = pathlib.Path(os.environ["CDK_OUTDIR"])
+outdir.mkdir(parents=True, exist_ok=True)
+manifest = {
+    "artifacts": {
+        "Stack": {
+            "type": "aws:cloudformation:stack",
+            "environment": "aws://123/eu-central-1",
+            "properties": {
+                "templateFile": "Stack.template.json",
+                "stackName": f"mrht-{environment}-sample-stack",
+            },
+        },
+        "Tree": {"type": "cdk:tree"},
+    }
+}
+(outdir / "manifest.json").write_text(json.dumps(manifest))
+"""
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """Create a project with three environments and a fake app."""
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    for environment in ("developer", "generalpurpose", "production"):
+        (config_dir / f"{environment}.json").write_text("{}")
+    (config_dir / "_base.json").write_text("{}")
+    (tmp_path / "fake_app.py").write_text(FAKE_APP)
+    (tmp_path / "cdk.json").write_text(json.dumps({"context": {"delay": 0.5}}))
+    return tmp_path
+
+
+def test_discover_environments(project_dir):
+    """Test that all environment files except shared layers are found."""
+    assert multi_env.discover_environments(project_dir / "config") == [
+        "developer",
+        "generalpurpose",
+        "production",
+    ]
+
+
+def test_synthesize_all(project_dir):
+    """Test that all environments are synthesized in parallel."""
+    manifest = multi_env.synthesize_all(
+        project_dir=project_dir,
+        max_workers=3,
+        app_command=[sys.executable, "fake_app.py"],
+    )
+
+    assert manifest["success"] is True
+    assert set(manifest["environments"]) == {
+        "developer",
+        "generalpurpose",
+        "production",
+    }
+
+    developer = manifest["environments"]["developer"]
+    assert developer["outdir"] == "cdk.out/developer"
+    assert developer["stacks"] == {
+        "Stack": {
+            "stackName": "mrht-developer-sample-stack",
+            "environment": "aws://123/eu-central-1",
+            "templateFile": "Stack.template.json",
+        }
+    }
+
+    # Three environments sleeping 0.5s each must overlap
+    assert manifest["durationSeconds"] < 1.4
+
+    written = json.loads((project_dir / "cdk.out" / "environments.json").read_text())
+    assert written == manifest
+
+
+def test_environments_use_own_cache_directories(project_dir, monkeypatch):
+    """Test that every environment keeps its own synth cache entries and logs."""
+    monkeypatch.delenv("AZURE_PIPELINES_SYNTH_CACHE_DIR", raising=False)
+    monkeypatch.setenv("AZURE_PIPELINES_LOG_DIR", str(project_dir / "logs"))
+    environments = {}
+    log_dirs = {}
+
+    def run(command, env, **kwargs):
+        environment = json.loads(env["CDK_CONTEXT_JSON"])["environment"]
+        environments[environment] = env["AZURE_PIPELINES_SYNTH_CACHE_DIR"]
+        log_dirs[environment] = env["AZURE_PIPELINES_LOG_DIR"]
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(multi_env.subprocess, "run", run)
+    multi_env.synthesize_all(project_dir=project_dir)
+
+    assert environments == {
+        "developer": os.path.join(".synth-cache", "developer"),
+        "generalpurpose": os.path.join(".synth-cache", "generalpurpose"),
+        "production": os.path.join(".synth-cache", "production"),
+    }
+    assert log_dirs["production"] == str(project_dir / "logs" / "production")
+
+
+def test_synthesize_all_failure(project_dir):
+    """Test that a failing environment marks the manifest as failed."""
+    manifest = multi_env.synthesize_all(
+        environments=["developer", "broken"],
+        project_dir=project_dir,
+        app_command=[sys.executable, "fake_app.py"],
+    )
+
+    assert manifest["success"] is False
+    assert manifest["environments"]["developer"]["success"] is True
+    assert manifest["environments"]["broken"]["returnCode"] == 1
+    assert manifest["environments"]["broken"]["stacks"] == {}
+
+
+def test_main_failure(project_dir, monkeypatch):
+    """Test that main exits with an error if an environment failed."""
+    monkeypatch.chdir(project_dir)
+    monkeypatch.setattr(sys, "argv", ["multi_env.py", "-e", "broken"])
+
+    with pytest.raises(SystemExit) as exc:
+        multi_env.main()
+
+    assert exc.value.code == 1
@@ -0,0 +1,83 @@
+"""
+Tests for the synth.profiler module.
+"""
+
+import json
+import tracemalloc
+
+import pytest
+
+from azure_pipelines.synth.profiler import PROFILE_FILE, SynthProfiler
+
+
+@pytest.fixture
+def profiler():
+    """Create an enabled profiler and stop tracing afterwards."""
+    yield SynthProfiler(enabled=True)
+    tracemalloc.stop()
+
+
+def test_phase(profiler):
+    """Test that a phase records time and memory."""
+    with profiler.phase("allocate"):
+        data = [bytearray(1024) for _ in range(1000)]
+
+    assert len(data) == 1000
+    phase = profiler.phases[0]
+    assert phase["name"] == "allocate"
+    assert phase["seconds"] >= 0
+    assert phase["tracemallocPeakIncreaseBytes"] >= 1024 * 1000
+    assert phase["peakRssBytes"] > 0
+
+
+def test_phase_records_failures(profiler):
+    """Test that a failing phase is still recorded."""
+    with pytest.raises(ValueError), profiler.phase("failing"):
+        raise ValueError("synth failed")
+
+    assert profiler.phases[0]["name"] == "failing"
+
+
+def test_aspect_time(profiler):
+    """Test that aspect visits are accumulated."""
+    profiler.add_aspect_time("AwsSolutionsChecks", 0.5)
+    profiler.add_aspect_time("AwsSolutionsChecks", 0.25)
+
+    report = profiler.report()
+    assert report["aspects"] == {"AwsSolutionsChecks": {"seconds": 0.75, "visits": 2}}
+
+
+def test_write(profiler, tmp_path):
+    """Test that the report is written into the cloud assembly directory."""
+    with profiler.phase("synth"):
+        pass
+
+    path = profiler.write(tmp_path, environment="developer")
+
+    assert path == tmp_path / PROFILE_FILE
+    report = json.loads(path.read_text())
+    assert report["version"] == 1
+    assert report["environment"] == "developer"
+    assert [phase["name"] for phase in report["phases"]] == ["synth"]
+
+
+def test_disabled(tmp_path):
+    """Test that a disabled profiler records and writes nothing."""
+    profiler = SynthProfiler(enabled=False)
+    aspect = object()
+
+    with profiler.phase("synth"):
+        pass
+
+    assert profiler.phases == []
+    assert profiler.timed_aspect("Aspect", aspect) is aspect
+    assert profiler.write(tmp_path) is None
+    assert not (tmp_path / PROFILE_FILE).exists()
+
+
+def test_from_context(mock_env):
+    """Test enabling the profiler through the context."""
+    with mock_env(AZURE_PIPELINES_SYNTH_PROFILE="0"):
+        assert SynthProfiler.from_context({}).enabled is False
+        assert SynthProfiler.from_context({"profile": "true"}).enabled is True
+    tracemalloc.stop()
@@ -0,0 +1,4 @@
+"""Benchmarks for the CDK app and the azure_pipelines modules.
+
+Every benchmark is a script that can be run with ``python -m benchmarks.<name>``.
+"""
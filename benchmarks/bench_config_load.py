@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Benchmark loading the configuration from JSON files and from the snapshot.
+
+Generates a config directory with a base layer, account groups and N
+environments of K nested keys each. Every measurement starts a fresh Python
+process that imports the config module and loads all environments, like an
+entry point of the pipeline does, once reading the JSON files and once reading
+the compiled snapshot.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from azure_pipelines.load_env.config import ConfigRegistry
+
+# Loads all environments of a config directory in a fresh process
+LOAD_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from azure_pipelines.load_env.config import CDKConfig
+imported = time.perf_counter()
+for environment in sys.argv[2:]:
+    CDKConfig(environment, config_dir=sys.argv[1])
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def generate_config(config_dir: Path, environments: int, keys: int, seed: int) -> None:
+    """Write a layered config directory with random settings."""
+    rng = random.Random(seed)
+
+    def settings(count: int) -> Dict[str, object]:
+        return {
+            f"Setting{index}": {
+                "Enabled": rng.random() > 0.5,
+                "Size": rng.randint(1, 1000),
+                "Name": f"value-{rng.getrandbits(32):x}",
+                "Tags": [f"tag-{tag}" for tag in range(3)],
+            }
+            for index in range(count)
+        }
+
+    (config_dir / "_groups").mkdir(parents=True)
+    (config_dir / "_base.json").write_text(
+        json.dumps({"AWSRegion": "eu-central-1", **settings(keys)})
+    )
+    for group in ("development", "production"):
+        (config_dir / "_groups" / f"{group}.json").write_text(
+            json.dumps(settings(keys // 2))
+        )
+    for index in range(environments):
+        (config_dir / f"env{index}.json").write_text(
+            json.dumps(
+                {
+                    "$group": rng.choice(["development", "production"]),
+                    "AccountId": f"{rng.randint(10**11, 10**12 - 1)}",
+                    **settings(keys // 4),
+                }
+            )
+        )
+
+
+def measure(config_dir: Path, environments: List[str], repeat: int) -> Dict[str, float]:
+    """Measure the median import and load time of fresh processes."""
+    imports: List[float] = []
+    loads: List[float] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", LOAD_SCRIPT, str(config_dir), *environments],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        import_seconds, load_seconds = output.split()[-2:]
+        imports.append(float(import_seconds))
+        loads.append(float(load_seconds))
+    return {
+        "importSeconds": statistics.median(imports),
+        "loadSeconds": statistics.median(loads),
+    }
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading the configuration from JSON and the snapshot"
+    )
+    parser.add_argument(
+        "--environments", type=int, default=20, help="Number of environments"
+    )
+    parser.add_argument(
+        "--keys", type=int, default=200, help="Nested settings of the base layer"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Processes per mode")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the config load benchmark."""
+    args = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_dir = Path(directory) / "config"
+        generate_config(config_dir, args.environments, args.keys, args.seed)
+        environments = [f"env{index}" for index in range(args.environments)]
+
+        results = {"json": measure(config_dir, environments, args.repeat)}
+        ConfigRegistry(config_dir).compile_snapshot()
+        results["snapshot"] = measure(config_dir, environments, args.repeat)
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "environments": args.environments,
+                    "keys": args.keys,
+                    "results": results,
+                }
+            )
+        )
+        return
+
+    print(f"{args.environments} environments x {args.keys} settings, fresh processes")
+    print(f"{'mode':<10}{'import [ms]':>12}{'load [ms]':>12}{'total [ms]':>12}")
+    for mode, result in results.items():
+        total = result["importSeconds"] + result["loadSeconds"]
+        print(
+            f"{mode:<10}{result['importSeconds'] * 1000:>12.1f}"
+            f"{result['loadSeconds'] * 1000:>12.1f}{total * 1000:>12.1f}"
+        )
+    speedup = results["json"]["loadSeconds"] / results["snapshot"]["loadSeconds"]
+    print(f"Snapshot loads {speedup:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
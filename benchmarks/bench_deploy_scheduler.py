@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark the deploy scheduler with a fake deploy backend.
+
+Generates a layered dependency graph of N stacks, every stack depending on up
+to two stacks of the previous layer, and deploys it with a backend that sleeps
+for a random duration per stack. Compares sequential deployment with the
+scheduler at different concurrency caps.
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+from typing import Dict, List
+
+from azure_pipelines.deploy.scheduler import DependencyGraph, DeployScheduler
+
+
+class SleepingBackend:
+    """Deploy backend sleeping for a fixed duration per stack."""
+
+    def __init__(self, durations: Dict[str, float]) -> None:
+        """Initialize the backend with the duration of every stack."""
+        self.durations = durations
+
+    def deploy(self, stack: str) -> None:
+        """Pretend to deploy a stack."""
+        time.sleep(self.durations[stack])
+
+
+def build_graph(stacks: int, layers: int, seed: int) -> DependencyGraph:
+    """Create a layered dependency graph."""
+    rng = random.Random(seed)
+    names = [f"stack-{index}" for index in range(stacks)]
+    layer_of = {name: index * layers // stacks for index, name in enumerate(names)}
+    graph: DependencyGraph = {}
+    for name in names:
+        previous = [other for other in names if layer_of[other] == layer_of[name] - 1]
+        graph[name] = set(rng.sample(previous, min(len(previous), rng.randint(0, 2))))
+    return graph
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the deploy scheduler")
+    parser.add_argument("--stacks", type=int, default=30, help="Number of stacks")
+    parser.add_argument("--layers", type=int, default=4, help="Dependency layers")
+    parser.add_argument(
+        "--seconds", type=float, default=0.1, help="Mean deploy duration per stack"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(item) for item in value.split(",")],
+        default=[1, 2, 4, 8],
+        help="Concurrency caps to compare",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the deploy scheduler benchmark."""
+    args = parse_arguments()
+    # Only measure the scheduler, not the logging of every deployment
+    logging.getLogger("azure_pipelines.deploy.scheduler").setLevel(logging.WARNING)
+    graph = build_graph(args.stacks, args.layers, args.seed)
+    rng = random.Random(args.seed)
+    durations = {stack: rng.uniform(0.5, 1.5) * args.seconds for stack in graph}
+    backend = SleepingBackend(durations)
+
+    results: List[Dict[str, float]] = []
+    for concurrency in args.concurrency:
+        scheduler = DeployScheduler(graph, backend, max_concurrency=concurrency)
+        start = time.perf_counter()
+        scheduler.run()
+        results.append(
+            {"concurrency": concurrency, "seconds": time.perf_counter() - start}
+        )
+
+    sequential = sum(durations.values())
+    # Longest path through the graph, the lower bound for any schedule
+    finish: Dict[str, float] = {}
+    for wave in scheduler.waves:
+        for stack in wave:
+            finish[stack] = durations[stack] + max(
+                (finish[dependency] for dependency in graph[stack]), default=0.0
+            )
+    critical_path = max(finish.values())
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "stacks": args.stacks,
+                    "waves": len(scheduler.waves),
+                    "sequentialSeconds": sequential,
+                    "criticalPathSeconds": critical_path,
+                    "results": results,
+                }
+            )
+        )
+        return
+
+    print(
+        f"{args.stacks} stacks in {len(scheduler.waves)} waves, "
+        f"sequential {sequential:.2f}s, critical path {critical_path:.2f}s"
+    )
+    print(f"{'concurrency':<12}{'time [s]':>10}{'speedup':>10}")
+    for result in results:
+        speedup = sequential / result["seconds"]
+        print(f"{result['concurrency']:<12}{result['seconds']:>10.2f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
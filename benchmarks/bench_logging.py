@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Benchmark creating loggers and logging records.
+
+Compares the former caller lookup with ``inspect.stack()`` to the frame based
+``caller_module_name`` at different stack depths, and measures a complete
+``configure_logging()`` call like the one every module runs at import time.
+
+Then measures the latency of ``logger.info`` on a console that takes a fixed
+time per write, once writing directly and once through the queue listener.
+
+Finally compares writing records to a log file with the standard
+``RotatingFileHandler``, which writes and flushes every record, to the
+``BufferedRotatingFileHandler``.
+"""
+
+import argparse
+import inspect
+import io
+import json
+import logging
+import logging.handlers
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from azure_pipelines.logging_config import (
+    BufferedRotatingFileHandler,
+    caller_module_name,
+    configure_logging,
+    reset_logging,
+    stop_queue_listener,
+)
+
+
+def inspect_module_name() -> str:
+    """Look up the caller like configure_logging did before."""
+    frame = inspect.stack()[1]
+    module = inspect.getmodule(frame[0])
+    return module.__name__ if module else "azure_pipelines"
+
+
+def call_nested(depth: int, function: Callable[[], float]) -> float:
+    """Call a function below the given number of extra stack frames."""
+    if depth == 0:
+        return function()
+    return call_nested(depth - 1, function)
+
+
+def measure(function: Callable[[], object], calls: int, depth: int) -> float:
+    """Measure the average seconds of a call at a stack depth."""
+
+    def run() -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        return (time.perf_counter() - start) / calls
+
+    return call_nested(depth, run)
+
+
+def create_logger() -> None:
+    """Create a logger named after the caller, without a console handler."""
+    configure_logging(console_output=False)
+
+
+class SlowConsole(io.StringIO):
+    """Console that takes a fixed time for every write, like a busy log capture."""
+
+    def __init__(self, delay: float) -> None:
+        """Initialize the console with the seconds per write."""
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        """Write text after the delay."""
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+def measure_records(use_queue: bool, records: int, delay: float) -> Dict[str, Any]:
+    """Measure the latency of logger.info calls on a slow console."""
+    stdout = sys.stdout
+    sys.stdout = SlowConsole(delay)
+    try:
+        logger = configure_logging("bench_logging", use_queue=use_queue)
+        latencies: List[float] = []
+        for index in range(records):
+            start = time.perf_counter()
+            logger.info("Posted comment %d", index)
+            latencies.append(time.perf_counter() - start)
+        stop_queue_listener()
+    finally:
+        reset_logging("bench_logging")
+        sys.stdout = stdout
+
+    latencies.sort()
+    return {
+        "mode": "queue" if use_queue else "direct",
+        "meanSeconds": statistics.mean(latencies),
+        "p99Seconds": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def measure_file(buffered: bool, records: int) -> Dict[str, Any]:
+    """Measure the seconds per record written to a rotating log file."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.log"
+        handler: logging.Handler = (
+            BufferedRotatingFileHandler(path, max_bytes=1048576, backup_count=2)
+            if buffered
+            else logging.handlers.RotatingFileHandler(
+                path, maxBytes=1048576, backupCount=2
+            )
+        )
+        logger = logging.getLogger("bench_logging_file")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            start = time.perf_counter()
+            for index in range(records):
+                logger.info("Posted comment %d", index)
+            seconds = time.perf_counter() - start
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+    return {
+        "handler": "buffered" if buffered else "rotating",
+        "secondsPerRecord": seconds / records,
+    }
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark logger creation")
+    parser.add_argument(
+        "--depths",
+        type=lambda value: [int(item) for item in value.split(",")],
+        default=[10, 50, 200],
+        help="Extra stack frames below the caller",
+    )
+    parser.add_argument("--calls", type=int, default=200, help="Calls per depth")
+    parser.add_argument(
+        "--records", type=int, default=200, help="Records logged per mode"
+    )
+    parser.add_argument(
+        "--write-delay", type=float, default=0.001, help="Seconds per console write"
+    )
+    parser.add_argument(
+        "--file-records", type=int, default=20000, help="Records written to files"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the logging benchmark."""
+    args = parse_arguments()
+
+    results: List[Dict[str, float]] = []
+    for depth in args.depths:
+        results.append(
+            {
+                "depth": depth,
+                "inspectSeconds": measure(inspect_module_name, args.calls, depth),
+                "frameSeconds": measure(caller_module_name, args.calls, depth),
+                "configureSeconds": measure(create_logger, args.calls, depth),
+            }
+        )
+
+    records = [
+        measure_records(use_queue, args.records, args.write_delay)
+        for use_queue in (False, True)
+    ]
+
+    files = [measure_file(buffered, args.file_records) for buffered in (False, True)]
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "calls": args.calls,
+                    "results": results,
+                    "records": records,
+                    "files": files,
+                }
+            )
+        )
+        return
+
+    print(f"{'depth':<8}{'inspect [us]':>14}{'frame [us]':>12}{'configure [us]':>16}")
+    for result in results:
+        print(
+            f"{result['depth']:<8}{result['inspectSeconds'] * 1e6:>14.1f}"
+            f"{result['frameSeconds'] * 1e6:>12.2f}"
+            f"{result['configureSeconds'] * 1e6:>16.1f}"
+        )
+
+    print(f"\nlogger.info with {args.write_delay * 1000:g} ms per console write")
+    print(f"{'mode':<8}{'mean [us]':>12}{'p99 [us]':>12}")
+    for record in records:
+        print(
+            f"{record['mode']:<8}{record['meanSeconds'] * 1e6:>12.1f}"
+            f"{record['p99Seconds'] * 1e6:>12.1f}"
+        )
+
+    print(f"\n{args.file_records} records written to a rotating log file")
+    print(f"{'handler':<10}{'per record [us]':>16}")
+    for result in files:
+        print(f"{result['handler']:<10}{result['secondsPerRecord'] * 1e6:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Benchmark posting pull request comments to a local fake Azure DevOps server.
+
+Every new connection to the fake server takes ``--handshake`` seconds, like
+the TCP and TLS handshakes with dev.azure.com, and every request takes
+``--latency`` seconds. Compares a new connection per comment, like the former
+module level ``requests.post`` calls, to the pooled session of ``Message``
+to ``AsyncMessage`` posting up to ``--concurrency`` comments at a time and to
+a ``CommentBatch`` posting all comments as one thread. The ``rerun`` mode
+posts the keyed batch once and measures a second run with the same comments,
+which only lists the threads and finds nothing to update.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+import requests
+
+from azure_pipelines.pull_requests.pull_request_comment import (
+    API_VERSION,
+    AsyncMessage,
+    CommentBatch,
+    Message,
+    create_session,
+)
+from azure_pipelines.tests.fake_azure_devops import FakeAzureDevOps
+
+
+def post_without_session(message: Message, comment: str) -> bool:
+    """Post a comment on a new connection like the former implementation."""
+    response = requests.post(
+        url=f"{message.base_url}/threads?api-version={API_VERSION}",
+        json={"comments": [{"parentCommentId": 1, "content": comment}], "status": 1},
+        headers={"Authorization": f"Bearer {message.token}"},
+    )
+    return response.status_code == 200
+
+
+def post_with_session(message: Message, comment: str) -> bool:
+    """Post a comment through the session of the message."""
+    return message.add_msg(comment=comment)
+
+
+def measure(
+    post: Callable[[Message, str], bool],
+    comments: int,
+    handshake: float,
+    latency: float,
+) -> Dict[str, Any]:
+    """Measure the latency of posting comments one after another."""
+    with FakeAzureDevOps(handshake_delay=handshake, latency=latency) as server:
+        with patch.dict(os.environ, server.environment()), Message() as message:
+            latencies: List[float] = []
+            for index in range(comments):
+                start = time.perf_counter()
+                if not post(message, f"Comment {index}"):
+                    raise RuntimeError("Posting a comment failed")
+                latencies.append(time.perf_counter() - start)
+        connections = server.connections
+
+    return {
+        "meanSeconds": statistics.mean(latencies),
+        "totalSeconds": sum(latencies),
+        "connections": connections,
+    }
+
+
+def measure_concurrent(
+    comments: int, concurrency: int, handshake: float, latency: float
+) -> Dict[str, Any]:
+    """Measure posting all comments concurrently with AsyncMessage."""
+
+    async def post(message: Message) -> List[bool]:
+        async with AsyncMessage(message=message, concurrency=concurrency) as msg:
+            return await msg.gather(
+                *(msg.add_msg(f"Comment {index}") for index in range(comments))
+            )
+
+    with FakeAzureDevOps(handshake_delay=handshake, latency=latency) as server:
+        with patch.dict(os.environ, server.environment()):
+            message = Message(session=create_session(pool_size=concurrency))
+        start = time.perf_counter()
+        results = asyncio.run(post(message))
+        seconds = time.perf_counter() - start
+        message.close()
+        connections = server.connections
+
+    if not all(results):
+        raise RuntimeError("Posting a comment failed")
+    return {
+        "meanSeconds": seconds / comments,
+        "totalSeconds": seconds,
+        "connections": connections,
+    }
+
+
+def measure_batch(
+    comments: int, handshake: float, latency: float, rerun: bool = False
+) -> Dict[str, Any]:
+    """Measure posting all comments as one thread with a CommentBatch."""
+    with FakeAzureDevOps(handshake_delay=handshake, latency=latency) as server:
+        with patch.dict(os.environ, server.environment()), Message() as message:
+            batch = CommentBatch(message, key="bench" if rerun else None)
+            runs = 2 if rerun else 1
+            for _ in range(runs):
+                for index in range(comments):
+                    batch.add(f"Comment {index}")
+                start = time.perf_counter()
+                results = batch.send()
+                seconds = time.perf_counter() - start
+        connections = server.connections
+
+    if not all(results):
+        raise RuntimeError("Posting a comment failed")
+    return {
+        "meanSeconds": seconds / comments,
+        "totalSeconds": seconds,
+        "connections": connections,
+    }
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark posting PR comments")
+    parser.add_argument("--comments", type=int, default=50, help="Comments to post")
+    parser.add_argument(
+        "--handshake", type=float, default=0.03, help="Seconds per new connection"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="Seconds per request"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Comments posted at the same time"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the PR comment benchmark."""
+    args = parse_arguments()
+
+    results = {
+        "requests.post": measure(
+            post_without_session, args.comments, args.handshake, args.latency
+        ),
+        "session": measure(
+            post_with_session, args.comments, args.handshake, args.latency
+        ),
+        "async": measure_concurrent(
+            args.comments, args.concurrency, args.handshake, args.latency
+        ),
+        "batch": measure_batch(args.comments, args.handshake, args.latency),
+        "rerun": measure_batch(args.comments, args.handshake, args.latency, rerun=True),
+    }
+
+    if args.json:
+        print(json.dumps({"comments": args.comments, "results": results}))
+        return
+
+    print(
+        f"{args.comments} comments, {args.handshake * 1000:g} ms per connection, "
+        f"{args.latency * 1000:g} ms per request"
+    )
+    print(f"{'mode':<15}{'mean [ms]':>12}{'total [s]':>12}{'connections':>13}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<15}{result['meanSeconds'] * 1000:>12.1f}"
+            f"{result['totalSeconds']:>12.2f}{result['connections']:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
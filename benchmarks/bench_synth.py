@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Benchmark synth time and memory of generated CdkSampleRepo apps.
+
+Every size (N stacks x M bucket/key pairs) is measured in a fresh worker
+process, so that the peak memory of one size does not leak into the next. A
+worker builds the app once with and once without the cdk-nag aspect and
+reports the median construct, aspect and synth time together with the peak
+resident set size of the Python process and of the jsii node kernel.
+
+Usage::
+
+    python -m benchmarks.bench_synth --save-baseline synth-baseline.json
+    pip install -r requirements.txt  # e.g. after bumping aws-cdk-lib
+    python -m benchmarks.bench_synth --baseline synth-baseline.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Metrics compared against the baseline
+METRICS = ("construct", "aspects", "synth", "peakRssBytes", "kernelPeakRssBytes")
+
+# Packages whose versions are recorded with the results
+PACKAGES = ("aws-cdk-lib", "cdk-nag", "aws-pdk", "constructs", "jsii")
+
+# Version of the result format, increase on incompatible changes
+RESULT_VERSION = 1
+
+
+def kernel_peak_rss_bytes() -> Optional[int]:
+    """Get the peak resident set size of the child processes (the jsii kernel).
+
+    Returns:
+        The summed peak RSS in bytes or None if /proc is not available.
+    """
+    children_file = Path(f"/proc/{os.getpid()}/task/{os.getpid()}/children")
+    if not children_file.exists():
+        return None
+
+    total = 0
+    for pid in children_file.read_text().split():
+        try:
+            status = Path(f"/proc/{pid}/status").read_text()
+        except FileNotFoundError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                total += int(line.split()[1]) * 1024
+    return total
+
+
+def build_app(stacks: int, pairs: int, outdir: str, nag: bool) -> Tuple[Any, float]:
+    """Build a CdkSampleRepo app with generated stacks.
+
+    Args:
+        stacks: Number of stacks
+        pairs: Number of bucket/key pairs per stack
+        outdir: Output directory of the cloud assembly
+        nag: Whether to add the AwsSolutionsChecks aspect
+
+    Returns:
+        The app and the seconds spent constructing it.
+    """
+    import cdk_nag
+    from aws_cdk import Aspects, RemovalPolicy, Stack
+    from aws_cdk import aws_kms as kms
+    from aws_cdk import aws_s3 as s3
+    from cdk_nag import NagSuppressions
+
+    from cdk_sample_repo.cdk_sample_repo_app import CdkSampleRepo
+
+    class SyntheticStack(Stack):
+        """Stack with the resources of CdkSampleRepoStack repeated pairs times."""
+
+        def __init__(self, scope: Any, construct_id: str, **kwargs: Any) -> None:
+            super().__init__(scope, construct_id, **kwargs)
+            for index in range(pairs):
+                key = kms.Key(
+                    self,
+                    id=f"BucketKey{index}",
+                    enabled=True,
+                    enable_key_rotation=True,
+                    removal_policy=RemovalPolicy.RETAIN,
+                )
+                bucket = s3.Bucket(
+                    self,
+                    id=f"MyBucket{index}",
+                    block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+                    versioned=True,
+                    enforce_ssl=True,
+                    encryption_key=key,
+                )
+                NagSuppressions.add_resource_suppressions(
+                    construct=bucket,
+                    suppressions=[
+                        {
+                            "id": "AwsSolutions-S1",
+                            "reason": "This bucket does not hold customer data",
+                        }
+                    ],
+                )
+
+    start = time.perf_counter()
+    app = CdkSampleRepo(context={"environment": "developer"}, outdir=outdir)
+    if nag:
+        Aspects.of(app).add(cdk_nag.AwsSolutionsChecks(verbose=True))
+
+    for index in range(stacks):
+        stack_name = f"bench-{index}-stack"
+        app.registry.register(
+            stack_name,
+            lambda scope, dependencies, index=index, stack_name=stack_name: (
+                SyntheticStack(
+                    scope,
+                    f"BenchStack{index}",
+                    stack_name=stack_name,
+                    env=app.default_env,
+                    synthesizer=app.default_synthesizer,
+                )
+            ),
+        )
+
+    app.create_tags()
+    app.create_cfn_stacks()
+    app.assign_tags()
+    return app, time.perf_counter() - start
+
+
+def measure(stacks: int, pairs: int, nag: bool) -> Dict[str, float]:
+    """Build and synthesize a single app.
+
+    Args:
+        stacks: Number of stacks
+        pairs: Number of bucket/key pairs per stack
+        nag: Whether to add the AwsSolutionsChecks aspect
+
+    Returns:
+        Seconds spent in the construct and synth phases.
+    """
+    with tempfile.TemporaryDirectory() as outdir:
+        app, construct = build_app(stacks, pairs, outdir, nag)
+        start = time.perf_counter()
+        app.synth()
+        return {"construct": construct, "synth": time.perf_counter() - start}
+
+
+def run_worker(stacks: int, pairs: int, repeat: int) -> Dict[str, Any]:
+    """Measure a single size in the current process.
+
+    Args:
+        stacks: Number of stacks
+        pairs: Number of bucket/key pairs per stack
+        repeat: Number of measurements per variant
+
+    Returns:
+        Median timings and peak memory of the size.
+    """
+    from azure_pipelines.synth.profiler import peak_rss_bytes
+
+    # Warm up the jsii kernel before measuring
+    measure(1, 1, nag=True)
+
+    with_nag: List[Dict[str, float]] = []
+    without_nag: List[Dict[str, float]] = []
+    for _ in range(repeat):
+        with_nag.append(measure(stacks, pairs, nag=True))
+        without_nag.append(measure(stacks, pairs, nag=False))
+
+    synth = statistics.median(sample["synth"] for sample in with_nag)
+    plain_synth = statistics.median(sample["synth"] for sample in without_nag)
+    return {
+        "stacks": stacks,
+        "pairs": pairs,
+        "construct": statistics.median(sample["construct"] for sample in with_nag),
+        "aspects": max(synth - plain_synth, 0.0),
+        "synth": synth,
+        "peakRssBytes": peak_rss_bytes(),
+        "kernelPeakRssBytes": kernel_peak_rss_bytes(),
+    }
+
+
+def run_size(stacks: int, pairs: int, repeat: int) -> Dict[str, Any]:
+    """Measure a single size in a fresh worker process.
+
+    Args:
+        stacks: Number of stacks
+        pairs: Number of bucket/key pairs per stack
+        repeat: Number of measurements per variant
+
+    Returns:
+        The result reported by the worker.
+    """
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.bench_synth",
+        "--worker",
+        f"{stacks}x{pairs}",
+        "--repeat",
+        str(repeat),
+    ]
+    env = {**os.environ, "JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION": "1"}
+    process = subprocess.run(
+        command, capture_output=True, text=True, env=env, check=False
+    )
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"Benchmark of {stacks}x{pairs} failed:\n{process.stderr[-2000:]}"
+        )
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def package_versions() -> Dict[str, str]:
+    """Get the installed versions of the CDK packages."""
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = "not installed"
+    return versions
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Compare results against a baseline.
+
+    Args:
+        results: Current benchmark results
+        baseline: Previously saved benchmark results
+        threshold: Allowed relative increase, e.g. 0.2 for 20%
+
+    Returns:
+        Descriptions of all metrics exceeding the threshold.
+    """
+    previous = {
+        (entry["stacks"], entry["pairs"]): entry for entry in baseline["results"]
+    }
+    regressions = []
+    for entry in results["results"]:
+        old = previous.get((entry["stacks"], entry["pairs"]))
+        if old is None:
+            continue
+        for metric in METRICS:
+            if not old.get(metric) or entry.get(metric) is None:
+                continue
+            ratio = entry[metric] / old[metric]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{entry['stacks']}x{entry['pairs']} {metric}: "
+                    f"{old[metric]:.3f} -> {entry[metric]:.3f} ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def format_size(value: Optional[float]) -> str:
+    """Format a byte count in MiB."""
+    return "n/a" if value is None else f"{value / 2**20:.0f}"
+
+
+def parse_sizes(value: str) -> List[int]:
+    """Parse a comma separated list of integers."""
+    return [int(item) for item in value.split(",") if item]
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark CDK synth time and memory")
+    parser.add_argument(
+        "--stacks", type=parse_sizes, default=[1, 10, 25], help="Stack counts"
+    )
+    parser.add_argument(
+        "--pairs", type=parse_sizes, default=[1, 10], help="Bucket/key pairs per stack"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant")
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--save-baseline", help="Save the results as baseline")
+    parser.add_argument("--baseline", help="Compare the results with this baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative increase over the baseline",
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the synth benchmark."""
+    args = parse_arguments()
+
+    if args.worker:
+        stacks, pairs = (int(value) for value in args.worker.split("x"))
+        print(json.dumps(run_worker(stacks, pairs, args.repeat)))
+        return
+
+    results = {
+        "version": RESULT_VERSION,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "python": ".".join(map(str, sys.version_info[:3])),
+        "packages": package_versions(),
+        "repeat": args.repeat,
+        "results": [
+            run_size(stacks, pairs, args.repeat)
+            for stacks in args.stacks
+            for pairs in args.pairs
+        ],
+    }
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2))
+
+    regressions: List[str] = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.json:
+        print(json.dumps({**results, "regressions": regressions}))
+    else:
+        print(
+            f"aws-cdk-lib {results['packages']['aws-cdk-lib']}, median of {args.repeat} runs"
+        )
+        print(
+            f"{'size':<10}{'construct [s]':>15}{'aspects [s]':>13}{'synth [s]':>11}"
+            f"{'python [MiB]':>14}{'kernel [MiB]':>14}"
+        )
+        for entry in results["results"]:
+            size = f"{entry['stacks']}x{entry['pairs']}"
+            print(
+                f"{size:<10}{entry['construct']:>15.3f}{entry['aspects']:>13.3f}"
+                f"{entry['synth']:>11.3f}{format_size(entry['peakRssBytes']):>14}"
+                f"{format_size(entry['kernelPeakRssBytes']):>14}"
+            )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark nested per-stack tagging against the BulkTagger.
+
+Builds an app with N sample stacks, tags it with M tags using both strategies
+and measures the time spent adding the tags and synthesizing the app.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import aws_cdk as core
+
+from azure_pipelines.load_env.config import CDKConfig
+from cdk_sample_repo.cdk_sample_repo_stack import CdkSampleRepoStack
+from cdk_sample_repo.tagging import BulkTagger
+
+
+def build_app(stack_count: int, config: CDKConfig) -> Dict[str, core.Stack]:
+    """Create an app with stack_count sample stacks."""
+    app = core.App()
+    return {
+        f"bench-stack-{index}": CdkSampleRepoStack(
+            app,
+            f"BenchStack{index}",
+            stack_name=f"bench-stack-{index}",
+            config=config,
+            stage="benchmark",
+        )
+        for index in range(stack_count)
+    }
+
+
+def tag_nested(app: core.App, stacks: Dict[str, core.Stack], tags: Dict[str, str]):
+    """Add every tag to every stack, as CdkSampleRepo.assign_tags used to do."""
+    for stack in stacks.values():
+        for key, value in tags.items():
+            core.Tags.of(stack).add(key, value)
+
+
+def tag_bulk(app: core.App, stacks: Dict[str, core.Stack], tags: Dict[str, str]):
+    """Add the tags with the BulkTagger."""
+    BulkTagger(tags).apply(app, stacks=stacks)
+
+
+def run(
+    strategy: Callable, stack_count: int, tags: Dict[str, str], config: CDKConfig
+) -> Dict[str, float]:
+    """Run a single measurement of a tagging strategy."""
+    stacks = build_app(stack_count, config)
+    app = next(iter(stacks.values())).node.root
+
+    start = time.perf_counter()
+    strategy(app, stacks, tags)
+    tagging = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app.synth()
+    synth = time.perf_counter() - start
+
+    return {"tagging": tagging, "synth": synth}
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark CDK tagging strategies")
+    parser.add_argument("--stacks", type=int, default=50, help="Number of stacks")
+    parser.add_argument("--tags", type=int, default=20, help="Number of tags")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per strategy")
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the tagging benchmark."""
+    args = parse_arguments()
+    config = CDKConfig("developer")
+    tags = {f"Tag{index}": f"value-{index}" for index in range(args.tags)}
+    strategies = {"nested": tag_nested, "bulk": tag_bulk}
+
+    # Warm up the jsii kernel before measuring
+    run(tag_bulk, 1, tags, config)
+
+    samples: Dict[str, List[Dict[str, float]]] = {name: [] for name in strategies}
+    for _ in range(args.repeat):
+        # Alternate the strategies so that both see the same kernel state
+        for name, strategy in strategies.items():
+            samples[name].append(run(strategy, args.stacks, tags, config))
+
+    results = {
+        name: {
+            phase: statistics.median(sample[phase] for sample in runs)
+            for phase in ("tagging", "synth")
+        }
+        for name, runs in samples.items()
+    }
+    results["speedup"] = {
+        phase: results["nested"][phase] / results["bulk"][phase]
+        for phase in ("tagging", "synth")
+    }
+
+    if args.json:
+        print(json.dumps({"stacks": args.stacks, "tags": args.tags, **results}))
+        return
+
+    print(f"{args.stacks} stacks x {args.tags} tags, median of {args.repeat} runs")
+    print(f"{'strategy':<10}{'tagging [s]':>14}{'synth [s]':>14}")
+    for name in strategies:
+        print(
+            f"{name:<10}{results[name]['tagging']:>14.3f}{results[name]['synth']:>14.3f}"
+        )
+    print(
+        f"{'speedup':<10}{results['speedup']['tagging']:>13.1f}x"
+        f"{results['speedup']['synth']:>13.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
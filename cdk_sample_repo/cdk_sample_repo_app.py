@@ -0,0 +1,230 @@
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+import cdk_nag
+from aws_cdk import Aspects, DefaultStackSynthesizer, Environment, Stack
+from aws_pdk.pdk_nag import PDKNagApp
+
+from azure_pipelines.load_env.config import CDKConfig
+from azure_pipelines.load_env.layers import context_overrides
+from azure_pipelines.load_env.resolver import parameter_resolver
+from azure_pipelines.logging_config import get_logger
+from azure_pipelines.synth.profiler import SynthProfiler
+from cdk_sample_repo.cdk_sample_repo_stack import CdkSampleRepoStack
+from cdk_sample_repo.config_schema import CdkSampleRepoConfig
+from cdk_sample_repo.stack_registry import StackRegistry
+from cdk_sample_repo.tagging import BulkTagger
+
+if TYPE_CHECKING:
+    from aws_pdk.cdk_graph import CdkGraph
+
+# Get configured logger for this module
+logger = get_logger(__name__)
+
+
+class CdkSampleRepo(PDKNagApp):
+    """Create the CDK App for network management."""
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the CDK application."""
+        super().__init__(*args, **kwargs)
+
+        # Load configuration
+        self.environment = self.node.try_get_context("environment")
+        self.config = CDKConfig(
+            self.environment,
+            overrides=context_overrides(self.node.get_all_context()),
+            schema=CdkSampleRepoConfig,
+            resolver=parameter_resolver,
+        )
+
+        # Set up default synthesizer and environment
+        self.default_synthesizer = DefaultStackSynthesizer(
+            file_assets_bucket_name="mrht-cdk-bucket-assets-${AWS::AccountId}-${AWS::Region}",
+            image_assets_repository_name="mrht-cdk-repository",
+        )
+
+        self.default_env = Environment(
+            account=self.config.typed.account_id,
+            region=self.config.typed.aws_region,
+        )
+
+        # Initialize stack tracking
+        self.registry = StackRegistry()
+        self.stacks: List[Stack] = []
+        self.stack_names: List[str] = []
+        self.tags: Dict[str, str] = {}
+        self.stack_tags: Dict[str, Dict[str, Optional[str]]] = {}
+        self.resource_type_tags: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def create_tags(self) -> None:
+        """Create default tags for all CDK resources."""
+        branch_name = os.getenv("BUILD_SOURCEBRANCHNAME", "master")
+        branch_name = "master" if branch_name == "merge" else branch_name
+
+        self.tags = {
+            "DeploymentMethod": "CDK - Python",  # Fixed typo in DeploymentMethod
+            "CICD": "True",
+            "RepositoryName": os.getenv("BUILD_REPOSITORY_NAME", "local"),
+            "Environment": self.environment,
+            "BranchName": branch_name,
+            "Name": "Network Management Repo",
+        }
+
+    def declare_stacks(self) -> None:
+        """Declare all CloudFormation stacks of the app without constructing them."""
+        stack_name = f"mrht-{self.environment}-sample-stack"
+
+        self.registry.register(
+            stack_name,
+            lambda scope, dependencies: CdkSampleRepoStack(
+                scope,
+                construct_id="CdkSampleRepoStack",
+                stack_name=stack_name,
+                description="Dieser Cloudformation Stack erzeugt den Sample Stack.",
+                env=self.default_env,
+                config=self.config,
+                synthesizer=self.default_synthesizer,
+                stage=self.environment,
+            ),
+        )
+
+        # Example of stack dependencies (commented out)
+        # self.registry.register(other_stack_name, other_factory, depends_on=[stack_name])
+
+    def create_cfn_stacks(self) -> None:
+        """Create CloudFormation stacks.
+
+        Only stacks matching the 'stacks' context filter and their dependencies
+        are constructed, e.g. ``--context stacks=mrht-*-sample-stack``.
+        """
+        if not self.registry.specs:
+            self.declare_stacks()
+
+        stacks = self.registry.build(self, self.node.try_get_context("stacks"))
+        for stack_name, stack in stacks.items():
+            self.stacks.append(stack)
+            self.stack_names.append(stack_name)
+
+    def assign_tags(self) -> None:
+        """Assign tags to all CloudFormation stacks.
+
+        Default tags are added once to the app, stack_tags and resource_type_tags
+        override them for single stacks or CloudFormation resource types.
+        """
+        tagger = BulkTagger(
+            self.tags,
+            stack_overrides=self.stack_tags,
+            resource_type_overrides=self.resource_type_tags,
+        )
+        tagger.apply(self, stacks=dict(zip(self.stack_names, self.stacks)))
+
+
+def create_graph(app: CdkSampleRepo) -> "CdkGraph":
+    """Set up CDK Graph with the diagram and threat composer plugins.
+
+    The aws_pdk graph modules are imported here, so that apps without the graph
+    do not pay for loading them.
+
+    Args:
+        app: The CDK app to visualize
+
+    Returns:
+        CdkGraph: Graph attached to the app
+    """
+    start = time.perf_counter()
+    from aws_pdk.cdk_graph import CdkGraph, FilterPreset
+    from aws_pdk.cdk_graph_plugin_diagram import CdkGraphDiagramPlugin
+    from aws_pdk.cdk_graph_plugin_threat_composer import CdkGraphThreatComposerPlugin
+
+    logger.info(f"Imported CDK graph plugins in {time.perf_counter() - start:.2f}s")
+
+    return CdkGraph(
+        app,
+        plugins=[
+            CdkGraphThreatComposerPlugin(
+                application_details={
+                    "name": "applications",
+                }
+            ),
+            CdkGraphDiagramPlugin(
+                diagrams=[
+                    {
+                        "name": "diagram",
+                        "title": "Diagram CdkSampleRepoStack",
+                        # "theme": "dark",
+                        "filterPlan": {
+                            "preset": FilterPreset.NON_EXTRANEOUS,
+                        },
+                    }
+                ]
+            ),
+        ],
+    )
+
+
+def synthesize(
+    context: Optional[Dict[str, Any]] = None,
+    outdir: Optional[Union[str, Path]] = None,
+    graph: bool = False,
+    profiler: Optional[SynthProfiler] = None,
+) -> CdkSampleRepo:
+    """Build and synthesize the CDK app.
+
+    Args:
+        context: CDK context (defaults to the context passed by the CDK CLI)
+        outdir: Output directory (defaults to the directory passed by the CDK CLI)
+        graph: Whether to generate the CDK graph diagram
+        profiler: Profiler measuring the synth phases
+
+    Returns:
+        CdkSampleRepo: The synthesized app
+    """
+    profiler = profiler or SynthProfiler(enabled=False)
+
+    app_props: Dict[str, Any] = {}
+    if context is not None:
+        app_props["context"] = context
+    if outdir is not None:
+        app_props["outdir"] = str(outdir)
+
+    # Initialize the app
+    with profiler.phase("app_construction"):
+        app = CdkSampleRepo(**app_props)
+
+    # Add AWS Solutions Checks, they are executed during synth
+    with profiler.phase("add_aspects"):
+        Aspects.of(app).add(
+            profiler.timed_aspect(
+                "AwsSolutionsChecks", cdk_nag.AwsSolutionsChecks(verbose=True)
+            )
+        )
+
+    # Set up CDK Graph for visualization, only needed where the diagram is uploaded
+    cdk_graph = None
+    if graph:
+        with profiler.phase("create_graph"):
+            cdk_graph = create_graph(app)
+
+    # Create and configure the application
+    with profiler.phase("create_tags"):
+        app.create_tags()
+    with profiler.phase("create_cfn_stacks"):
+        app.create_cfn_stacks()
+    with profiler.phase("assign_tags"):
+        app.assign_tags()
+
+    # Synthesize the CloudFormation templates
+    with profiler.phase("synth"):
+        app.synth()
+
+    # Generate the infrastructure diagram
+    if cdk_graph is not None:
+        start = time.perf_counter()
+        with profiler.phase("graph_report"):
+            cdk_graph.report()
+        logger.info(f"Generated CDK graph report in {time.perf_counter() - start:.2f}s")
+
+    return app
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from azure_pipelines.load_env.schema import setting
+
+
+@dataclass(frozen=True)
+class CdkSampleRepoConfig:
+    """Settings every environment of the sample app must provide.
+
+    The configuration is validated against this schema when the app loads it,
+    so a missing account ID fails before any stack is constructed.
+    """
+
+    account_id: str = setting("AccountId", pattern=r"\d{12}")
+    aws_region: str = setting("AWSRegion", pattern=r"[a-z]{2}(-[a-z]+)+-\d")
+    queue_name: Optional[str] = setting("QueueName", default=None)
@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from aws_cdk import Stack
+from constructs import Construct
+
+# Builds a stack in the given scope from the already built dependencies
+StackFactory = Callable[[Construct, Dict[str, Stack]], Stack]
+
+
+@dataclass(frozen=True)
+class StackSpec:
+    """Declaration of a stack that is only constructed when it is selected.
+
+    Args:
+        name: Name of the CloudFormation stack
+        factory: Callable building the stack
+        depends_on: Names of stacks that must be deployed before this stack
+    """
+
+    name: str
+    factory: StackFactory
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class StackRegistry:
+    """Declare stacks up front and construct only those matching a filter.
+
+    The filter is a comma separated list of glob patterns matched against the
+    stack names, usually passed with ``--context stacks=<glob>``. Dependencies of
+    selected stacks are always included.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self.specs: Dict[str, StackSpec] = {}
+
+    def register(
+        self, name: str, factory: StackFactory, depends_on: Iterable[str] = ()
+    ) -> StackSpec:
+        """Declare a stack.
+
+        Args:
+            name: Name of the CloudFormation stack
+            factory: Callable building the stack from the scope and its dependencies
+            depends_on: Names of stacks that must be deployed before this stack
+
+        Returns:
+            StackSpec: The registered declaration
+
+        Raises:
+            ValueError: If a stack with the same name is already registered.
+        """
+        if name in self.specs:
+            raise ValueError(f"Stack '{name}' is already registered")
+
+        spec = StackSpec(name=name, factory=factory, depends_on=tuple(depends_on))
+        self.specs[name] = spec
+        return spec
+
+    @staticmethod
+    def _patterns(stack_filter: Optional[Union[str, Iterable[str]]]) -> List[str]:
+        """Split a stack filter into glob patterns."""
+        if stack_filter is None:
+            return []
+        if isinstance(stack_filter, str):
+            stack_filter = stack_filter.split(",")
+        return [pattern.strip() for pattern in stack_filter if pattern.strip()]
+
+    def select(
+        self, stack_filter: Optional[Union[str, Iterable[str]]] = None
+    ) -> List[str]:
+        """Select stacks matching the filter together with their dependencies.
+
+        Args:
+            stack_filter: Glob patterns of stack names, None or "*" selects all
+
+        Returns:
+            Names of the selected stacks, dependencies before their dependents.
+
+        Raises:
+            ValueError: If a pattern matches no stack, a dependency is unknown or
+                the dependencies contain a cycle.
+        """
+        patterns = self._patterns(stack_filter)
+        if not patterns:
+            selected = set(self.specs)
+        else:
+            selected = set()
+            for pattern in patterns:
+                matches = {name for name in self.specs if fnmatchcase(name, pattern)}
+                if not matches:
+                    raise ValueError(
+                        f"No stack matches '{pattern}', available stacks: "
+                        f"{', '.join(sorted(self.specs))}"
+                    )
+                selected.update(matches)
+
+        order: List[str] = []
+        done = set()
+        visiting: List[str] = []
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                start = visiting.index(name)
+                cycle = " -> ".join(visiting[start:] + [name])
+                raise ValueError(f"Stack dependency cycle: {cycle}")
+            if name not in self.specs:
+                raise ValueError(
+                    f"Stack '{visiting[-1]}' depends on unknown stack '{name}'"
+                )
+
+            visiting.append(name)
+            for dependency in self.specs[name].depends_on:
+                visit(dependency)
+            visiting.pop()
+            done.add(name)
+            order.append(name)
+
+        # Keep the registration order for independent stacks
+        for name in self.specs:
+            if name in selected:
+                visit(name)
+
+        return order
+
+    def build(
+        self,
+        scope: Construct,
+        stack_filter: Optional[Union[str, Iterable[str]]] = None,
+    ) -> Dict[str, Stack]:
+        """Construct the selected stacks and wire up their dependencies.
+
+        Args:
+            scope: Scope of the stacks, usually the app
+            stack_filter: Glob patterns of stack names, None or "*" selects all
+
+        Returns:
+            The constructed stacks by name in dependency order.
+        """
+        stacks: Dict[str, Stack] = {}
+        for name in self.select(stack_filter):
+            spec = self.specs[name]
+            dependencies = {dep: stacks[dep] for dep in spec.depends_on}
+            stack = spec.factory(scope, dependencies)
+            for dependency in dependencies.values():
+                stack.add_dependency(dependency)
+            stacks[name] = stack
+        return stacks
@@ -0,0 +1,120 @@
+from typing import Dict, Mapping, Optional
+
+from aws_cdk import Stack, Tags
+from constructs import Construct
+
+# Priorities of the tag aspects, higher priorities take precedence
+DEFAULT_PRIORITY = 100
+STACK_OVERRIDE_PRIORITY = 200
+RESOURCE_TYPE_OVERRIDE_PRIORITY = 300
+
+
+class BulkTagger:
+    """Apply a set of tags to a construct tree with as few jsii calls as possible.
+
+    Every ``Tags.of(...).add`` call is a round trip into the jsii kernel. Instead
+    of adding every tag to every stack, the default tags are added once to the
+    common scope, so the number of calls no longer depends on the number of
+    stacks. Overrides are added with a higher priority on top of them. An
+    override value of None removes the tag.
+
+    Args:
+        tags: Tags for all resources
+        stack_overrides: Tags per stack name overriding the defaults
+        resource_type_overrides: Tags per CloudFormation resource type overriding
+            the defaults and the stack overrides
+    """
+
+    def __init__(
+        self,
+        tags: Mapping[str, str],
+        stack_overrides: Optional[Mapping[str, Mapping[str, Optional[str]]]] = None,
+        resource_type_overrides: Optional[
+            Mapping[str, Mapping[str, Optional[str]]]
+        ] = None,
+    ) -> None:
+        """Initialize the tagger with default tags and overrides."""
+        self.tags = dict(tags)
+        self.stack_overrides = {
+            name: dict(overrides) for name, overrides in (stack_overrides or {}).items()
+        }
+        self.resource_type_overrides = {
+            resource_type: dict(overrides)
+            for resource_type, overrides in (resource_type_overrides or {}).items()
+        }
+
+    @staticmethod
+    def _set(
+        scope: Construct,
+        key: str,
+        value: Optional[str],
+        priority: int,
+        resource_type: Optional[str] = None,
+    ) -> None:
+        """Add or remove a single tag on a scope."""
+        include = [resource_type] if resource_type else None
+        if value is None:
+            Tags.of(scope).remove(
+                key, priority=priority, include_resource_types=include
+            )
+        else:
+            Tags.of(scope).add(
+                key, value, priority=priority, include_resource_types=include
+            )
+
+    def apply(
+        self, scope: Construct, stacks: Optional[Mapping[str, Stack]] = None
+    ) -> int:
+        """Apply all tags to the scope.
+
+        Args:
+            scope: Construct containing all tagged stacks, usually the app
+            stacks: Stacks by stack name, required for stack overrides
+
+        Returns:
+            int: Number of tag aspects that were added
+
+        Raises:
+            KeyError: If a stack override refers to an unknown stack.
+        """
+        stacks = stacks or {}
+        operations = 0
+
+        for key, value in self.tags.items():
+            self._set(scope, key, value, DEFAULT_PRIORITY)
+            operations += 1
+
+        for stack_name, overrides in self.stack_overrides.items():
+            if stack_name not in stacks:
+                raise KeyError(f"Tag override for unknown stack '{stack_name}'")
+            for key, value in overrides.items():
+                if self.tags.get(key) == value:
+                    continue
+                self._set(stacks[stack_name], key, value, STACK_OVERRIDE_PRIORITY)
+                operations += 1
+
+        for resource_type, overrides in self.resource_type_overrides.items():
+            for key, value in overrides.items():
+                self._set(
+                    scope, key, value, RESOURCE_TYPE_OVERRIDE_PRIORITY, resource_type
+                )
+                operations += 1
+
+        return operations
+
+    def resolve(
+        self, stack_name: Optional[str] = None, resource_type: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Compute the effective tags of a resource without touching the construct tree.
+
+        Args:
+            stack_name: Name of the stack containing the resource
+            resource_type: CloudFormation type of the resource
+
+        Returns:
+            The tags the resource ends up with.
+        """
+        effective: Dict[str, Optional[str]] = dict(self.tags)
+        effective.update(self.stack_overrides.get(stack_name, {}))
+        effective.update(self.resource_type_overrides.get(resource_type, {}))
+        return {key: value for key, value in effective.items() if value is not None}
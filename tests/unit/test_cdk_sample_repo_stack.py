@@ -1,7 +1,10 @@
+import json
+
 import aws_cdk as core
 import aws_cdk.assertions as assertions
+from aws_cdk import aws_s3 as s3
 
-from azure_pipelines.load_env.config import CDKConfig
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
 from cdk_sample_repo.cdk_sample_repo_stack import CdkSampleRepoStack
 
 
@@ -114,3 +117,46 @@ class TestCdkSampleRepoStack:
                 )
             },
         )
+
+
+def test_config_values_are_accepted_by_constructs(tmp_path):
+    """Test that list and object config values can be passed to constructs."""
+    (tmp_path / "developer.json").write_text(
+        json.dumps(
+            {
+                "Origins": ["https://example.com", "https://example.org"],
+                "Tags": {"Team": "platform"},
+            }
+        )
+    )
+    config = CDKConfig("developer", config_dir=tmp_path, registry=ConfigRegistry())
+
+    stack = core.Stack(core.App(), "config-values", tags=config.get_value("Tags"))
+    s3.Bucket(
+        stack,
+        "Bucket",
+        cors=[
+            s3.CorsRule(
+                allowed_methods=[s3.HttpMethods.GET],
+                allowed_origins=config.get_value("Origins"),
+            )
+        ],
+    )
+
+    assertions.Template.from_stack(stack).has_resource_properties(
+        "AWS::S3::Bucket",
+        {
+            "CorsConfiguration": {
+                "CorsRules": [
+                    {
+                        "AllowedMethods": ["GET"],
+                        "AllowedOrigins": [
+                            "https://example.com",
+                            "https://example.org",
+                        ],
+                    }
+                ]
+            }
+        },
+    )
+    assert stack.tags.tag_values() == {"Team": "platform"}
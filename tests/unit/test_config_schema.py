@@ -0,0 +1,31 @@
+import pytest
+
+from azure_pipelines.load_env.config import CDKConfig, ConfigRegistry
+from azure_pipelines.load_env.schema import ConfigValidationError
+from azure_pipelines.synth.multi_env import discover_environments
+from cdk_sample_repo.config_schema import CdkSampleRepoConfig
+
+
+class TestCdkSampleRepoConfig:
+    def setup(self):
+        self.registry = ConfigRegistry()
+
+    @pytest.mark.parametrize("environment", discover_environments())
+    def test_environments_match_schema(self, environment):
+        """Test that every environment in config/ provides the required settings."""
+        config = CDKConfig(
+            environment, registry=self.registry, schema=CdkSampleRepoConfig
+        )
+
+        assert config.typed.account_id == config.get_value("AccountId")
+        assert config.typed.aws_region == config.get_value("AWSRegion")
+
+    def test_invalid_override_fails(self):
+        """Test that invalid overrides fail before synth."""
+        with pytest.raises(ConfigValidationError, match="AccountId"):
+            CDKConfig(
+                "developer",
+                registry=self.registry,
+                overrides={"AccountId": "not-an-account"},
+                schema=CdkSampleRepoConfig,
+            )
@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from cdk_sample_repo.stack_registry import StackRegistry
+
+
+class TestStackRegistry:
+    def setup(self):
+        self.built = []
+        self.registry = StackRegistry()
+        self.registry.register("network", self.factory("network"))
+        self.registry.register(
+            "database", self.factory("database"), depends_on=["network"]
+        )
+        self.registry.register(
+            "service", self.factory("service"), depends_on=["database"]
+        )
+        self.registry.register("monitoring", self.factory("monitoring"))
+
+    def factory(self, name):
+        """Create a factory recording which stacks are constructed."""
+
+        def build(scope, dependencies):
+            self.built.append((name, sorted(dependencies)))
+            stack = MagicMock(name=name)
+            stack.stack_name = name
+            return stack
+
+        return build
+
+    def test_select_all(self):
+        """Test that no filter selects all stacks in dependency order."""
+        assert self.registry.select() == [
+            "network",
+            "database",
+            "service",
+            "monitoring",
+        ]
+        assert self.registry.select("*") == self.registry.select()
+
+    def test_select_with_dependencies(self):
+        """Test that dependencies of selected stacks are pulled in."""
+        assert self.registry.select("serv*") == ["network", "database", "service"]
+
+    def test_select_multiple_patterns(self):
+        """Test comma separated patterns."""
+        assert self.registry.select("monitoring, network") == [
+            "network",
+            "monitoring",
+        ]
+
+    def test_select_no_match(self):
+        """Test that a pattern without matches fails."""
+        with pytest.raises(ValueError, match="No stack matches 'unknown'"):
+            self.registry.select("unknown")
+
+    def test_build_only_selected(self):
+        """Test that only selected stacks are constructed."""
+        scope = MagicMock()
+        stacks = self.registry.build(scope, "database")
+
+        assert list(stacks) == ["network", "database"]
+        assert self.built == [("network", []), ("database", ["network"])]
+        stacks["database"].add_dependency.assert_called_once_with(stacks["network"])
+
+    def test_duplicate_registration(self):
+        """Test that stack names are unique."""
+        with pytest.raises(ValueError, match="already registered"):
+            self.registry.register("network", self.factory("network"))
+
+    def test_unknown_dependency(self):
+        """Test that unknown dependencies are reported."""
+        self.registry.register("broken", self.factory("broken"), depends_on=["gone"])
+
+        with pytest.raises(ValueError, match="unknown stack 'gone'"):
+            self.registry.select("broken")
+
+    def test_dependency_cycle(self):
+        """Test that dependency cycles are detected."""
+        registry = StackRegistry()
+        registry.register("a", self.factory("a"), depends_on=["b"])
+        registry.register("b", self.factory("b"), depends_on=["a"])
+
+        with pytest.raises(ValueError, match="a -> b -> a"):
+            registry.select()
@@ -0,0 +1,83 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from azure_pipelines.load_env.config import CDKConfig
+from cdk_sample_repo.cdk_sample_repo_stack import CdkSampleRepoStack
+from cdk_sample_repo.tagging import BulkTagger
+
+
+class TestBulkTagger:
+    def setup(self):
+        self.app = core.App()
+        self.config = CDKConfig("developer")
+        self.stacks = {
+            name: CdkSampleRepoStack(
+                self.app, name, stack_name=name, config=self.config, stage="developer"
+            )
+            for name in ("first-stack", "second-stack")
+        }
+        self.tagger = BulkTagger(
+            {"Environment": "developer", "CICD": "True"},
+            stack_overrides={"second-stack": {"Environment": "shared", "CICD": None}},
+            resource_type_overrides={"AWS::KMS::Key": {"DataClass": "keys"}},
+        )
+        self.operations = self.tagger.apply(self.app, stacks=self.stacks)
+        self.templates = {
+            name: assertions.Template.from_stack(stack)
+            for name, stack in self.stacks.items()
+        }
+
+    def test_default_tags(self):
+        """Test that the default tags are added to all stacks."""
+        self.templates["first-stack"].has_resource_properties(
+            "AWS::S3::Bucket",
+            {
+                "Tags": assertions.Match.array_with(
+                    [
+                        {"Key": "CICD", "Value": "True"},
+                        {"Key": "Environment", "Value": "developer"},
+                    ]
+                )
+            },
+        )
+
+    def test_stack_override(self):
+        """Test that stack overrides replace and remove default tags."""
+        self.templates["second-stack"].has_resource_properties(
+            "AWS::S3::Bucket",
+            {"Tags": [{"Key": "Environment", "Value": "shared"}]},
+        )
+
+    def test_resource_type_override(self):
+        """Test that resource type overrides only apply to that type."""
+        self.templates["first-stack"].has_resource_properties(
+            "AWS::KMS::Key",
+            {
+                "Tags": assertions.Match.array_with(
+                    [{"Key": "DataClass", "Value": "keys"}]
+                )
+            },
+        )
+        bucket = self.templates["first-stack"].find_resources("AWS::S3::Bucket")
+        for resource in bucket.values():
+            keys = [tag["Key"] for tag in resource["Properties"]["Tags"]]
+            assert "DataClass" not in keys
+
+    def test_operation_count(self):
+        """Test that the number of tag aspects does not depend on the stacks."""
+        assert self.operations == 2 + 2 + 1
+
+    def test_resolve(self):
+        """Test computing the effective tags without a construct tree."""
+        assert self.tagger.resolve("second-stack", "AWS::KMS::Key") == {
+            "Environment": "shared",
+            "DataClass": "keys",
+        }
+
+    def test_unknown_stack_override(self):
+        """Test that overrides for unknown stacks are rejected."""
+        tagger = BulkTagger({}, stack_overrides={"missing": {"Key": "Value"}})
+
+        with pytest.raises(KeyError):
+            tagger.apply(core.App(), stacks={})